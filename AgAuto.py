@@ -13,11 +13,8 @@ Use Python 3.6 (py36) as the Interpreter. Number selection is allowed
 
 from agweather_package import PotatoBlight as potato
 from agweather_package import DailyUpload as daily
+from agweather_package import DailyPipeline as pipeline
 # from pyfiglet import Figlet
-from subprocess import call
-from os import getcwd, path
-from time import sleep, time
-from agweather_package import write_list_to_csv
 
 
 """
@@ -34,8 +31,8 @@ def user_in():
 #    rendered_text = Figlet(font='slant')
 #    print(rendered_text.renderText('AgAuto'))
 
-    choices = ["dailyUpload", "mawpCleaner", "debug", "calcPotatoDSV", "q"]
-    print("[1] dailyUpload\n[2] mawpCleaner \n[3] calcPotatoDSV\n[d] debug\n[q] Quit")
+    choices = ["dailyUpload", "mawpCleaner", "debug", "calcPotatoDSV", "calcFieldDSV", "q"]
+    print("[1] dailyUpload\n[2] mawpCleaner \n[3] calcPotatoDSV\n[4] calcFieldDSV\n[d] debug\n[q] Quit")
     choice = ''
 
     # Program will keep asking for which programs to run until user inputs 'q'.
@@ -43,26 +40,9 @@ def user_in():
         choice = input("Which program do you want to run?:")
 
         if choice.strip() == 'dailyUpload' or choice.strip() == '1':
-            time1 = time()
             print("Downloading data....")
-            contents_to_write = daily.back_fill_daily_ec()
-            if len(contents_to_write) > 1:
-                write_list_to_csv('DailyEC.csv', contents_to_write)
-                time2 = time()
-                print("Time Elapsed: %is" % (time2 - time1))
-
-            daily.update_dailyEC()
-            file_24 = "mawp24raw.txt"
-            file_60 = "mawp60raw.txt"
-            daily.cleanData(file_24)
-            daily.cleanData(file_60)
-            daily.gen_Bat_file()
-            in_me = False
-            while not in_me:
-                in_me = daily.in_managed_environment()
-                sleep(4)
-            if in_me:
-                call(path.join(getcwd(), 'AgAuto_batch.bat'))
+            # The stages of the upload are set in config_files/pipeline_options.yaml.
+            pipeline.daily_upload(**pipeline.load_pipeline_options())
 
         elif choice.strip() == 'mawpCleaner' or choice.strip() == '2':
             file_24 = "mawp24raw.txt"
@@ -70,7 +50,10 @@ def user_in():
             daily.cleanData(file_24)
             daily.cleanData(file_60)
         elif choice.strip() == 'calcPotatoDSV' or choice.strip() == '3':
-            potato.show_all_stations_dsv()
+            # The way the DSVs are calculated is set in config_files/dsv_options.yaml.
+            potato.show_all_stations_dsv(**potato.load_dsv_options())
+        elif choice.strip() == 'calcFieldDSV' or choice.strip() == '4':
+            potato.show_field_dsv()
         elif choice.strip() == 'debug' or choice.strip() == 'd':
             debug()
         elif choice not in choices:
@@ -88,4 +71,7 @@ def main():
     user_in()
 
 
-main()
+# The worker processes that calculate DSVs in parallel and parse xml files import this file again when they are
+# spawned (as on Windows), so the menu is only started by the main process.
+if __name__ == '__main__':
+    main()
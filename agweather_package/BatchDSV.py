@@ -0,0 +1,198 @@
+"""
+Created on Sun Oct 18 16:00:00 2026
+
+Purpose: BatchDSV calculates the cumulative and daily DSV of many seed dates at once. Each request is a field (or a
+station) with its own seed date, and all requests of a station are answered from a single pass over the station's
+daily DSV values using prefix sums, instead of recalculating the series for every seed date.
+
+The cumulative DSV of a seed date is the sum of the Wisdom DSVs up to and including the day the cumulative DSV
+reaches WISDOM_DSV_CUTOFF, plus the sum of the TomCast DSVs after it. Because both DSV tables only have values of 0 or
+more, the prefix sums never decrease and the switch day of every seed date can be found with a binary search.
+
+Date modified: Sun Oct 18 2026
+"""
+
+import yaml
+import numpy as np
+from datetime import datetime, date, timedelta
+from .ColumnarDSV import EPOCH
+from .IncrementalDSV import WISDOM_MODEL, TOMCAST_MODEL
+from .UsefulClasses import MAXIMUM_PERIOD_SIZE
+from .UsefulClasses import WISDOM_DSV_CUTOFF
+from .UsefulFunctions import get_path_dir
+from .DSVWriters import FieldCSVWriter
+from .DSVWriters import FIELD_DSV_HEADER
+
+# CONSTANTS
+SEED_DATES_FILE = 'seed_dates.yaml'
+FIELD_DSV_FILE = 'field_dsv.csv'
+
+
+"""
+Purpose: The class SeedRequest is a single field (or station) that needs its DSV calculated from a seed date.
+
+Variables:
+    - field: The name of the field. The station ID is used if the field has no name.
+    - station_id: The station ID in mawp15.txt that the field uses.
+    - seed_date: The seed date as a datetime object.
+"""
+
+
+class SeedRequest:
+
+    def __init__(self, field, station_id, seed_date):
+        self.field = field
+        self.station_id = station_id
+        self.seed_date = seed_date
+
+    def get_seed_str(self):
+        return self.seed_date.strftime("%Y-%m-%d")
+
+
+"""
+Purpose: The class SeedResult stores the DSV of a SeedRequest. The values are None if the station has no data.
+
+Variables:
+    - cumul_dsv: The cumulative DSV from the seed date onwards (0 if the seed date can't be found).
+    - today_dsv: The DSV of the latest complete day, the same as WeatherStation.today_dsv.
+    - model: The model (Wisdom or TomCast) that matches the cumulative DSV.
+    - switch_date: The first day that the TomCast model was used, or None if it hasn't been used yet.
+"""
+
+
+class SeedResult:
+
+    def __init__(self, request, cumul_dsv=None, today_dsv=None, model=None, switch_date=None):
+        self.request = request
+        self.cumul_dsv = cumul_dsv
+        self.today_dsv = today_dsv
+        self.model = model
+        self.switch_date = switch_date
+
+    def csv_row(self):
+        switch_str = self.switch_date.strftime("%Y-%m-%d") if self.switch_date is not None else ''
+        return [self.request.field, self.request.station_id, self.request.get_seed_str(),
+                '' if self.cumul_dsv is None else self.cumul_dsv, '' if self.today_dsv is None else self.today_dsv,
+                '' if self.model is None else self.model, switch_str]
+
+
+# Converts a seed date from a YAML file or a string of the format YYYY-MM-DD into a datetime object.
+def to_seed_date(seed_date):
+    if isinstance(seed_date, datetime):
+        return seed_date
+    if isinstance(seed_date, date):
+        return datetime(seed_date.year, seed_date.month, seed_date.day)
+    return datetime.strptime(str(seed_date).strip(), '%Y-%m-%d')
+
+
+"""
+Purpose: make_seed_requests turns a list of (station_id, seed_date) or (field, station_id, seed_date) entries into
+SeedRequest objects. Entries that are already SeedRequest objects are kept as they are.
+"""
+
+
+def make_seed_requests(entries):
+    requests = []
+    for entry in entries:
+        if isinstance(entry, SeedRequest):
+            requests.append(entry)
+        elif len(entry) == 2:
+            requests.append(SeedRequest(str(entry[0]), str(entry[0]), to_seed_date(entry[1])))
+        elif len(entry) == 3:
+            requests.append(SeedRequest(str(entry[0]), str(entry[1]), to_seed_date(entry[2])))
+        else:
+            raise ValueError("Seed date entries need to be (station, seed_date) or (field, station, seed_date): %s"
+                             % str(entry))
+    return requests
+
+
+"""
+Purpose: read_seed_requests reads the fields and their seed dates from a YAML file in config_files. The file can
+either map each field name to its station and seed date:
+
+    Field 1:
+      station: 212
+      seed_date: 2015-06-02
+
+or be a list of entries with field (optional), station and seed_date keys.
+"""
+
+
+def read_seed_requests(file_name=SEED_DATES_FILE, default_folder='config_files'):
+    with open(get_path_dir(default_folder, file_name), 'r') as seed_file:
+        yaml_load = yaml.safe_load(seed_file)
+    entries = []
+    if isinstance(yaml_load, dict):
+        for field, values in yaml_load.items():
+            entries.append((field, values['station'], values['seed_date']))
+    elif yaml_load is not None:
+        for values in yaml_load:
+            entries.append((values.get('field', values['station']), values['station'], values['seed_date']))
+    return make_seed_requests(entries)
+
+
+"""
+Purpose: station_batch_dsv calculates the cumulative DSV, today's DSV and the switch position of every seed date of
+a single station. daily is the station's DailyColumns object and seed_dates is a list of datetime objects.
+"""
+
+
+def station_batch_dsv(daily, seed_dates):
+    size = daily.get_size()
+    wisdom_prefix = np.concatenate(([0], np.cumsum(daily.wisdom_dsv)))
+    tomcast_prefix = np.concatenate(([0], np.cumsum(daily.tomcast_dsv)))
+
+    seed_index = np.array([daily.get_date_index(seed_date) for seed_date in seed_dates], dtype=np.int64)
+
+    # The TomCast model starts the day after the Wisdom DSV since the seed date reaches WISDOM_DSV_CUTOFF.
+    switch = np.searchsorted(wisdom_prefix, wisdom_prefix[seed_index] + WISDOM_DSV_CUTOFF, side='left')
+    switch = np.minimum(switch, size)
+    cumul_dsv = (wisdom_prefix[switch] - wisdom_prefix[seed_index]) + (tomcast_prefix[size] - tomcast_prefix[switch])
+
+    # Same choice of day as latest_dsv, with the model matching each cumulative DSV.
+    latest = -1 if daily.period_size[-1] == MAXIMUM_PERIOD_SIZE or size == 1 else -2
+    today_dsv = np.where(cumul_dsv < WISDOM_DSV_CUTOFF, daily.wisdom_dsv[latest], daily.tomcast_dsv[latest])
+    return cumul_dsv, today_dsv, switch
+
+
+"""
+Purpose: batch_dsv answers every SeedRequest from a dictionary of StationColumns objects.
+The requests are grouped by station so that the daily DSV values of each station are only calculated once. The
+results are returned in the same order as the requests.
+"""
+
+
+def batch_dsv(stations, requests):
+    requests = make_seed_requests(requests)
+    results = [None] * len(requests)
+
+    station_requests = {}
+    for position, request in enumerate(requests):
+        station_requests.setdefault(request.station_id, []).append(position)
+
+    for station_id, positions in station_requests.items():
+        station = stations.get(station_id)
+        daily = station.get_daily() if station is not None else None
+        if daily is None or daily.get_size() == 0:
+            print("No data found for station %s. Skipping %s field(s)." % (station_id, len(positions)))
+            for position in positions:
+                results[position] = SeedResult(requests[position])
+            continue
+
+        cumul_dsv, today_dsv, switch = station_batch_dsv(daily, [requests[position].seed_date
+                                                                 for position in positions])
+        for number, position in enumerate(positions):
+            cumul = int(cumul_dsv[number])
+            switch_date = None
+            if switch[number] < daily.get_size():
+                switch_date = EPOCH + timedelta(days=int(daily.day_number[switch[number]]))
+            results[position] = SeedResult(requests[position], cumul, int(today_dsv[number]),
+                                           WISDOM_MODEL if cumul < WISDOM_DSV_CUTOFF else TOMCAST_MODEL, switch_date)
+    return results
+
+
+# Writes one row for each SeedResult to a CSV file in raw_output_data.
+def write_field_dsv_csv(results, file_name=FIELD_DSV_FILE, default_folder='raw_output_data'):
+    with FieldCSVWriter(file_name, default_folder) as writer:
+        for result in results:
+            writer.write_field(result)
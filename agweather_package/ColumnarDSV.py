@@ -0,0 +1,427 @@
+"""
+Created on Sun Oct 18 9:00:00 2026
+
+Purpose: ColumnarDSV is an array-based alternative to the WeatherStation/DailyData classes in UsefulClasses. The 15
+minute data from mawp15.txt is stored as NumPy columns for each station, and the period counts, average temperatures
+and daily/cumulative DSV are calculated for all of a station's days at once instead of looping over each entry.
+
+The results are identical to WeatherStation.today_dsv and WeatherStation.today_dsv_package.
+
+Date modified: Sun Oct 18 2026
+"""
+
+import numpy as np
+from datetime import timedelta
+from .UsefulClasses import MAXIMUM_PERIOD_SIZE
+from .UsefulClasses import MIN_ALLOWABLE_PERIOD_SIZE
+from .UsefulClasses import RH_CUTOFF
+from .UsefulClasses import WISDOM_DSV_CUTOFF
+from .UsefulClasses import WISDOM_LOW_TEMP_CUTOFF
+from .UsefulClasses import TOMCAST_LOW_TEMP_CUTOFF
+from .UsefulClasses import TOMCAST_HIGH_TEMP_CUTOFF
+from .UsefulClasses import MISSING_SEED_END
+from .UsefulClasses import DateIndex
+from .UsefulClasses import TIME_STAMP_PARSER
+from .UsefulClasses import DATE_INDEX, ID_INDEX, TEMP_INDEX, RH_INDEX, RAIN_INDEX, AVG_WS_INDEX, AVG_WD_INDEX
+from .UsefulFunctions import stream_text_file
+from .UsefulFunctions import minutes_to_datetime
+from .UsefulFunctions import EPOCH, MINUTES_PER_DAY, NOON_MINUTES
+from .UsefulFunctions import wisdom_dsv_lookup_array
+from .UsefulFunctions import tomcast_dsv_lookup_array
+from .DSVWriters import DSV_TEXT_FORMAT
+
+# CONSTANTS
+INVALID_VALUE = '-7999'
+FIELD_COUNT = AVG_WD_INDEX + 1
+# The numeric columns of mawp15.txt with their array type and the conversion used by WeatherStation.add_data.
+NUMERIC_COLUMNS = ((TEMP_INDEX, np.float64, float), (RH_INDEX, np.int64, int), (RAIN_INDEX, np.float64, float),
+                   (AVG_WS_INDEX, np.float64, float), (AVG_WD_INDEX, np.float64, float))
+
+
+"""
+Purpose: The class DailyColumns stores the per-day results of a StationColumns object. Every variable is a NumPy array
+with one value per noon-to-noon day, in the same order that WeatherStation stores its DailyData objects.
+
+Variables:
+    - day_number: The date of each day as the number of days since EPOCH (same as DailyData.get_date().date()).
+    - first_minute: The time stamp of the first data entry of each day, in minutes since EPOCH.
+    - period_size: The number of data entries for each day.
+    - wisdom_count/wisdom_avg/wisdom_dsv: The matching periods, average temperature and DSV from the Wisdom table.
+    - tomcast_count/tomcast_avg/tomcast_dsv: The matching periods, average temperature and DSV from the TomCast table.
+    - invalid_data_flag: Same meaning as WeatherStation.invalid_data_flag.
+"""
+
+
+class DailyColumns:
+
+    def __init__(self, day_number, first_minute, period_size, wisdom_count, wisdom_avg, tomcast_count, tomcast_avg,
+                 invalid_data_flag=False):
+        self.day_number = day_number
+        self.first_minute = first_minute
+        self.period_size = period_size
+        self.wisdom_count = wisdom_count
+        self.wisdom_avg = wisdom_avg
+        self.tomcast_count = tomcast_count
+        self.tomcast_avg = tomcast_avg
+        self.invalid_data_flag = invalid_data_flag
+        self.date_index = None
+
+        # Days missing more than 10 entries of data always have a DSV of 0.
+        complete = period_size > MIN_ALLOWABLE_PERIOD_SIZE
+        self.wisdom_dsv = np.where(complete, wisdom_dsv_lookup_array(wisdom_count, wisdom_avg), 0)
+        self.tomcast_dsv = np.where(complete, tomcast_dsv_lookup_array(tomcast_count, tomcast_avg), 0)
+
+    def get_size(self):
+        return len(self.day_number)
+
+    # Returns a new DailyColumns object with only the days from position start up to (not including) stop.
+    def get_days(self, start, stop=None):
+        period_size = self.period_size[start:stop]
+        return DailyColumns(self.day_number[start:stop], self.first_minute[start:stop], period_size,
+                            self.wisdom_count[start:stop], self.wisdom_avg[start:stop],
+                            self.tomcast_count[start:stop], self.tomcast_avg[start:stop],
+                            bool(np.any(period_size[:-1] <= MIN_ALLOWABLE_PERIOD_SIZE)))
+
+    def get_date(self, index):
+        return minutes_to_datetime(self.first_minute[index]) + timedelta(days=1)
+
+    # The DateIndex of the days, created the first time it is needed.
+    def get_date_index_map(self):
+        if self.date_index is None:
+            self.date_index = DateIndex()
+            epoch_ordinal = EPOCH.toordinal()
+            for position, day_number in enumerate(self.day_number.tolist()):
+                self.date_index.add(epoch_ordinal + day_number, position)
+        return self.date_index
+
+    """
+    Purpose: get_date_index returns the position of the first day with a date that matches the seed date. Just like
+    WeatherStation.get_date_index, missing_seed decides what happens if the seed date can't be found.
+    """
+    def get_date_index(self, seed_date, missing_seed=MISSING_SEED_END):
+        return self.get_date_index_map().find(seed_date.toordinal(), self.get_size(), missing_seed)
+
+
+"""
+Purpose: The class DSVSeries stores the daily and cumulative DSV of a station from a seed date onwards. The count and
+avg_temp arrays hold the values of whichever model (Wisdom or TomCast) was used for that day.
+"""
+
+
+class DSVSeries:
+
+    def __init__(self, station_id, day_number, daily_dsv, cumul_dsv, count, avg_temp):
+        self.station_id = station_id
+        self.day_number = day_number
+        self.daily_dsv = daily_dsv
+        self.cumul_dsv = cumul_dsv
+        self.count = count
+        self.avg_temp = avg_temp
+
+    def get_cumulative_dsv(self):
+        if len(self.cumul_dsv) == 0:
+            return 0
+        return int(self.cumul_dsv[-1])
+
+    """
+    Purpose: format_text returns the same text that WeatherStation.today_dsv_package writes for each day.
+    """
+    def format_text(self):
+        lines = []
+        for day_values in self.days():
+            lines.append(DSV_TEXT_FORMAT % ((self.station_id,) + day_values))
+        return "".join(lines)
+
+    # Yields the same values as WeatherStation.dsv_days for each day of the series.
+    def days(self):
+        for index in range(len(self.day_number)):
+            day_str = (EPOCH + timedelta(days=int(self.day_number[index]))).strftime("%Y-%m-%d")
+            yield day_str, self.daily_dsv[index], self.cumul_dsv[index], self.count[index], self.avg_temp[index]
+
+    # Passes each day of the series to a writer from DSVWriters.
+    def write_days(self, writer):
+        for day_values in self.days():
+            writer.write_day(self.station_id, *day_values)
+
+
+"""
+Purpose: The class StationColumns holds all 15 minute data of a single station as NumPy columns. It has the same
+today_dsv and today_dsv_package functions as WeatherStation, so either one can be used by show_all_stations_dsv.
+
+Variables:
+    - time: The time stamp of each data entry in minutes since EPOCH.
+    - temp, RH, rain, avg_ws, avg_wd: The columns of mawp15.txt.
+    - line_index: The position of each data entry within the station's raw lines, since invalid lines are skipped.
+    - daily: The DailyColumns object, created the first time it is needed.
+"""
+
+
+class StationColumns:
+
+    def __init__(self, name, time, temp, RH, rain, avg_ws, avg_wd, line_index=None):
+        self.id = name
+        self.time = time
+        self.temp = temp
+        self.RH = RH
+        self.rain = rain
+        self.avg_ws = avg_ws
+        self.avg_wd = avg_wd
+        if line_index is None:
+            line_index = np.arange(len(time))
+        self.line_index = line_index
+        self.daily = None
+
+    def get_id(self):
+        return self.id
+
+    def get_size(self):
+        return len(self.time)
+
+    @property
+    def invalid_data_flag(self):
+        return self.get_daily().invalid_data_flag
+
+    def get_daily(self):
+        if self.daily is None:
+            self.daily = self.calc_daily()
+        return self.daily
+
+    """
+    Purpose: day_starts returns the position of the first data entry of each day. A day starts with the first entry
+    that comes after 12:00 of the day after the current day's first entry, which is how WeatherStation.add_data
+    splits the data.
+    """
+    def day_starts(self):
+        size = len(self.time)
+        if size == 0:
+            return np.zeros(0, dtype=np.int64)
+        # Every entry is given the noon-to-noon window it belongs to, (D 12:00, D+1 12:00] is window D.
+        window = (self.time - (NOON_MINUTES + 1)) // MINUTES_PER_DAY
+        calendar_day = self.time // MINUTES_PER_DAY
+        # A new day can only start at an entry that is in a later window than every entry before it.
+        running_max = np.maximum.accumulate(window)
+        candidates = np.flatnonzero(np.concatenate(([True], window[1:] > running_max[:-1])))
+        is_start = np.ones(len(candidates), dtype=bool)
+        # A day that starts at or before 12:00 also takes in the following window, so the next candidate is skipped.
+        morning = calendar_day[candidates] == window[candidates] + 1
+        for index in np.flatnonzero(morning[:-1]):
+            if is_start[index] and window[candidates[index + 1]] == window[candidates[index]] + 1:
+                is_start[index + 1] = False
+        return candidates[is_start]
+
+    """
+    Purpose: calc_daily splits the columns into days and calculates the Wisdom and TomCast parameters for every day.
+    """
+    def calc_daily(self):
+        starts = self.day_starts()
+        size = len(self.time)
+        day_count = len(starts)
+        period_size = np.diff(np.append(starts, size))
+        day_id = np.repeat(np.arange(day_count), period_size)
+        position = np.arange(size) - starts[day_id]
+
+        wisdom_match = (self.temp >= WISDOM_LOW_TEMP_CUTOFF) & (self.RH >= RH_CUTOFF)
+        tomcast_match = (self.RH >= RH_CUTOFF) & (TOMCAST_LOW_TEMP_CUTOFF <= self.temp) & \
+                        (self.temp < TOMCAST_HIGH_TEMP_CUTOFF)
+
+        wisdom_count, wisdom_avg = period_averages(wisdom_match, self.temp, day_id, position, day_count, period_size)
+        tomcast_count, tomcast_avg = period_averages(tomcast_match, self.temp, day_id, position, day_count, period_size)
+
+        # WeatherStation flags the station once a day with too few entries is followed by another day.
+        invalid_data_flag = bool(np.any(period_size[:-1] <= MIN_ALLOWABLE_PERIOD_SIZE))
+
+        first_minute = self.time[starts]
+        return DailyColumns(first_minute // MINUTES_PER_DAY + 1, first_minute, period_size, wisdom_count, wisdom_avg,
+                            tomcast_count, tomcast_avg, invalid_data_flag)
+
+    """
+    Purpose: dsv_series calculates the daily and cumulative DSV from the seed date onwards. The Wisdom model is used
+    until the cumulative DSV reaches WISDOM_DSV_CUTOFF, and the TomCast model is used afterwards.
+    """
+    def dsv_series(self, seed_date):
+        daily = self.get_daily()
+        index = daily.get_date_index(seed_date)
+        return series_from_index(self.id, daily, index)
+
+    def today_dsv_package(self, seed_date):
+        series = self.dsv_series(seed_date)
+        return series.get_cumulative_dsv(), series.format_text()
+
+    """
+    Purpose: today_dsv returns the same values as WeatherStation.today_dsv. The DSV of the latest complete day is
+    calculated with the model matching the final cumulative DSV.
+    """
+    def today_dsv(self, seed_date):
+        daily = self.get_daily()
+        series = series_from_index(self.id, daily, daily.get_date_index(seed_date))
+        cumul_dsv = series.get_cumulative_dsv()
+        return latest_dsv(daily, cumul_dsv), cumul_dsv, series.format_text()
+
+    # Same as WeatherStation.write_dsv.
+    def write_dsv(self, seed_date, writer):
+        daily = self.get_daily()
+        series = series_from_index(self.id, daily, daily.get_date_index(seed_date))
+        series.write_days(writer)
+        cumul_dsv = series.get_cumulative_dsv()
+        return latest_dsv(daily, cumul_dsv), cumul_dsv
+
+
+"""
+Purpose: period_averages returns the number of matching periods and their average temperature for every day.
+The temperatures are summed with a cumulative sum along each day so that the floating point result is the same as
+adding them one at a time in DailyData.wisdom_params and DailyData.tomcast_params.
+"""
+
+
+def period_averages(match, temp, day_id, position, day_count, period_size):
+    counts = np.bincount(day_id, weights=match, minlength=day_count).astype(np.int64)
+    padded = np.zeros((day_count, int(period_size.max()) if day_count > 0 else 0))
+    padded[day_id, position] = np.where(match, temp, 0.0)
+    if padded.shape[1] == 0:
+        sums = np.zeros(day_count)
+    else:
+        sums = np.cumsum(padded, axis=1)[:, -1]
+    averages = np.zeros(day_count)
+    np.divide(sums, counts, out=averages, where=counts > 0)
+    return counts, averages
+
+
+"""
+Purpose: series_from_index builds the DSVSeries of a station starting at the day in position index. initial_cumul is
+the cumulative DSV before that day, which is used to continue a series that was calculated in an earlier run.
+"""
+
+
+def series_from_index(station_id, daily, index, initial_cumul=0):
+    wisdom_dsv = daily.wisdom_dsv[index:]
+    tomcast_dsv = daily.tomcast_dsv[index:]
+    complete = daily.period_size[index:] > MIN_ALLOWABLE_PERIOD_SIZE
+
+    # The model switches on the first day whose starting cumulative DSV is at least WISDOM_DSV_CUTOFF.
+    if initial_cumul >= WISDOM_DSV_CUTOFF:
+        switch = 0
+    else:
+        reached = np.flatnonzero(initial_cumul + np.cumsum(wisdom_dsv) >= WISDOM_DSV_CUTOFF)
+        switch = reached[0] + 1 if len(reached) > 0 else len(wisdom_dsv)
+
+    daily_dsv = np.concatenate((wisdom_dsv[:switch], tomcast_dsv[switch:]))
+    count = np.concatenate((daily.wisdom_count[index:][:switch], daily.tomcast_count[index:][switch:]))
+    avg_temp = np.concatenate((daily.wisdom_avg[index:][:switch], daily.tomcast_avg[index:][switch:]))
+
+    # Days with too few entries keep their initial count and average temperature.
+    count = np.where(complete, count, 0)
+    avg_temp = np.where(complete, avg_temp, 0.0)
+
+    return DSVSeries(station_id, daily.day_number[index:], daily_dsv, initial_cumul + np.cumsum(daily_dsv), count,
+                     avg_temp)
+
+
+# Returns the DSV of the latest complete day, using the model that matches the final cumulative DSV.
+def latest_dsv(daily, cumul_dsv):
+    if daily.period_size[-1] == MAXIMUM_PERIOD_SIZE:
+        latest = -1
+    else:
+        latest = -2
+    if cumul_dsv < WISDOM_DSV_CUTOFF:
+        return int(daily.wisdom_dsv[latest])
+    return int(daily.tomcast_dsv[latest])
+
+
+# Joins two DailyColumns objects, e.g. the days kept from an earlier run and the days calculated in this run.
+def concat_daily(first, second):
+    period_size = np.concatenate((first.period_size, second.period_size))
+    return DailyColumns(np.concatenate((first.day_number, second.day_number)),
+                        np.concatenate((first.first_minute, second.first_minute)), period_size,
+                        np.concatenate((first.wisdom_count, second.wisdom_count)),
+                        np.concatenate((first.wisdom_avg, second.wisdom_avg)),
+                        np.concatenate((first.tomcast_count, second.tomcast_count)),
+                        np.concatenate((first.tomcast_avg, second.tomcast_avg)),
+                        bool(np.any(period_size[:-1] <= MIN_ALLOWABLE_PERIOD_SIZE)))
+
+
+# Joins two DSVSeries objects of the same station.
+def concat_series(first, second):
+    return DSVSeries(first.station_id, np.concatenate((first.day_number, second.day_number)),
+                     np.concatenate((first.daily_dsv, second.daily_dsv)),
+                     np.concatenate((first.cumul_dsv, second.cumul_dsv)),
+                     np.concatenate((first.count, second.count)),
+                     np.concatenate((first.avg_temp, second.avg_temp)))
+
+
+"""
+Purpose: parse_station_lines converts the raw lines of one station into NumPy columns. Lines that can't be converted
+are skipped with the same message as WeatherStation.add_data.
+"""
+
+
+def parse_station_lines(station_id, lines, time_cache):
+    if len(lines) == 0:
+        return StationColumns(station_id, np.zeros(0, dtype=np.int64), np.zeros(0), np.zeros(0, dtype=np.int64),
+                              np.zeros(0), np.zeros(0), np.zeros(0), np.zeros(0, dtype=np.int64))
+    # Splitting all lines at once avoids creating a list for every line.
+    fields = ','.join(lines).split(',')
+    if len(fields) == len(lines) * FIELD_COUNT:
+        columns = [fields[index::FIELD_COUNT] for index in range(FIELD_COUNT)]
+    else:
+        columns = list(zip(*[each.split(',') for each in lines]))
+
+    # Time stamps that can't be parsed are stored as None so they are only tried once.
+    for time_stamp in set(columns[DATE_INDEX]).difference(time_cache):
+        try:
+            time_cache[time_stamp] = TIME_STAMP_PARSER.parse_minutes(time_stamp)
+        except ValueError:
+            time_cache[time_stamp] = None
+    time = [time_cache[each] for each in columns[DATE_INDEX]]
+    invalid = set(index for index, minutes in enumerate(time) if minutes is None)
+
+    converted = {}
+    for column, data_type, convert in NUMERIC_COLUMNS:
+        try:
+            converted[column] = np.array(columns[column], dtype=data_type)
+        except ValueError:
+            # Only look for the bad values one at a time if the whole column can't be converted.
+            for index, value in enumerate(columns[column]):
+                try:
+                    convert(value)
+                except ValueError:
+                    invalid.add(index)
+
+    line_index = np.arange(len(lines))
+    if len(invalid) > 0:
+        for _ in invalid:
+            print("Station data is invalid for %s. Skipping data entry for this time period." % station_id)
+        line_index = np.array([index for index in range(len(lines)) if index not in invalid], dtype=np.int64)
+        time = [time[index] for index in line_index]
+        for column, data_type, _ in NUMERIC_COLUMNS:
+            converted[column] = np.array([columns[column][index] for index in line_index], dtype=data_type)
+
+    return StationColumns(station_id, np.array(time, dtype=np.int64), converted[TEMP_INDEX], converted[RH_INDEX],
+                          converted[RAIN_INDEX], converted[AVG_WS_INDEX], converted[AVG_WD_INDEX], line_index)
+
+
+"""
+Purpose: group_station_lines reads a file in the mawp15.txt format and returns a dictionary of the raw lines for each
+station, keyed by station ID in the same order as initialize_stations. Lines are kept as strings until every line of
+a station is known. If start_offset is given (see OffsetIndex), the file is read from that byte offset.
+"""
+
+
+def group_station_lines(file_name='mawp15.txt', default_folder='input_data', start_offset=0):
+    station_lines = {}
+    for each in stream_text_file(file_name, default_folder, start_offset=start_offset):
+        data_list = each.split(',')
+        station_id = data_list[ID_INDEX]
+        # Check if station ID, temperature, and RH contain invalid values. If they do, then skip this data point.
+        if station_id != INVALID_VALUE and data_list[TEMP_INDEX] != INVALID_VALUE and \
+                data_list[RH_INDEX] != INVALID_VALUE:
+            station_lines.setdefault(station_id, []).append(each)
+    return station_lines
+
+
+# Returns a dictionary of StationColumns objects from a file in the mawp15.txt format.
+def load_station_columns(file_name='mawp15.txt', default_folder='input_data', start_offset=0):
+    time_cache = {}
+    stations_dict = {}
+    for station_id, lines in group_station_lines(file_name, default_folder, start_offset).items():
+        stations_dict[station_id] = parse_station_lines(station_id, lines, time_cache)
+    return stations_dict
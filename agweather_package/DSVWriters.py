@@ -0,0 +1,111 @@
+"""
+Created on Sun Oct 18 18:00:00 2026
+
+Purpose: DSVWriters contains the writers for the per-day DSV report (comparison.txt). Stations pass each day's DSV
+values to a writer as soon as they are calculated, and the writer sends them straight to a buffered file, so the
+report is written in a single pass no matter how many stations and days it has.
+
+Writers:
+    - TextDSVWriter: The 'Station: ... | Date: ...' format of comparison.txt.
+    - CSVDSVWriter: One CSV row per station and day.
+    - JSONLinesDSVWriter: One JSON object per line for each station and day.
+    - FieldCSVWriter: One CSV row per field (a BatchDSV SeedResult) for field_dsv.csv.
+
+Date modified: Sun Oct 18 2026
+"""
+
+import csv
+import json
+from abc import ABC, abstractmethod
+from .UsefulFunctions import get_path_dir
+
+# CONSTANTS
+WRITE_BUFFER_SIZE = 1024 * 1024
+DSV_TEXT_FORMAT = "Station: %s | Date: %s | Daily DSV: %s | Cumulative DSV: %s | Count: %s | Avg. Temp: %.2f\n"
+DSV_CSV_HEADER = ['Station', 'Date', 'Daily DSV', 'Cumulative DSV', 'Count', 'Avg. Temp']
+FIELD_DSV_HEADER = ['Field', 'Station', 'Seed Date', 'Cumulative DSV', 'Today DSV', 'Model', 'TomCast Start Date']
+
+
+"""
+Purpose: The class DSVWriter is the base class of the report writers. It opens the report file in raw_output_data
+with a large write buffer and can be used in a with statement so the file is always closed. Each writer must define
+write_day.
+"""
+
+
+class DSVWriter(ABC):
+
+    newline = None
+
+    def __init__(self, file_name, default_folder='raw_output_data'):
+        self.file = open(get_path_dir(default_folder, file_name), 'w', buffering=WRITE_BUFFER_SIZE,
+                         newline=self.newline)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    """
+    Purpose: write_day writes the DSV values of a single day. date_str is the day's date as YYYY-MM-DD.
+    """
+    @abstractmethod
+    def write_day(self, station_id, date_str, daily_dsv, cumul_dsv, count, avg_temp):
+        pass
+
+    def close(self):
+        self.file.close()
+
+
+class TextDSVWriter(DSVWriter):
+
+    def write_day(self, station_id, date_str, daily_dsv, cumul_dsv, count, avg_temp):
+        self.file.write(DSV_TEXT_FORMAT % (station_id, date_str, daily_dsv, cumul_dsv, count, avg_temp))
+
+
+class CSVDSVWriter(DSVWriter):
+
+    newline = ''
+    header = DSV_CSV_HEADER
+
+    def __init__(self, file_name, default_folder='raw_output_data'):
+        super(CSVDSVWriter, self).__init__(file_name, default_folder)
+        self.csv_obj = csv.writer(self.file, delimiter=',')
+        self.csv_obj.writerow(self.header)
+
+    def write_day(self, station_id, date_str, daily_dsv, cumul_dsv, count, avg_temp):
+        self.csv_obj.writerow([station_id, date_str, daily_dsv, cumul_dsv, count, "%.2f" % avg_temp])
+
+
+class JSONLinesDSVWriter(DSVWriter):
+
+    def write_day(self, station_id, date_str, daily_dsv, cumul_dsv, count, avg_temp):
+        # NumPy values are converted so that json can write them.
+        self.file.write(json.dumps({'station': station_id, 'date': date_str, 'daily_dsv': int(daily_dsv),
+                                    'cumulative_dsv': int(cumul_dsv), 'count': int(count),
+                                    'avg_temp': float("%.2f" % avg_temp)}) + '\n')
+
+
+# The CSV writer of show_field_dsv. Each row is the csv_row of a SeedResult from BatchDSV.
+class FieldCSVWriter(CSVDSVWriter):
+
+    header = FIELD_DSV_HEADER
+
+    def write_field(self, result):
+        self.csv_obj.writerow(result.csv_row())
+
+
+# The writer class and default file name of each report format.
+DSV_WRITERS = {'text': (TextDSVWriter, 'comparison.txt'), 'csv': (CSVDSVWriter, 'comparison.csv'),
+               'jsonl': (JSONLinesDSVWriter, 'comparison.jsonl')}
+
+
+# Returns a new writer for the report format ('text', 'csv' or 'jsonl').
+def make_dsv_writer(report_format='text', file_name=None, default_folder='raw_output_data'):
+    if report_format not in DSV_WRITERS:
+        raise ValueError("Unknown DSV report format: %s. Use one of %s." % (report_format, ', '.join(DSV_WRITERS)))
+    writer_class, default_name = DSV_WRITERS[report_format]
+    if file_name is None:
+        file_name = default_name
+    return writer_class(file_name, default_folder)
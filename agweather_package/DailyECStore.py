@@ -0,0 +1,196 @@
+"""
+Created on Sun Oct 18 23:00:00 2026
+
+Purpose: DailyECStore keeps the rows of DailyEC.csv in an SQLite database (DailyEC.db next to DailyEC.csv), indexed by
+station ID and date. New days and backfilled values are written to the database with upserts, so adding a day only
+touches the rows of that day, and running the same update twice leaves the same rows. DailyEC.csv is written from the
+database once at the end of a run, with the stations in the same order as before and each station's rows in order
+of date.
+
+DailyEC.csv stays the file that is uploaded and reviewed. The database stores the size and modification time of the
+CSV file it last read or wrote, and reads the CSV file again if it has changed since (e.g. after it was edited by
+hand).
+
+Date modified: Sun Oct 18 2026
+"""
+
+import os
+import csv
+import sqlite3
+from datetime import datetime, timedelta
+from .UsefulClasses import GroupedArray
+
+# CONSTANTS
+DAILY_EC_HEADER = ['StationID', 'StationName', 'Date', 'Tmax', 'Tmin', 'Precip']
+DAILY_EC_COLUMNS = len(DAILY_EC_HEADER)
+STORE_SUFFIX = '.db'
+STORE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS stations (station_id TEXT PRIMARY KEY, station_name TEXT, position INTEGER);
+CREATE TABLE IF NOT EXISTS daily_ec (station_id TEXT, date TEXT, tmax TEXT, tmin TEXT, precip TEXT,
+                                     PRIMARY KEY (station_id, date)) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS daily_ec_date ON daily_ec (date);
+CREATE TABLE IF NOT EXISTS source (name TEXT PRIMARY KEY, value REAL);
+"""
+
+
+"""
+Purpose: The class DailyECStore is an open DailyEC database. Rows are lists in the DailyEC.csv format, with the station
+ID starting with 'C' (e.g. ['CYQD', 'THE PAS', '2022-05-01', '5.7', '-0.9', '0']). The name of each station is stored
+once, from the first row of the station that is added.
+"""
+
+
+class DailyECStore:
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+        self.connection = sqlite3.connect(db_path)
+        self.connection.executescript(STORE_SCHEMA)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def close(self):
+        self.connection.close()
+
+    def get_size(self):
+        return self.connection.execute("SELECT COUNT(*) FROM daily_ec").fetchone()[0]
+
+    """
+    Purpose: add_station adds a station after the existing ones. Stations that are already in the store keep their
+    name and position.
+    """
+    def add_station(self, station_id, station_name):
+        self.connection.execute("INSERT OR IGNORE INTO stations VALUES (?, ?, (SELECT COUNT(*) FROM stations))",
+                                (station_id, station_name))
+
+    # Adds the rows, or replaces the values of rows that already exist for the same station and date.
+    def upsert_rows(self, rows):
+        with self.connection:
+            for row in rows:
+                row = list(row) + [''] * (DAILY_EC_COLUMNS - len(row))
+                self.add_station(row[0], row[1])
+                self.connection.execute("""INSERT INTO daily_ec VALUES (?, ?, ?, ?, ?)
+                                           ON CONFLICT (station_id, date) DO UPDATE SET tmax = excluded.tmax,
+                                           tmin = excluded.tmin, precip = excluded.precip""",
+                                        (row[0], row[2], row[3], row[4], row[5]))
+
+    # Returns a dictionary of the latest date (YYYY-MM-DD) of each station.
+    def get_last_dates(self):
+        return dict(self.connection.execute("SELECT station_id, MAX(date) FROM daily_ec GROUP BY station_id"))
+
+    """
+    Purpose: get_missing_dates returns the dates after the latest date that every station has, up to and including
+    end_date (YYYY-MM-DD). An empty store returns [end_date].
+    """
+    def get_missing_dates(self, end_date):
+        last_dates = self.get_last_dates()
+        if len(last_dates) == 0:
+            return [end_date]
+        day = datetime.strptime(min(last_dates.values()), '%Y-%m-%d') + timedelta(days=1)
+        end_day = datetime.strptime(end_date, '%Y-%m-%d')
+        dates = []
+        while day <= end_day:
+            dates.append(day.strftime('%Y-%m-%d'))
+            day += timedelta(days=1)
+        return dates
+
+    # Returns the rows on or after start_date (YYYY-MM-DD) that are missing Tmax, Tmin or Precip.
+    def get_incomplete_rows(self, start_date):
+        return [list(row) for row in self.connection.execute(
+            "SELECT d.station_id, s.station_name, d.date, d.tmax, d.tmin, d.precip FROM daily_ec d "
+            "JOIN stations s ON s.station_id = d.station_id WHERE d.date >= ? AND "
+            "(TRIM(d.tmax) = '' OR TRIM(d.tmin) = '' OR TRIM(d.precip) = '') ORDER BY d.date, s.position",
+            (start_date,))]
+
+    """
+    Purpose: get_gaps returns a GroupedArray of every date in the lookback_days days up to and including end_date
+    (YYYY-MM-DD) that has a missing row, or a row with an empty Tmax, Tmin or Precip, for at least one station. Each
+    date holds the IDs of those stations without the leading 'C'. The rows of the window are read in a single query.
+    Dates after the latest date in the store are left out, since update_dailyEC adds those days.
+    """
+    def get_gaps(self, end_date, lookback_days):
+        gaps = GroupedArray(is_scalar=True)
+        last_dates = self.get_last_dates()
+        if len(last_dates) == 0:
+            return gaps
+        end_day = datetime.strptime(min(end_date, max(last_dates.values())), '%Y-%m-%d')
+        dates = [(end_day - timedelta(days=days_back)).strftime('%Y-%m-%d')
+                 for days_back in range(lookback_days - 1, -1, -1)]
+        complete = set(self.connection.execute(
+            "SELECT station_id, date FROM daily_ec WHERE date BETWEEN ? AND ? AND TRIM(tmax) != '' AND "
+            "TRIM(tmin) != '' AND TRIM(precip) != ''", (dates[0], dates[-1])))
+        station_ids = [row[0] for row in self.connection.execute("SELECT station_id FROM stations ORDER BY position")]
+        for each_date in dates:
+            for station_id in station_ids:
+                if (station_id, each_date) not in complete:
+                    gaps.insert_data(each_date, station_id[1:])
+        return gaps
+
+    # Yields every row in the order of DailyEC.csv: stations in the order they were added, dates in order.
+    def iter_rows(self):
+        for row in self.connection.execute(
+                "SELECT d.station_id, s.station_name, d.date, d.tmax, d.tmin, d.precip FROM daily_ec d "
+                "JOIN stations s ON s.station_id = d.station_id ORDER BY s.position, d.date"):
+            yield list(row)
+
+    """
+    Purpose: import_csv replaces the contents of the store with the rows of a DailyEC.csv file, or empties the store
+    if the file doesn't exist.
+    """
+    def import_csv(self, csv_path):
+        with self.connection:
+            self.connection.execute("DELETE FROM daily_ec")
+            self.connection.execute("DELETE FROM stations")
+        try:
+            with open(csv_path, 'r', newline='') as csv_file:
+                csv_contents = csv.reader(csv_file, delimiter=',')
+                next(csv_contents, None)
+                self.upsert_rows(row for row in csv_contents if len(row) > 0)
+        except IOError:
+            pass
+        self.save_source(csv_path)
+
+    # Writes every row to a DailyEC.csv file. The file is written to a temporary file first and then moved into place.
+    def export_csv(self, csv_path):
+        temp_path = csv_path + '.tmp'
+        with open(temp_path, 'w', newline='') as csv_file:
+            daily_ec = csv.writer(csv_file, delimiter=',')
+            daily_ec.writerow(DAILY_EC_HEADER)
+            daily_ec.writerows(self.iter_rows())
+        os.replace(temp_path, csv_path)
+        self.save_source(csv_path)
+
+    # Saves the size and modification time of the CSV file the store matches.
+    def save_source(self, csv_path):
+        with self.connection:
+            self.connection.execute("DELETE FROM source")
+            if os.path.exists(csv_path):
+                stats = os.stat(csv_path)
+                self.connection.executemany("INSERT INTO source VALUES (?, ?)",
+                                            [('size', stats.st_size), ('mtime', stats.st_mtime)])
+
+    # Returns True if the CSV file is the same as when the store last read or wrote it.
+    def matches_source(self, csv_path):
+        source = dict(self.connection.execute("SELECT name, value FROM source"))
+        if not os.path.exists(csv_path):
+            return len(source) == 0 and self.get_size() == 0
+        stats = os.stat(csv_path)
+        return source.get('size') == stats.st_size and source.get('mtime') == stats.st_mtime
+
+
+"""
+Purpose: open_daily_ec_store opens the database of a DailyEC.csv file, reading the CSV file into it first if the
+database is new or the CSV file has changed since the database last read or wrote it.
+"""
+
+
+def open_daily_ec_store(csv_path="DailyEC.csv"):
+    store = DailyECStore(os.path.splitext(csv_path)[0] + STORE_SUFFIX)
+    if not store.matches_source(csv_path):
+        print("Reading %s into %s." % (csv_path, store.db_path))
+        store.import_csv(csv_path)
+    return store
@@ -0,0 +1,148 @@
+"""
+Created on Sun Oct 18 22:00:00 2026
+
+Purpose: DailyPipeline runs the dailyUpload option of AgAuto. Updating DailyEC.csv and downloading and cleaning
+mawp24raw.txt and mawp60raw.txt spend most of their time waiting on the network and don't use each other's files, so
+they are run at the same time in a small pool of threads. Each stage catches its own errors, so one failed download
+doesn't stop the other stages, and the files are only copied to the upload folder once every stage has finished
+without an error.
+
+The time taken by each stage and by the whole run is printed at the end. The options of the run are set in
+config_files/pipeline_options.yaml (see load_pipeline_options).
+
+Date modified: Sun Oct 18 2026
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+from os import getcwd, path
+from subprocess import call
+from time import perf_counter, sleep
+from .DailyUpload import back_fill_daily_ec_store
+from .DailyUpload import update_dailyEC
+from .DailyUpload import download_and_clean
+from .DailyUpload import gen_Bat_file
+from .DailyUpload import in_managed_environment
+from .DailyECStore import open_daily_ec_store
+from .StationRegistry import read_yaml_dict
+from .UsefulFunctions import get_path_dir
+
+# CONSTANTS
+# One thread per stage. Lowering this runs the stages with fewer connections open at once.
+PIPELINE_WORKERS = 3
+MAWP_FILES = ['mawp24raw.txt', 'mawp60raw.txt']
+BATCH_FILE = 'AgAuto_batch.bat'
+MANAGED_ENVIRONMENT_WAIT = 4
+PIPELINE_OPTIONS_FILE = 'pipeline_options.yaml'
+PIPELINE_OPTIONS = {'workers': PIPELINE_WORKERS, 'incremental': False, 'publish': True}
+
+
+"""
+Purpose: The class StageResult stores how long a stage took and the error it stopped with, if any.
+"""
+
+
+class StageResult:
+
+    def __init__(self, name, seconds, error=None):
+        self.name = name
+        self.seconds = seconds
+        self.error = error
+
+    def succeeded(self):
+        return self.error is None
+
+
+# Runs a single stage and returns its StageResult. Errors are printed and stored instead of being raised.
+def run_stage(name, function, args=()):
+    start = perf_counter()
+    error = None
+    try:
+        function(*args)
+    except Exception as stage_error:
+        error = stage_error
+        print("Stage %s failed: %s" % (name, stage_error))
+    return StageResult(name, perf_counter() - start, error)
+
+
+"""
+Purpose: run_stages runs a list of (name, function, args) stages at the same time with at most workers threads, and
+returns their StageResult objects in the same order as the stages once all of them have finished.
+"""
+
+
+def run_stages(stages, workers=PIPELINE_WORKERS):
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+        futures = [executor.submit(run_stage, name, function, args) for name, function, args in stages]
+        return [future.result() for future in futures]
+
+
+# Backfills and updates DailyEC.csv. Both steps change the same rows, so they stay one stage run in order, and the CSV
+# file is written once at the end.
+def update_daily_ec_stage(default_file="DailyEC.csv"):
+    with open_daily_ec_store(default_file) as store:
+        back_fill_daily_ec_store(store)
+        update_dailyEC(default_file, store)
+        store.export_csv(default_file)
+
+
+# Copies DailyEC.csv, mawp24raw.txt and mawp60raw.txt to the upload folder once it can be reached.
+def publish_daily_upload():
+    gen_Bat_file()
+    while not in_managed_environment():
+        sleep(MANAGED_ENVIRONMENT_WAIT)
+    call(path.join(getcwd(), BATCH_FILE))
+
+
+# Prints the time taken by each stage and by the whole run.
+def print_stage_times(results, total_seconds):
+    print("%-16s %-8s %10s" % ('Stage', 'Status', 'Time (s)'))
+    for result in results:
+        print("%-16s %-8s %10.2f" % (result.name, 'done' if result.succeeded() else 'FAILED', result.seconds))
+    print("%-16s %-8s %10.2f" % ('Total', '', total_seconds))
+
+
+"""
+Purpose: daily_upload runs the stages of the dailyUpload option and then copies the files to the upload folder. It
+returns the list of StageResult objects, with the publish stage last if it was run.
+
+Parameters:
+    - workers: The most stages that are run at the same time.
+    - incremental: Passed to download_and_clean for the mawp files, so only their new rows are downloaded. Only
+    mawp60raw.txt is followed, since mawp24raw.txt is grouped by station and follow_raw_file downloads it whole.
+    - publish: If False, the files are not copied to the upload folder.
+"""
+
+
+def daily_upload(workers=PIPELINE_WORKERS, incremental=False, publish=True):
+    start = perf_counter()
+    stages = [('DailyEC.csv', update_daily_ec_stage, ())]
+    for file_name in MAWP_FILES:
+        stages.append((file_name, download_and_clean, (file_name, incremental)))
+    results = run_stages(stages, workers)
+
+    if publish:
+        failed = [result.name for result in results if not result.succeeded()]
+        if len(failed) > 0:
+            print("Not copying files to the upload folder since these stages failed: %s" % ', '.join(failed))
+        else:
+            results.append(run_stage('publish', publish_daily_upload))
+
+    print_stage_times(results, perf_counter() - start)
+    return results
+
+
+"""
+Purpose: load_pipeline_options returns the keyword arguments of daily_upload from config_files/pipeline_options.yaml,
+which is how AgAuto's dailyUpload option is set up. Options that are missing or blank keep their default from
+PIPELINE_OPTIONS, and unknown options are ignored with a warning.
+"""
+
+
+def load_pipeline_options(file_name=PIPELINE_OPTIONS_FILE, default_folder='config_files'):
+    options = dict(PIPELINE_OPTIONS)
+    for name, value in read_yaml_dict(get_path_dir(default_folder, file_name)).items():
+        if name not in PIPELINE_OPTIONS:
+            print("Unknown option %s in %s. It will be ignored." % (name, file_name))
+        elif value is not None:
+            options[name] = value
+    return options
@@ -12,15 +12,17 @@ Date modified: Fri May 31 2019
 from .xml_parser import*
 from .UsefulFunctions import get_path_dir
 from .UsefulFunctions import download_file
+from .UsefulFunctions import save_download_metadata
+from .UsefulFunctions import DOWNLOAD_TIMEOUT
 from datetime import date, timedelta, datetime
 from tqdm import tqdm
 from os import getcwd, path
-from .UsefulClasses import GroupedArray
-from .UsefulFunctions import chunks
-from .UsefulFunctions import increment_all_date_str
+from .HttpClient import get_http_client
+from .DailyECStore import open_daily_ec_store
+import os
+import re
 import csv
-import yaml
-import concurrent.futures
+import json
 from datetime import datetime
 from time import time
 
@@ -33,7 +35,19 @@ CSV_DATE_INDEX = 2
 CSV_DESC_INDEX = 1
 HEADER_OFFSET_INDEX = 1
 STATION_ID_INDEX = 0
-EARLIEST_DAYS_LIMIT = 2
+# EC only keeps about this many days of yesterday XML files on the datamart, so backfill can't look further back.
+DATAMART_RETENTION_DAYS = 25
+BACKFILL_LOOKBACK_DAYS = DATAMART_RETENTION_DAYS
+# The fields of the yesterday XML files that are read to backfill DailyEC.csv.
+BACKFILL_FIELDS = ['air_temperature_yesterday_high', 'air_temperature_yesterday_low', 'total_precipitation']
+# cleanData settings. A missing value is a whole field of -7999, -99 or NAN, with or without quotes.
+CLEAN_BLOCK_SIZE = 64 * 1024
+CLEAN_TEMP_SUFFIX = '.tmp'
+MISSING_VALUE_PATTERN = re.compile(r'(?<![^,\n])("?)(?:-7999|-99|NAN)\1(?![^,\n])')
+EMPTY_LINE_PATTERN = re.compile(r'^\n', re.MULTILINE)
+MAWP_URL_ROOT = 'https://mbagweather.ca/partners/mbag'
+# The incremental mode of cleanData saves how far it has read the raw file in a file next to the cleaned file.
+TAIL_STATE_SUFFIX = '.tail.json'
 
 """
 Purpose: update_dailyEC updates the DailyEC.csv file with new weather station
@@ -47,44 +61,29 @@ Parameters:
         same working directory as the script. Can set this parameter to any
         csv file name as long as the files contents follow the same format
         as DailyEC.
+        store - An open DailyECStore to add the new days to. If it is None, the store of default_file is opened and
+        written back to default_file at the end. If a store is given, the caller writes it with export_csv.
 """
 
 
-def update_dailyEC(default_file="DailyEC.csv"):
+def update_dailyEC(default_file="DailyEC.csv", store=None):
     # strdate_dash is yesterday's date, whereby each field is separated by a '-' (E.g. "2019-05-21").
     strdate_dash = (date.today() - timedelta(days=1)).strftime("%Y-%m-%d")
 
-    # daily_contents is initialized as the csv header. Will need this if 'DailyEC.csv' doesn't exist.
-    daily_contents = [["StationID", "StationName", "Date", "Tmax", "Tmin", "Precip"]]
-
-    # Try opening 'DailyEC.csv' and read its contents. The csv file is created if it doesn't exist.
-    # The csv file is created at the end of the getUpdatedDailyData function.
-    try:
-        daily_csv = open(default_file, 'r')
-        daily_contents = list(csv.reader(daily_csv, delimiter=','))
-        daily_csv.close()
-    except IOError:
+    own_store = store is None
+    if own_store:
+        store = open_daily_ec_store(default_file)
+    if store.get_size() == 0:
         print("No DailyEC.csv found. Creating new csv file and appending.")
 
-    # If daily_contents contains data other than the headers, then insert summary data under the right locations.
-    if len(daily_contents) > 1:
-
-        # If the process hasn't been ran for more than 1 day, 'dates' contains more dates than just yesterday's date.
-        dates = getEarlyDates(daily_contents, strdate_dash)
+    # If the process hasn't been ran for more than 1 day, this contains more dates than just yesterday's date.
+    # Loops through every date where the dailyUpload program doesn't have data for.
+    for each_date in store.get_missing_dates(strdate_dash):
+        getUpdatedDailyData(urlroot, each_date, store)
 
-        # Loops through every date where the dailyUpload program doesn't have data for.
-        for each_date in dates:
-            updated_daily_contents = [daily_contents.pop(0)]
-            getUpdatedDailyData(urlroot, each_date, daily_contents, updated_daily_contents)
-            daily_csv = open(default_file, 'r')
-            daily_contents = list(csv.reader(daily_csv, delimiter=','))
-            daily_csv.close()
-
-    # If daily_contents only contains the headers, then get latest data for each station in 'stations.txt'.
-    # Append latest station data to newly created 'DailyEC.csv'.
-    else:
-        updated_daily_contents = [daily_contents.pop(0)]
-        getUpdatedDailyData(urlroot, strdate_dash, daily_contents, updated_daily_contents)
+    if own_store:
+        store.export_csv(default_file)
+        store.close()
 
 
 """
@@ -99,6 +98,7 @@ Parameters:
 def dict_summary(csv_file):
     summary_dict = {}
     read_csv = csv.reader(csv_file, delimiter=',')
+    ec_station_ids = set(get_EC_station_ids(need_alternative=True))
 
     # Loops through each line of the 'output.csv' file and extracts only the date we want.
     for line in read_csv:
@@ -107,7 +107,7 @@ def dict_summary(csv_file):
         precip = line[PRECIP]
         station_id = line[1].strip()
 
-        if check_station(station_id, get_EC_station_ids(need_alternative=True)):
+        if check_station(station_id, ec_station_ids):
             if (max_temp == "" or min_temp == "" or precip == "") and station_id != "" and station_id != "WPO":
                 print("Empty fields exist for station ID: %s. Please review Daily EC" % station_id)
             if precip.strip() == "Trace":
@@ -126,30 +126,22 @@ the desired station ID, the function will return yesterday's max temp, min temp,
 
 Parameters:
     station_id - The desired station ID. Note: Some station ID's listed in "stations.txt" are different ID's than
-    what is listed in the datamart's xml. IF statements are present throughout the function that maps to the correct ID
-    in order to avoid a dictionary key error.
+    what is listed in the datamart's xml. Their ID in the datamart is the alternative_id in stations_dailyec.yaml.
+    Stations with fallback_to_own_id use their own ID if the alternative ID has no data or is missing some of it.
     summary_dict - This parameter contains the output from the function dict_summary.
 """
 
 
 def get_correct_data(station_id, summary_dict, str_date):
     correct_data = ["", "", ""]
+    registry = get_station_registry()
+    alternative_id = registry.get_alternative(station_id)
 
     try:
-        if station_id == "YPG":
-            correct_data = summary_dict["WPG"]
-        elif station_id == "YGM":
-            correct_data = summary_dict["PGH"]
-        elif station_id == "YWG":
-            correct_data = summary_dict["XWG"]
-        elif station_id == "YQD":
-            correct_data = find_alternative_data("PQD", "YQD", summary_dict)
-        elif station_id == "YDN":
-            correct_data = summary_dict["WZT"]
-        elif station_id == "YBR":
-            correct_data = summary_dict["PBO"]
+        if registry.has_fallback(station_id):
+            correct_data = find_alternative_data(alternative_id, station_id, summary_dict)
         else:
-            correct_data = summary_dict[station_id]
+            correct_data = summary_dict[alternative_id]
     except KeyError:
         print("KeyError for %s. No data was found at this station for %s." % (station_id, str_date))
 
@@ -157,14 +149,7 @@ def get_correct_data(station_id, summary_dict, str_date):
 
 
 def get_alternative_station(default_id):
-    alternative_id = default_id
-    with open(get_path_dir('config_files', 'stations_dailyec.yaml'), 'r') as stations:
-        yaml_load = yaml.safe_load(stations)
-        if default_id in list(yaml_load.keys()):
-            possible_alternative_id = yaml_load[default_id]['alternative_id']
-        if possible_alternative_id != 'NONE':
-            alternative_id = possible_alternative_id
-    return alternative_id
+    return get_station_registry().get_alternative(default_id)
 
 
 def find_alternative_data(desired_station, alternative_station, summary_dict):
@@ -189,28 +174,14 @@ wish to add or remove stations, refer to this text file.
 
 
 def get_EC_stations():
-    stations_dict = {}
-    with open(get_path_dir('config_files', 'stations_dailyec.yaml'), 'r') as stations:
-        yaml_load = yaml.safe_load(stations)
-        for each_station in yaml_load:
-            stations_dict[each_station] = yaml_load[each_station]
-
-    return stations_dict
+    return dict(get_station_registry().daily_ec_stations)
 
 
 def get_EC_station_ids(need_alternative=False):
-    yaml_contents = get_EC_stations()
-    station_ids = []
-    for station_id in yaml_contents.keys():
-        alternative_id = yaml_contents[station_id]['alternative_id']
-        if need_alternative and alternative_id != "NONE":
-            correct_id = alternative_id
-        else:
-            correct_id = station_id
-        station_id = correct_id
-        station_ids.append(station_id)
-
-    return station_ids
+    registry = get_station_registry()
+    if need_alternative:
+        return [registry.get_alternative(station_id) for station_id in registry.daily_ec_stations]
+    return list(registry.daily_ec_stations)
 
 
 """
@@ -219,38 +190,226 @@ Purpose: cleanData's purpose is to open filename (which could be "mawp24raw.txt)
 
 Parameters:
     filename - this parameter is the file name of the text file to be cleaned.
+    incremental - If True, only the rows added to the file since the last run are downloaded and cleaned, see
+    follow_raw_file.
 """
 
 
-def cleanData(filename):
+def cleanData(filename, incremental=False):
     # Change this later to a more general case. Maybe user input?
     try:
-        download_file('https://mbagweather.ca/partners/mbag' + '/' + filename,  filename, "")
-        file_wip = open(filename, "r")
-        new_contents = ""
+        download_and_clean(filename, incremental)
+
+    except IOError as io:
+        print(io)
+        print("mawp24raw.txt or mawp60raw.txt were not found. Please check directory.")
 
-        count = 0
 
-        for line in file_wip:
-            count += 1
+# Does the work of cleanData without catching any errors, so the caller can tell if it failed.
+def download_and_clean(filename, incremental=False):
+    if incremental:
+        follow_raw_file(MAWP_URL_ROOT + '/' + filename, filename, "")
+    else:
+        rebuild_clean_file(MAWP_URL_ROOT + '/' + filename, filename, "", force=False)
 
-        file_wip.seek(0)
 
-        for line in tqdm(file_wip, desc="Cleaning %s" % filename, total=count):
+"""
+Purpose: clean_missing_values removes the missing values in MISSING_VALUE_PATTERN from a block of complete lines, and
+drops the empty lines. Missing values are only removed when they are a whole field (e.g. "-99" but not "-99.5"), and
+quoted values like '"NAN"' keep their quotes.
+"""
 
-            # If the length of the line is less than or equal to 1, then don't add it to the output.
-            if len(line) > 1:
-                append_line = line.replace("-7999", "").replace("-99", "").replace("NAN", "")
-                new_contents = new_contents + append_line
 
-        file_wip.close()
-        file_wip = open(filename, 'w')
-        file_wip.write(new_contents)
-        file_wip.close()
+def clean_missing_values(block):
+    return MISSING_VALUE_PATTERN.sub(r'\1\1', EMPTY_LINE_PATTERN.sub('', block))
 
-    except IOError as io:
-        print(io)
-        print("mawp24raw.txt or mawp60raw.txt were not found. Please check directory.")
+
+"""
+Purpose: clean_file cleans a file in a single pass. The file is read in blocks of CLEAN_BLOCK_SIZE, each block is
+cleaned up to its last complete line, and the result is written to a temporary file that replaces the original file
+once it is complete, so the file is never left half cleaned.
+
+Parameters:
+    file_name - The text file to clean (e.g. mawp24raw.txt).
+    default_folder - The folder of the file, the working directory by default.
+    output_name - The file to write the cleaned data to. Defaults to file_name, which cleans the file in place.
+"""
+
+
+def clean_file(file_name, default_folder="", output_name=None):
+    if output_name is None:
+        output_name = file_name
+    output_path = get_path_dir(default_folder, output_name)
+    temp_path = output_path + CLEAN_TEMP_SUFFIX
+
+    with open(get_path_dir(default_folder, file_name, create=False), 'r') as raw_file, \
+            open(temp_path, 'w') as clean_file_obj:
+        remainder = ''
+        while True:
+            block = raw_file.read(CLEAN_BLOCK_SIZE)
+            if not block:
+                break
+            block = remainder + block
+            # The last line of the block may be cut off, so it is cleaned with the next block.
+            end = block.rfind('\n') + 1
+            remainder = block[end:]
+            clean_file_obj.write(clean_missing_values(block[:end]))
+        # A last line without a line break is kept unless it is a single character, the same as cleanData has always
+        # done.
+        if len(remainder) > 1:
+            clean_file_obj.write(clean_missing_values(remainder))
+
+    os.replace(temp_path, output_path)
+
+
+# Returns the time stamp (the first field) of a row of mawp24raw.txt or mawp60raw.txt without its quotes.
+def row_timestamp(line):
+    return line.split(',', 1)[0].strip('"')
+
+
+# Returns the saved position of the incremental mode for a cleaned file, or an empty dictionary if there is none.
+def load_tail_state(file_path):
+    try:
+        with open(file_path + TAIL_STATE_SUFFIX, 'r') as state_file:
+            return json.load(state_file)
+    except (IOError, ValueError):
+        return {}
+
+
+def save_tail_state(file_path, state):
+    with open(file_path + TAIL_STATE_SUFFIX, 'w') as state_file:
+        json.dump(state, state_file)
+
+
+# Returns True if the time stamps of the rows of a raw file never go backwards, i.e. new rows can only be added to the
+# end of the file. mawp24raw.txt is grouped by station, with each station's rows in time order, so its time stamps go
+# back to the first day at the start of every station and new rows are added inside every station's block.
+def is_append_only(file_path):
+    last_timestamp = ''
+    with open(file_path, 'r') as raw_file:
+        for line in raw_file:
+            if line.strip() == '':
+                continue
+            timestamp = row_timestamp(line)
+            if timestamp < last_timestamp:
+                return False
+            last_timestamp = timestamp
+    return True
+
+
+"""
+Purpose: raw_tail_state returns the position of the end of a freshly downloaded raw file for the incremental mode:
+the byte offset after its last complete row, the last complete row itself and its time stamp, and whether new rows
+are only ever added to the end of the file (see is_append_only). A last row without a line break is still being
+written upstream, so it is cut off here and picked up by the next run instead.
+"""
+
+
+def raw_tail_state(url, file_path):
+    with open(file_path, 'rb+') as raw_file:
+        size = raw_file.seek(0, os.SEEK_END)
+        start = max(0, size - CLEAN_BLOCK_SIZE)
+        raw_file.seek(start)
+        tail = raw_file.read()
+        end = tail.rfind(b'\n') + 1
+        if start + end < size:
+            raw_file.truncate(start + end)
+    last_line = tail[tail.rfind(b'\n', 0, max(end - 1, 0)) + 1:end].decode()
+    return {'url': url, 'offset': start + end, 'last_line': last_line, 'last_timestamp': row_timestamp(last_line),
+            'append_only': is_append_only(file_path)}
+
+
+"""
+Purpose: rebuild_clean_file downloads the whole raw file, saves its position for the incremental mode and cleans it in
+place.
+
+Parameters:
+    force - If False, download_file only downloads the file if it changed since the last download. If True, the file
+    is always downloaded again.
+"""
+
+
+def rebuild_clean_file(url, file_name, default_folder="", force=True):
+    file_path = get_path_dir(default_folder, file_name)
+    if force:
+        # Without the saved ETag and Last-Modified headers the server always sends the whole file.
+        save_download_metadata(file_path, {})
+    if download_file(url, file_name, default_folder):
+        save_tail_state(file_path, raw_tail_state(url, file_path))
+    clean_file(file_name, default_folder)
+
+
+# Returns the bytes of the raw file at url from byte offset start onwards, or None if the file is now shorter than that.
+def fetch_raw_tail(url, start):
+    # Byte ranges only line up with the file if it isn't compressed on the way.
+    headers = {'Range': 'bytes=%d-' % start, 'Accept-Encoding': 'identity'}
+    with get_http_client().request(url, headers=headers, timeout=DOWNLOAD_TIMEOUT) as r:
+        if r.status_code == 416:
+            return None
+        r.raise_for_status()
+        if r.status_code == 206:
+            return r.content
+        # The server ignored the range and sent the whole file.
+        if len(r.content) < start:
+            return None
+        return r.content[start:]
+
+
+"""
+Purpose: follow_raw_file keeps a cleaned file up to date with a raw file that only grows by rows being appended to it
+(mawp24raw.txt and mawp60raw.txt). Only the rows after the saved position are downloaded, cleaned and appended to the
+cleaned file. The last row that was read before is downloaded again with them and compared to the saved copy, and the
+time stamp of the first new row is checked against the saved one. If either doesn't match, the raw file was rewritten
+instead of appended to, and the whole file is downloaded and cleaned again with rebuild_clean_file.
+
+A file that isn't in time order (e.g. mawp24raw.txt, which is grouped by station) gets new rows inside the file
+instead of at its end, so it can't be followed. It is downloaded and cleaned the same as without the incremental
+mode, without asking for its tail first.
+
+Parameters:
+    url - The URL of the raw file.
+    file_name - The cleaned file, which is also where the raw file is downloaded to when it is rebuilt.
+    default_folder - The folder of the file, the working directory by default.
+"""
+
+
+def follow_raw_file(url, file_name, default_folder=""):
+    file_path = get_path_dir(default_folder, file_name)
+    state = load_tail_state(file_path)
+    if state.get('url') != url or not os.path.exists(file_path):
+        print("No saved position for %s. Downloading the whole file." % file_name)
+        rebuild_clean_file(url, file_name, default_folder)
+        return
+    if not state.get('append_only', False):
+        print("%s is not in time order, so only whole downloads are used." % file_name)
+        rebuild_clean_file(url, file_name, default_folder, force=False)
+        return
+
+    last_line = state['last_line'].encode()
+    tail = fetch_raw_tail(url, state['offset'] - len(last_line))
+    if tail is None or not tail.startswith(last_line):
+        print("%s was rewritten since it was last cleaned. Downloading the whole file." % file_name)
+        rebuild_clean_file(url, file_name, default_folder)
+        return
+
+    tail = tail[len(last_line):]
+    # Only complete rows are cleaned. A row that is still being written is picked up by the next run.
+    end = tail.rfind(b'\n') + 1
+    new_rows = tail[:end].decode()
+    if len(new_rows) == 0:
+        print("%s has no new rows." % file_name)
+        return
+    if row_timestamp(new_rows) < state['last_timestamp']:
+        print("%s was rewritten since it was last cleaned. Downloading the whole file." % file_name)
+        rebuild_clean_file(url, file_name, default_folder)
+        return
+
+    with open(file_path, 'a') as clean_file_obj:
+        clean_file_obj.write(clean_missing_values(new_rows))
+    last_line = new_rows[new_rows.rfind('\n', 0, len(new_rows) - 1) + 1:]
+    save_tail_state(file_path, {'url': url, 'offset': state['offset'] + end, 'last_line': last_line,
+                                'last_timestamp': row_timestamp(last_line), 'append_only': True})
+    print("Cleaned %i new rows of %s." % (new_rows.count('\n'), file_name))
 
 
 """
@@ -303,23 +462,21 @@ def getEarlyDates(dailyList, date_yesterday):
 
 
 """
-Purpose: The purpose of getUpdatedDailyData is to get and insert the new weather station data into the proper locations
-and write the updated contents onto the DailyEC.csv file.
+Purpose: The purpose of getUpdatedDailyData is to get the new weather station data of a date from the data mart and
+add it to the DailyEC store, one row per station in stations_dailyec.yaml. Rows that are already in the store for
+the date are replaced, so getting the same date again is harmless.
 
 Parameters:
     urlroot - The url containing previous days xml weather station data. Currently points to the EC data mart.
-    strdate_dash - This is one of the dates that comes from the getEarlyDates function. Only works with dates in the 
-    format "YYYY-MM-DD".
-    daily_contents - Similar to getEarlyDates' dailyList parameter. This contains the contents of DailyEC.csv in list
-    form.
-    updated_daily_contents - Is a list containing only the header. This list gets updated with the data set containing
-    new weather station data by the end of the function.
+    strdate_dash - This is one of the dates that comes from DailyECStore.get_missing_dates. Only works with dates in
+    the format "YYYY-MM-DD".
+    store - The open DailyECStore that the new rows are added to.
     default_output - The name of the csv file containing the new weather station data from the data mart. Defaults to 
     "output.csv".
 """
 
 
-def getUpdatedDailyData(urlroot, strdate_dash, daily_contents, updated_daily_contents, default_output="output.csv"):
+def getUpdatedDailyData(urlroot, strdate_dash, store, default_output="output.csv"):
     date_list = strdate_dash.split('-')
 
     # Converts strdate_dash into a date variable.
@@ -345,79 +502,20 @@ def getUpdatedDailyData(urlroot, strdate_dash, daily_contents, updated_daily_con
     summary_dict = dict_summary(summary_csv)
     summary_csv.close()
 
-    # If daily_contents has no data (i.e. there is no DailyEC.csv in the working directory)
-    # then add all new station data into updated_daily_contents. updated_daily_contents will only contain the
-    # recent data.
-    if len(daily_contents) == 0:
-        for each_station in stations.keys():
-            station_desc = stations[each_station]['desc']
-            new_row = ["C%s" % each_station, station_desc.strip('\n'), strdate_dash]
-            new_row.extend(get_correct_data(each_station, summary_dict, strdate_dash))
-            updated_daily_contents.append(new_row)
-
-    # If daily_contents has previous data from previous days then add the new weather station data in the proper
-    # locations. The proper location means that the data is inserted along with the rest of that weather station's
-    # data. All of the data should be sorted by date (i.e. latest is always last).
-    else:
-        count = 0
-        stations_count = 0
-        size = len(daily_contents)
-
-        # Loop through each line in daily_contents.
-        station_ids = list(stations.keys())
-        for row in daily_contents:
-
-            # Grab the station identifiers (i.e. Station ID, description) along with the new date.
-            new_row = ["C%s" % station_ids[stations_count], row[1].strip('\n'), strdate_dash]
-
-            # First adds previous weather station data back to the DailyEC.wq
-            updated_daily_contents.append(row)
-
-            # If count is still within the allowed index values, then check if consecutive ID's are the same.
-            # If the consecutive ID's are different, then insert the new_row here and move on to the next station.
-            if count < size - 1:
-                if daily_contents[count][0] != daily_contents[count + 1][0]:
-                    # Extends new_row to include new weather station data for that ID.
-                    new_row.extend(get_correct_data(station_ids[stations_count], summary_dict, strdate_dash))
-                    updated_daily_contents.append(new_row)
-                    stations_count += 1
-
-            # If count is equal to size - 1 then you are at the end of the csv file, insert the new data here.
-            else:
-
-                # Extends new_row to include new weather station data for that ID.
-                new_row.extend(get_correct_data(station_ids[stations_count], summary_dict, strdate_dash))
-                updated_daily_contents.append(new_row)
-                stations_count += 1
-
-            count += 1
-
-    # Overwrite DailyEC.csv with the newly updated data.
-    with open('DailyEC.csv', 'w', newline='') as csv_file:
-        daily_ec = csv.writer(csv_file, delimiter=',')
-        for each_row in updated_daily_contents:
-            daily_ec.writerow(each_row)
+    # Stations that are already in the store keep the name and position they have there, and new stations are added
+    # after them.
+    new_rows = []
+    for each_station in stations.keys():
+        station_desc = stations[each_station]['desc']
+        new_row = ["C%s" % each_station, station_desc.strip('\n'), strdate_dash]
+        new_row.extend(get_correct_data(each_station, summary_dict, strdate_dash))
+        new_rows.append(new_row)
+    store.upsert_rows(new_rows)
 
 
+# Returns True if station_id is in stations, or is the datamart ID of one of the stations in stations_dailyec.yaml.
 def check_station(station_id, stations):
-    is_our_station = False
-
-    if station_id in stations:
-        is_our_station = True
-    elif station_id == "WPG":
-        is_our_station = True
-    elif station_id == "PGH":
-        is_our_station = True
-    elif station_id == "XWG":
-        is_our_station = True
-    elif station_id == "PQD":
-        is_our_station = True
-    elif station_id == "WZT":
-        is_our_station = True
-    elif station_id == "PBO":
-        is_our_station = True
-
-    return is_our_station
+    return station_id in stations or get_station_registry().is_reported_id(station_id)
 
 
 def gen_Bat_file():
@@ -450,35 +548,37 @@ def in_managed_environment():
     return in_ME
 
 
-# Looks at DailyEC.csv and gathers stations and dates with incomplete data.
-# Only looks back up to 25 days before today's date because EC doesn't store data farther than that.
-def get_empty_dates():
-    dates_to_fill = GroupedArray(is_scalar=True)
-    try:
-        with open('DailyEC.csv', 'r') as csv_file:
-            csv_contents = list(csv.reader(csv_file, delimiter=','))
-            # HEADER_OFFSET_INDEX is needed so we don't include DailyEC.csv header.
-            for each_line in csv_contents[HEADER_OFFSET_INDEX:]:
-                # convert date from each_line into datetime object so we can calculate if within valid range.
-                date_wip = datetime.strptime(each_line[CSV_DATE_INDEX], '%Y-%m-%d')
-                for index in range(1, 4):
-                    # Check for empty fields.
-                    if each_line[CSV_DATE_INDEX + index].strip() == "" and (datetime.today() - date_wip).days \
-                            < EARLIEST_DAYS_LIMIT:
-                        dates_to_fill.insert_data((each_line[CSV_DATE_INDEX]),
-                                                  each_line[STATION_ID_INDEX][HEADER_OFFSET_INDEX:])
-                        break
-    except IOError:
-        pass
-    return dates_to_fill
-
-
-# Looks at dates and stations with incomplete data and downloads the updated data from the EC Websites' XML files.
+"""
+Purpose: get_empty_dates returns a GroupedArray of the dates in DailyEC.csv with incomplete or missing data, each with
+the IDs of the stations that need backfilling on that date (without the leading 'C').
+
+Parameters:
+    lookback_days - The number of days up to and including yesterday to check. It is limited to
+    DATAMART_RETENTION_DAYS because EC doesn't store data farther back than that.
+    default_file - The DailyEC.csv file to check, if no store is given.
+    store - An open DailyECStore to check instead of default_file.
+"""
+
+
+def get_empty_dates(lookback_days=BACKFILL_LOOKBACK_DAYS, default_file="DailyEC.csv", store=None):
+    yesterday = (date.today() - timedelta(days=1)).strftime("%Y-%m-%d")
+    lookback_days = min(lookback_days, DATAMART_RETENTION_DAYS)
+    if store is None:
+        with open_daily_ec_store(default_file) as store:
+            return store.get_gaps(yesterday, lookback_days)
+    return store.get_gaps(yesterday, lookback_days)
+
+
+"""
+Purpose: updated_daily_ec_data downloads the XML file of every date in dates (from get_empty_dates) and returns the
+updated rows of the stations that need them, as a dictionary keyed by (date, station ID), where the station ID
+starts with 'C' the same as in DailyEC.csv.
+"""
+
+
 def updated_daily_ec_data(dates):
-    dates_to_download = dates.get_identifiers()  # Get a list of all the dates with incomplete data.
-    increment_all_date_str(dates_to_download, 1, '%Y-%m-%d')
-    data_filling = GroupedArray()
-    xml_objs = download_all_xml_objects(create_xml_links(dates))
+    backfill_index = {}
+    xml_objs = download_all_xml_objects(create_xml_links(dates), BACKFILL_FIELDS)
     for each_xml_obj in tqdm(iterable=xml_objs, total=len(xml_objs), desc="Backfilling data"):
         date_str = get_date_from_xml(each_xml_obj)
         date_str_correct = (datetime.strptime(date_str, '%Y-%m-%d') - timedelta(days=1)).strftime('%Y-%m-%d')
@@ -488,17 +588,20 @@ def updated_daily_ec_data(dates):
             temp_high = get_value(each_xml_obj, each_station, 'air_temperature_yesterday_high')
             temp_low = get_value(each_xml_obj, each_station, 'air_temperature_yesterday_low')
             precip = get_value(each_xml_obj, each_station, 'total_precipitation')
-            # Insert the updated data into data_filling.
-            data_filling.insert_data(date_str_correct, ['C' + each_station, "", date_str_correct, temp_high, temp_low, precip])
+            # Insert the updated data into backfill_index.
+            backfill_index[(date_str_correct, 'C' + each_station)] = \
+                ['C' + each_station, "", date_str_correct, temp_high, temp_low, precip]
 
-    return data_filling
+    return backfill_index
 
 
 def create_xml_links(dates):
-    dates_to_download = dates.get_identifiers()  # Get a list of all the dates with incomplete data.
     links = []
-    for each_date in dates_to_download:
-        links.append(generate_daily_xml_link(each_date.replace('-', '')))
+    for each_date in dates.get_identifiers():
+        # In data-mart yesterday's tab, xml files always contain data from the day before the date listed on the file
+        # name, so the file of the next day is needed.
+        next_date = datetime.strptime(each_date, '%Y-%m-%d') + timedelta(days=1)
+        links.append(generate_daily_xml_link(next_date.strftime('%Y%m%d')))
     return links
 
 
@@ -509,58 +612,20 @@ def download_xml_links(xml_links):
     return xml_objects
 
 
-def download_all_xml_objects(xml_links):
-    xml_objs = []
-    number_links = len(xml_links)
-    if number_links > 3:
-        chunk_size = int(len(xml_links) / 3)
-    else:
-        chunk_size = 1
-    chunked_list = list(chunks(xml_links, chunk_size))
-    with concurrent.futures.ThreadPoolExecutor(max_workers=3) as executor:
-        results = executor.map(download_xml_links, chunked_list)
-    for each in results:
-        xml_objs.extend(each)
-    return xml_objs
-
-
-# If given a date and station ID, and Grouped Array from updated_daily_ec_data it will return the updated values.
-# Will return None if it can't find the data within the Grouped Array.
-def get_updated_ec_data(date_to_update, station_id, date_grouped_array):
-    value_array = None
-    for each_date in date_grouped_array.get_identifiers():
-        if each_date == date_to_update:
-            updated_stations_data = date_grouped_array.get_data(each_date)
-            for each_row in updated_stations_data:
-                if each_row[0] == station_id:
-                    value_array = each_row
-    return value_array
-
-
-# Basically copies all data from DailyEC.csv and converts to a list, but replaces incomplete data with updated data.
-# Uses the functions get_empty_dates, updated_daily_ec_data, and get_updated_ec_data to achieve this.
-def back_fill_daily_ec():
-    dates = get_empty_dates()
-    date_grouped_array = updated_daily_ec_data(dates)
-    raw_contents_to_write = [['StationID', 'StationName', 'Date', 'Tmax', 'Tmin', 'Precip']]
-    if date_grouped_array.size > 1:
-        try:
-            with open('DailyEC.csv', 'r') as csv_file:
-                csv_contents = list(csv.reader(csv_file, delimiter=','))
-                for each_line in csv_contents[HEADER_OFFSET_INDEX:]:
-                    if each_line[CSV_DATE_INDEX] in date_grouped_array.get_identifiers():
-                        new_data = get_updated_ec_data(
-                            each_line[CSV_DATE_INDEX], each_line[STATION_ID_INDEX], date_grouped_array)
-                        # If it can't find the date/station in date_grouped_array, assume data doesn't need updating.
-                        if new_data is None:
-                            raw_contents_to_write.append(each_line)
-                        else:
-                            new_data[CSV_DESC_INDEX] = each_line[CSV_DESC_INDEX]
-                            raw_contents_to_write.append(new_data)
-                    else:
-                        raw_contents_to_write.append(each_line)
-
-        except IOError:
-            pass
+# Downloads and parses the xml files (see get_xml_objs). The objects are in the order of xml_links. If fields is given,
+# only those fields are read from the files (see get_xml_obj).
+def download_all_xml_objects(xml_links, fields=None):
+    return get_xml_objs(xml_links, fields)
+
 
-    return raw_contents_to_write
+# Replaces the incomplete rows of a DailyECStore with updated data from the EC Websites' XML files, and adds the rows
+# that are missing. Returns the number of rows that were backfilled.
+def back_fill_daily_ec_store(store, lookback_days=BACKFILL_LOOKBACK_DAYS):
+    dates = get_empty_dates(lookback_days, store=store)
+    # Only the XML files of the dates with gaps are downloaded.
+    if len(dates.get_identifiers()) == 0:
+        return 0
+    backfill_index = updated_daily_ec_data(dates)
+    # Missing rows are added as well as incomplete rows being updated.
+    store.upsert_rows(backfill_index.values())
+    return len(backfill_index)
@@ -0,0 +1,222 @@
+"""
+Created on Mon Oct 19 02:00:00 2026
+
+Purpose: DatamartCache keeps a copy of the EC datamart files on disk (in datamart_cache in AgAuto's working directory),
+so that debug runs, backfills and gen_ec_text_files don't download the same XML files again.
+
+    - Dated files (e.g. yesterday_mb_20220601_e.xml) don't change once they are published, so they are downloaded once
+    and then always read from the cache.
+    - Directory listings (URLs ending with '/') and files without a date in their name change, so they are only used
+    for LISTING_TTL seconds after they were downloaded. If downloading one again fails, the old copy is used.
+
+The contents of each file are stored once under their SHA-256 hash (objects/<hash>, or objects/<hash>.gz if compressed),
+and an SQLite index (index.db) maps every URL to the hash of its contents. The hash is checked every time a file is
+read, and a file that doesn't match is downloaded again. Once the files take more than max_bytes, the least recently
+used ones are removed.
+
+In offline mode nothing is downloaded: every file is read from the cache, however old it is, and a file that isn't in
+the cache raises CacheMissError. CacheMissError is a requests.RequestException, so it is handled the same as a failed
+download.
+
+Date modified: Mon Oct 19 2026
+"""
+
+import os
+import re
+import gzip
+import sqlite3
+import hashlib
+import tempfile
+import requests
+from threading import Lock
+from time import time
+from .HttpClient import get_http_client
+
+# CONSTANTS
+DATAMART_CACHE_FOLDER = 'datamart_cache'
+CACHE_INDEX_FILE = 'index.db'
+CACHE_OBJECTS_FOLDER = 'objects'
+COMPRESSED_SUFFIX = '.gz'
+LISTING_TTL = 5 * 60
+CACHE_MAX_BYTES = 512 * 1024 * 1024
+# A date in the name of a file (YYYYMMDD, YYYYMMDDHH or YYYY-MM-DD).
+DATED_FILE_PATTERN = re.compile(r'\d{8}|\d{4}-\d{2}-\d{2}')
+CACHE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (url TEXT PRIMARY KEY, hash TEXT, stored REAL, last_used REAL);
+CREATE INDEX IF NOT EXISTS entries_hash ON entries (hash);
+CREATE TABLE IF NOT EXISTS objects (hash TEXT PRIMARY KEY, size INTEGER, compressed INTEGER);
+"""
+
+
+# Raised in offline mode for a file that isn't in the cache.
+class CacheMissError(requests.RequestException):
+    pass
+
+
+# Returns True if url is a dated file, which never changes once it is published.
+def is_dated_file(url):
+    return not url.endswith('/') and DATED_FILE_PATTERN.search(url.rsplit('/', 1)[-1]) is not None
+
+
+"""
+Purpose: The class DatamartCache is an open cache folder.
+
+Variables:
+    - folder: The folder the files and index are stored in.
+    - max_bytes: The most bytes the stored files can take before the least recently used ones are removed.
+    - compress: If True, new files are stored compressed with gzip.
+    - offline: If True, nothing is downloaded and every file is read from the cache.
+"""
+
+
+class DatamartCache:
+
+    def __init__(self, folder=DATAMART_CACHE_FOLDER, max_bytes=CACHE_MAX_BYTES, compress=False, offline=False):
+        self.folder = os.path.join(os.getcwd(), folder)
+        self.max_bytes = max_bytes
+        self.compress = compress
+        self.offline = offline
+        os.makedirs(os.path.join(self.folder, CACHE_OBJECTS_FOLDER), exist_ok=True)
+        # The download threads share the connection, so every use of it holds the lock.
+        self.lock = Lock()
+        self.connection = sqlite3.connect(os.path.join(self.folder, CACHE_INDEX_FILE), check_same_thread=False)
+        self.connection.executescript(CACHE_SCHEMA)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def close(self):
+        with self.lock:
+            self.connection.close()
+
+    def get_object_path(self, content_hash, compressed):
+        return os.path.join(self.folder, CACHE_OBJECTS_FOLDER, content_hash + (COMPRESSED_SUFFIX if compressed else ''))
+
+    # Returns the number of bytes the stored files take on disk.
+    def get_size(self):
+        with self.lock:
+            return self.connection.execute("SELECT COALESCE(SUM(size), 0) FROM objects").fetchone()[0]
+
+    """
+    Purpose: get_bytes returns the contents of url, from the cache if it has a usable copy, and otherwise downloads
+    the file with the shared HttpClient and stores it.
+    """
+    def get_bytes(self, url):
+        stored = self.read(url)
+        if stored is not None:
+            data, stored_time = stored
+            if self.offline or is_dated_file(url) or time() - stored_time < LISTING_TTL:
+                return data
+        elif self.offline:
+            raise CacheMissError("%s is not in the datamart cache." % url)
+
+        try:
+            data = get_http_client().get_bytes(url)
+        except requests.RequestException as error:
+            if stored is None:
+                raise
+            print("Could not download %s again (%s). Using the copy from the cache." % (url, error))
+            return stored[0]
+        self.store(url, data)
+        return data
+
+    def get_text(self, url):
+        return self.get_bytes(url).decode('utf-8')
+
+    # Returns the stored contents of url and the time they were stored, or None if url isn't in the cache or its file
+    # is missing or doesn't match its hash.
+    def read(self, url):
+        with self.lock:
+            entry = self.connection.execute(
+                "SELECT e.hash, e.stored, o.compressed FROM entries e JOIN objects o ON o.hash = e.hash "
+                "WHERE e.url = ?", (url,)).fetchone()
+        if entry is None:
+            return None
+        content_hash, stored_time, compressed = entry
+        try:
+            with open(self.get_object_path(content_hash, compressed), 'rb') as object_file:
+                data = object_file.read()
+            if compressed:
+                data = gzip.decompress(data)
+        except (IOError, EOFError, gzip.BadGzipFile):
+            return None
+        if hashlib.sha256(data).hexdigest() != content_hash:
+            return None
+        with self.lock, self.connection:
+            self.connection.execute("UPDATE entries SET last_used = ? WHERE url = ?", (time(), url))
+        return data, stored_time
+
+    # Stores data as the contents of url. Files with the same contents are only stored once.
+    def store(self, url, data):
+        content_hash = hashlib.sha256(data).hexdigest()
+        compressed = self.compress
+        object_data = gzip.compress(data) if compressed else data
+        # Each thread writes to its own temporary file, which is then moved into place.
+        temp_handle, temp_path = tempfile.mkstemp(dir=os.path.join(self.folder, CACHE_OBJECTS_FOLDER))
+        with os.fdopen(temp_handle, 'wb') as temp_file:
+            temp_file.write(object_data)
+
+        with self.lock, self.connection:
+            existing = self.connection.execute("SELECT compressed FROM objects WHERE hash = ?",
+                                               (content_hash,)).fetchone()
+            if existing is None or not os.path.exists(self.get_object_path(content_hash, existing[0])):
+                os.replace(temp_path, self.get_object_path(content_hash, compressed))
+                self.connection.execute("INSERT OR REPLACE INTO objects VALUES (?, ?, ?)",
+                                        (content_hash, len(object_data), int(compressed)))
+            else:
+                os.remove(temp_path)
+            now = time()
+            self.connection.execute("INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?)",
+                                    (url, content_hash, now, now))
+            self.evict()
+
+    # Removes the least recently used URLs, and the files no other URL uses, until the files take at most max_bytes.
+    # Must be called with the lock held.
+    def evict(self):
+        total = self.connection.execute("SELECT COALESCE(SUM(size), 0) FROM objects").fetchone()[0]
+        while total > self.max_bytes:
+            entry = self.connection.execute("SELECT url, hash FROM entries ORDER BY last_used LIMIT 1").fetchone()
+            if entry is None:
+                break
+            url, content_hash = entry
+            self.connection.execute("DELETE FROM entries WHERE url = ?", (url,))
+            if self.connection.execute("SELECT 1 FROM entries WHERE hash = ?", (content_hash,)).fetchone() is None:
+                size, compressed = self.connection.execute("SELECT size, compressed FROM objects WHERE hash = ?",
+                                                           (content_hash,)).fetchone()
+                self.connection.execute("DELETE FROM objects WHERE hash = ?", (content_hash,))
+                object_path = self.get_object_path(content_hash, compressed)
+                if os.path.exists(object_path):
+                    os.remove(object_path)
+                total -= size
+
+
+# The cache shared by all callers, and the lock that stops two threads from opening it at the same time.
+_cache = None
+_cache_lock = Lock()
+
+
+# Returns the shared DatamartCache, opening it with the default settings if it isn't open yet.
+def get_datamart_cache():
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = DatamartCache()
+        return _cache
+
+
+"""
+Purpose: configure_datamart_cache replaces the shared DatamartCache with one opened with these settings (see
+DatamartCache), e.g. configure_datamart_cache(offline=True) to replay a run from the cache without a connection.
+"""
+
+
+def configure_datamart_cache(folder=DATAMART_CACHE_FOLDER, max_bytes=CACHE_MAX_BYTES, compress=False, offline=False):
+    global _cache
+    with _cache_lock:
+        if _cache is not None:
+            _cache.close()
+        _cache = DatamartCache(folder, max_bytes, compress, offline)
+        return _cache
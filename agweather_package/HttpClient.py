@@ -0,0 +1,129 @@
+"""
+Created on Mon Oct 19 01:00:00 2026
+
+Purpose: HttpClient is the shared HTTP layer used to download the EC datamart XML files and listings and the mawp
+files. All requests go through one requests.Session, so connections are kept alive and reused from a pool instead of
+a new connection being opened for every file. Every request has a connect and read timeout, at most
+HOST_CONNECTION_LIMIT requests are sent to the same host at the same time, and failed requests (connection errors,
+timeouts and RETRY_STATUS responses) are tried again after an exponential backoff with random jitter.
+
+fetch_all downloads a list of URLs with a pool of threads that each take the next URL from a shared work queue, so a
+slow file only holds up its own thread instead of a whole chunk of the list.
+
+Date modified: Mon Oct 19 2026
+"""
+
+import random
+import requests
+from concurrent.futures import ThreadPoolExecutor
+from threading import BoundedSemaphore, Lock
+from time import sleep
+from urllib.parse import urlsplit
+from requests.adapters import HTTPAdapter
+
+# CONSTANTS
+# (connect, read) timeouts in seconds.
+HTTP_TIMEOUT = (10, 60)
+HOST_CONNECTION_LIMIT = 4
+FETCH_WORKERS = 4
+# A request is sent at most HTTP_ATTEMPTS times. The wait before try n is a random time between 0 and
+# min(BACKOFF_MAX, BACKOFF_BASE * 2 ** n) seconds.
+HTTP_ATTEMPTS = 4
+BACKOFF_BASE = 0.5
+BACKOFF_MAX = 8.0
+RETRY_STATUS = {429, 500, 502, 503, 504}
+
+
+"""
+Purpose: The class HttpClient holds the pooled session and the per-host limits.
+
+Variables:
+    - session: The requests.Session that all requests are sent with.
+    - host_limit: The most requests sent to the same host at the same time.
+    - attempts: The most times a request is sent before its error is raised.
+"""
+
+
+class HttpClient:
+
+    def __init__(self, host_limit=HOST_CONNECTION_LIMIT, attempts=HTTP_ATTEMPTS, timeout=HTTP_TIMEOUT):
+        self.host_limit = host_limit
+        self.attempts = attempts
+        self.timeout = timeout
+        self.session = requests.Session()
+        # Retries are done by request, so that they can back off and give up the host's slot while waiting.
+        adapter = HTTPAdapter(pool_connections=host_limit, pool_maxsize=host_limit, max_retries=0)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self.host_slots = {}
+        self.host_lock = Lock()
+
+    # Returns the semaphore that limits the number of requests sent to the host of url at the same time.
+    def get_host_slot(self, url):
+        host = urlsplit(url).netloc
+        with self.host_lock:
+            if host not in self.host_slots:
+                self.host_slots[host] = BoundedSemaphore(self.host_limit)
+            return self.host_slots[host]
+
+    # Returns the time to wait before trying a request again for the attempt'th time.
+    @staticmethod
+    def backoff_time(attempt):
+        return random.uniform(0, min(BACKOFF_MAX, BACKOFF_BASE * 2 ** attempt))
+
+    """
+    Purpose: request sends a GET request and returns the response, trying again after connection errors, timeouts and
+    RETRY_STATUS responses. The response of the last try is returned even if its status is in RETRY_STATUS, so the
+    caller decides what to do with it. If stream is True, the body is left to the caller to read (e.g. by
+    download_file), and the host's slot is only held until the headers arrive.
+    """
+    def request(self, url, headers=None, stream=False, timeout=None):
+        timeout = self.timeout if timeout is None else timeout
+        for attempt in range(1, self.attempts + 1):
+            try:
+                with self.get_host_slot(url):
+                    response = self.session.get(url, headers=headers, stream=stream, timeout=timeout)
+                    if response.status_code not in RETRY_STATUS or attempt == self.attempts:
+                        if not stream:
+                            # Read the body while the host's slot is still held.
+                            response.content
+                        return response
+                    response.close()
+            except (requests.ConnectionError, requests.Timeout):
+                if attempt == self.attempts:
+                    raise
+            sleep(self.backoff_time(attempt))
+
+    # Returns the body of url as bytes. Raises requests.HTTPError if the last try didn't succeed.
+    def get_bytes(self, url):
+        response = self.request(url)
+        response.raise_for_status()
+        return response.content
+
+    # Returns the body of url decoded as UTF-8.
+    def get_text(self, url):
+        return self.get_bytes(url).decode('utf-8')
+
+    """
+    Purpose: fetch_all calls function(url) for every url in urls with a pool of workers threads, and returns the
+    results in the same order as urls. The threads take the URLs one at a time from the executor's work queue. If
+    function raises an error, the error of the first such url (in the order of urls) is raised once every url has been
+    tried.
+    """
+    def fetch_all(self, function, urls, workers=FETCH_WORKERS):
+        with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+            futures = [executor.submit(function, url) for url in urls]
+            return [future.result() for future in futures]
+
+
+# The client shared by all callers, and the lock that stops two threads from creating it at the same time.
+_client = None
+_client_lock = Lock()
+
+
+def get_http_client():
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = HttpClient()
+        return _client
@@ -0,0 +1,303 @@
+"""
+Created on Sun Oct 18 13:00:00 2026
+
+Purpose: IncrementalDSV keeps a checkpoint of every station's DSV calculation between runs of calcPotatoDSV. The
+checkpoint stores the completed noon-to-noon days of a station (with their DSV), the cumulative DSV and active model at
+the last completed day, and the lines of the day that is still in progress. The next run only calculates the days
+that come after the checkpoint. If the lines of a completed day have changed since the last run (late or corrected
+records), the days are recalculated from that day onwards.
+
+Date modified: Sun Oct 18 2026
+"""
+
+import json
+import hashlib
+import numpy as np
+from .ColumnarDSV import DailyColumns
+from .ColumnarDSV import DSVSeries
+from .ColumnarDSV import EPOCH
+from .ColumnarDSV import parse_station_lines
+from .ColumnarDSV import group_station_lines
+from .ColumnarDSV import series_from_index
+from .ColumnarDSV import latest_dsv
+from .ColumnarDSV import concat_daily
+from .ColumnarDSV import concat_series
+from .UsefulClasses import WISDOM_DSV_CUTOFF
+from .UsefulFunctions import get_path_dir
+from datetime import timedelta
+
+# CONSTANTS
+CHECKPOINT_FILE = 'dsv_checkpoint.json'
+WISDOM_MODEL = 'Wisdom'
+TOMCAST_MODEL = 'TomCast'
+DAILY_FIELDS = ['day_number', 'first_minute', 'period_size', 'wisdom_count', 'wisdom_avg', 'tomcast_count',
+                'tomcast_avg']
+SERIES_FIELDS = ['daily_dsv', 'cumul_dsv', 'count', 'avg_temp']
+
+
+# Returns a digest of a list of lines, used to check whether the lines of a day have changed between runs.
+def lines_digest(lines):
+    return hashlib.sha1('\n'.join(lines).encode('utf-8')).hexdigest()
+
+
+"""
+Purpose: The class StationCheckpoint stores the state of a station after a run of calcPotatoDSV.
+
+Variables:
+    - seed_date: The seed date (YYYY-MM-DD) that the DSV values were calculated for.
+    - daily: DailyColumns object with the completed days of the station.
+    - line_count: The number of raw lines of each completed day.
+    - digests: The digest of the raw lines of each completed day.
+    - completed_digest: The digest of all raw lines of the completed days.
+    - seed_index: The position of the seed date within the days, or -1 if it hasn't been found yet.
+    - daily_dsv, cumul_dsv, count, avg_temp: The DSV values of each completed day (0 before the seed date).
+    - partial_lines: The raw lines of the day that is still in progress.
+"""
+
+
+class StationCheckpoint:
+
+    def __init__(self, station_id, seed_date, daily, line_count, digests, completed_digest, seed_index, daily_dsv,
+                 cumul_dsv, count, avg_temp, partial_lines):
+        self.id = station_id
+        self.seed_date = seed_date
+        self.daily = daily
+        self.line_count = line_count
+        self.digests = digests
+        self.completed_digest = completed_digest
+        self.seed_index = seed_index
+        self.daily_dsv = daily_dsv
+        self.cumul_dsv = cumul_dsv
+        self.count = count
+        self.avg_temp = avg_temp
+        self.partial_lines = partial_lines
+
+    def get_size(self):
+        return self.daily.get_size()
+
+    # The cumulative DSV at the end of the last completed day.
+    def get_cumulative_dsv(self):
+        if self.get_size() == 0:
+            return 0
+        return int(self.cumul_dsv[-1])
+
+    # The model that will be used for the day after the last completed day.
+    def get_model(self):
+        if self.get_cumulative_dsv() < WISDOM_DSV_CUTOFF:
+            return WISDOM_MODEL
+        return TOMCAST_MODEL
+
+    def get_last_completed_day(self):
+        if self.get_size() == 0:
+            return None
+        return (EPOCH + timedelta(days=int(self.daily.day_number[-1]))).strftime("%Y-%m-%d")
+
+    """
+    Purpose: days_to_keep compares the station's raw lines with the checkpoint and returns the number of completed
+    days that can be kept. If the lines of a day have changed, the day before it is recalculated as well because the
+    changed lines could belong to it.
+    """
+    def days_to_keep(self, lines):
+        completed_lines = int(np.sum(self.line_count))
+        if lines_digest(lines[:completed_lines]) == self.completed_digest:
+            if lines[completed_lines:completed_lines + len(self.partial_lines)] == self.partial_lines:
+                return self.get_size()
+            changed_day = self.get_size()
+        else:
+            changed_day = 0
+            position = 0
+            for count, digest in zip(self.line_count, self.digests):
+                day_lines = lines[position:position + count]
+                if len(day_lines) < count or lines_digest(day_lines) != digest:
+                    break
+                changed_day += 1
+                position += count
+        return max(changed_day - 1, 0)
+
+    def to_dict(self):
+        days = {}
+        for field in DAILY_FIELDS:
+            days[field] = getattr(self.daily, field).tolist()
+        for field in SERIES_FIELDS:
+            days[field] = getattr(self, field).tolist()
+        days['line_count'] = self.line_count.tolist()
+        days['digest'] = list(self.digests)
+        return {'seed_date': self.seed_date, 'last_completed_day': self.get_last_completed_day(),
+                'cumulative_dsv': self.get_cumulative_dsv(), 'model': self.get_model(), 'seed_index': self.seed_index,
+                'completed_digest': self.completed_digest, 'partial_lines': self.partial_lines, 'days': days}
+
+
+# Creates a StationCheckpoint object from the dictionary written by StationCheckpoint.to_dict.
+def checkpoint_from_dict(station_id, contents):
+    days = contents['days']
+    daily = DailyColumns(np.array(days['day_number'], dtype=np.int64), np.array(days['first_minute'], dtype=np.int64),
+                         np.array(days['period_size'], dtype=np.int64), np.array(days['wisdom_count'], dtype=np.int64),
+                         np.array(days['wisdom_avg'], dtype=np.float64),
+                         np.array(days['tomcast_count'], dtype=np.int64),
+                         np.array(days['tomcast_avg'], dtype=np.float64))
+    return StationCheckpoint(station_id, contents['seed_date'], daily, np.array(days['line_count'], dtype=np.int64),
+                             days['digest'], contents['completed_digest'], contents['seed_index'],
+                             np.array(days['daily_dsv'], dtype=np.int64), np.array(days['cumul_dsv'], dtype=np.int64),
+                             np.array(days['count'], dtype=np.int64), np.array(days['avg_temp'], dtype=np.float64),
+                             contents['partial_lines'])
+
+
+"""
+Purpose: The class CheckpointedStation calculates the DSV of a station from its raw lines and its checkpoint from the
+last run. It has the same today_dsv and today_dsv_package functions as WeatherStation, and stores the new checkpoint
+in the checkpoint variable after they are called.
+"""
+
+
+class CheckpointedStation:
+
+    def __init__(self, station_id, lines, checkpoint=None, time_cache=None):
+        self.id = station_id
+        self.lines = lines
+        self.checkpoint = checkpoint
+        self.invalid_data_flag = False
+        if time_cache is None:
+            time_cache = {}
+        self.time_cache = time_cache
+
+    def get_id(self):
+        return self.id
+
+    def today_dsv_package(self, seed_date):
+        today_dsv, cumul_dsv, output_txt = self.today_dsv(seed_date)
+        return cumul_dsv, output_txt
+
+    def today_dsv(self, seed_date):
+        daily, series = self.calc_series(seed_date)
+        cumul_dsv = series.get_cumulative_dsv()
+        return latest_dsv(daily, cumul_dsv), cumul_dsv, series.format_text()
+
+    # Same as WeatherStation.write_dsv.
+    def write_dsv(self, seed_date, writer):
+        daily, series = self.calc_series(seed_date)
+        series.write_days(writer)
+        cumul_dsv = series.get_cumulative_dsv()
+        return latest_dsv(daily, cumul_dsv), cumul_dsv
+
+    """
+    Purpose: calc_series calculates the days and the DSVSeries of the station from the checkpoint and the raw lines,
+    and replaces the checkpoint with the new one.
+    """
+    def calc_series(self, seed_date):
+        seed_str = seed_date.strftime("%Y-%m-%d")
+        old = self.checkpoint
+        if old is not None and old.seed_date != seed_str:
+            old = None
+
+        # Only the lines after the days that are kept from the checkpoint are parsed.
+        keep = 0
+        start_line = 0
+        if old is not None:
+            keep = old.days_to_keep(self.lines)
+            start_line = int(np.sum(old.line_count[:keep]))
+        new_lines = self.lines[start_line:]
+        new_columns = parse_station_lines(self.id, new_lines, self.time_cache)
+        new_daily = new_columns.get_daily()
+
+        if old is not None and 0 <= old.seed_index < keep:
+            # Continue the series from the cumulative DSV of the last day that was kept.
+            seed_index = old.seed_index
+            kept_series = DSVSeries(self.id, old.daily.day_number[seed_index:keep], old.daily_dsv[seed_index:keep],
+                                    old.cumul_dsv[seed_index:keep], old.count[seed_index:keep],
+                                    old.avg_temp[seed_index:keep])
+            series = concat_series(kept_series, series_from_index(self.id, new_daily, 0, int(old.cumul_dsv[keep - 1])))
+        else:
+            index = new_daily.get_date_index(seed_date)
+            series = series_from_index(self.id, new_daily, index)
+            seed_index = keep + index if index < new_daily.get_size() else -1
+
+        if old is not None:
+            daily = concat_daily(old.daily.get_days(0, keep), new_daily)
+        else:
+            daily = new_daily
+        self.invalid_data_flag = daily.invalid_data_flag
+
+        self.checkpoint = self.new_checkpoint(seed_str, old, keep, new_columns, new_lines, daily, series, seed_index)
+        return daily, series
+
+    """
+    Purpose: new_checkpoint creates the StationCheckpoint for the next run. Every day except the latest one is a
+    completed day, and the lines of the latest day are kept as the partial day.
+    """
+    def new_checkpoint(self, seed_str, old, keep, new_columns, new_lines, daily, series, seed_index):
+        if new_columns.get_size() == 0:
+            return None
+
+        # The raw lines of each new day start at its first valid data entry.
+        starts = np.concatenate(([0], np.cumsum(new_columns.get_daily().period_size)[:-1])).astype(np.int64)
+        raw_starts = new_columns.line_index[starts]
+        raw_starts[:1] = 0
+        new_line_count = np.diff(np.append(raw_starts, len(new_lines)))
+        new_digests = [lines_digest(new_lines[start:start + count]) for start, count in zip(raw_starts, new_line_count)]
+
+        if old is not None:
+            line_count = np.concatenate((old.line_count[:keep], new_line_count))
+            digests = old.digests[:keep] + new_digests
+        else:
+            line_count = new_line_count
+            digests = new_digests
+
+        # The DSV values are lined up with the days, with 0 before the seed date.
+        day_values = {}
+        for field in SERIES_FIELDS:
+            values = np.zeros(daily.get_size(), dtype=getattr(series, field).dtype)
+            if seed_index >= 0:
+                values[seed_index:] = getattr(series, field)
+            day_values[field] = values[:-1]
+
+        completed = daily.get_size() - 1
+        completed_lines = int(np.sum(line_count[:completed]))
+        return StationCheckpoint(self.id, seed_str, daily.get_days(0, completed), line_count[:completed],
+                                 digests[:completed], lines_digest(self.lines[:completed_lines]),
+                                 seed_index if seed_index < completed else -1, day_values['daily_dsv'],
+                                 day_values['cumul_dsv'], day_values['count'], day_values['avg_temp'],
+                                 self.lines[completed_lines:])
+
+
+"""
+Purpose: load_checkpoints reads the checkpoint file and returns a dictionary of StationCheckpoint objects keyed by
+station ID. An empty dictionary is returned if there is no checkpoint file yet.
+"""
+
+
+def load_checkpoints(file_name=CHECKPOINT_FILE, default_folder='raw_output_data'):
+    checkpoints = {}
+    try:
+        with open(get_path_dir(default_folder, file_name), 'r') as checkpoint_file:
+            contents = json.load(checkpoint_file)
+        for station_id, station_contents in contents.items():
+            checkpoints[station_id] = checkpoint_from_dict(station_id, station_contents)
+    except IOError:
+        pass
+    return checkpoints
+
+
+# Writes the checkpoint of every CheckpointedStation object to the checkpoint file.
+def save_checkpoints(stations, file_name=CHECKPOINT_FILE, default_folder='raw_output_data'):
+    contents = {}
+    for station_id, station in stations.items():
+        if station.checkpoint is not None:
+            contents[station_id] = station.checkpoint.to_dict()
+    with open(get_path_dir(default_folder, file_name), 'w') as checkpoint_file:
+        json.dump(contents, checkpoint_file)
+
+
+"""
+Purpose: initialize_checkpointed_stations reads a file in the mawp15.txt format and returns a dictionary of
+CheckpointedStation objects, each with its checkpoint from the last run.
+"""
+
+
+def initialize_checkpointed_stations(file_name='mawp15.txt', default_folder='input_data',
+                                     checkpoint_file=CHECKPOINT_FILE):
+    checkpoints = load_checkpoints(checkpoint_file)
+    time_cache = {}
+    stations_dict = {}
+    for station_id, lines in group_station_lines(file_name, default_folder).items():
+        stations_dict[station_id] = CheckpointedStation(station_id, lines, checkpoints.get(station_id), time_cache)
+    return stations_dict
@@ -0,0 +1,173 @@
+"""
+Created on Sun Oct 18 21:00:00 2026
+
+Purpose: OffsetIndex keeps a sidecar index next to a file in the mawp15.txt format (e.g. mawp15.txt.idx.json). The
+index stores the byte offset of the first line of every date, both for the whole file and for each station. The DSV
+functions use it to start reading the file a little before the seed date instead of parsing every row from the
+start of the season.
+
+Days are counted from noon to noon, so reading starts at the first line after 12:00 of the start date, and never after
+the last two days of any station, which today's DSV is taken from. The results are then the same as reading the whole
+file, as long as no station has a gap of more than a day in its data around the start.
+
+The index stores the size and modification time of the file it was built from, and is rebuilt whenever either of them
+changes (e.g. after mawp15.txt is downloaded again).
+
+Date modified: Sun Oct 18 2026
+"""
+
+import os
+import json
+from bisect import bisect_left, bisect_right
+from datetime import datetime, timedelta
+from .UsefulFunctions import get_path_dir
+
+# CONSTANTS
+INDEX_SUFFIX = '.idx.json'
+# Reading starts at noon this many days before the seed date, so that the noon-to-noon days before the seed date are
+# split the same way as when the whole file is read.
+SEEK_MARGIN_DAYS = 2
+# Reading starts at noon at least this many days before the last date of every station, so that the two days today's
+# DSV can come from (see WeatherStation.latest_dsv) are complete.
+LATEST_DAYS = 2
+
+
+"""
+Purpose: build_offset_index reads a file in the mawp15.txt format once, without parsing any values, and returns its
+index. Lines are expected to be in order of time, which is how mawp15.txt is written.
+"""
+
+
+def build_offset_index(file_name='mawp15.txt', default_folder='input_data'):
+    file_path = get_path_dir(default_folder, file_name, create=False)
+    stats = os.stat(file_path)
+    dates = {}
+    stations = {}
+    with open(file_path, 'rb') as raw_file:
+        # The header line is skipped.
+        offset = len(raw_file.readline())
+        for line in raw_file:
+            date_str = line[:10].decode('ascii', 'replace')
+            station_id = line.split(b',', 2)[1].decode('ascii', 'replace') if b',' in line else None
+            if date_str not in dates:
+                dates[date_str] = offset
+            if station_id is not None:
+                station_dates = stations.setdefault(station_id, {})
+                if date_str not in station_dates:
+                    station_dates[date_str] = offset
+            offset += len(line)
+    return {'size': stats.st_size, 'mtime': stats.st_mtime, 'dates': dates, 'stations': stations}
+
+
+"""
+Purpose: load_offset_index returns the index of a file from its sidecar, building and saving a new index if there is
+no sidecar yet or if the file has changed since the sidecar was written.
+"""
+
+
+def load_offset_index(file_name='mawp15.txt', default_folder='input_data'):
+    stats = os.stat(get_path_dir(default_folder, file_name, create=False))
+    index_path = get_path_dir(default_folder, file_name + INDEX_SUFFIX)
+    try:
+        with open(index_path, 'r') as index_file:
+            index = json.load(index_file)
+        if index['size'] == stats.st_size and index['mtime'] == stats.st_mtime:
+            return index
+    except (IOError, ValueError, KeyError):
+        pass
+    index = build_offset_index(file_name, default_folder)
+    with open(index_path, 'w') as index_file:
+        json.dump(index, index_file)
+    return index
+
+
+"""
+Purpose: find_offset returns the byte offset of the first line on or after start_date (a datetime or date object),
+either for the whole file or only for station_id. 0 is returned if the date comes before the file, and the size of the
+file if it comes after.
+"""
+
+
+def find_offset(index, start_date, station_id=None):
+    if station_id is None:
+        date_offsets = index['dates']
+    else:
+        date_offsets = index['stations'].get(station_id, {})
+    # Dates of the format YYYY-MM-DD sort the same way as strings.
+    sorted_dates = sorted(date_offsets)
+    position = bisect_left(sorted_dates, start_date.strftime("%Y-%m-%d"))
+    if position == 0:
+        return 0
+    if position == len(sorted_dates):
+        return index['size']
+    return date_offsets[sorted_dates[position]]
+
+
+# Returns the date (YYYY-MM-DD) to start reading from: start_date, or LATEST_DAYS before the last date of a station if
+# that is earlier.
+def find_start_date(index, start_date, station_id=None):
+    start_str = start_date.strftime("%Y-%m-%d")
+    station_ids = index['stations'] if station_id is None else [station_id]
+    for each_id in station_ids:
+        station_dates = index['stations'].get(each_id)
+        if station_dates:
+            latest_start = datetime.strptime(max(station_dates), "%Y-%m-%d") - timedelta(days=LATEST_DAYS)
+            start_str = min(start_str, latest_start.strftime("%Y-%m-%d"))
+    return start_str
+
+
+# Returns the byte offset of the first line after 12:00 of date_str, starting the search at offset (the first line of
+# date_str).
+def find_noon_offset(file_path, offset, date_str):
+    with open(file_path, 'rb') as raw_file:
+        raw_file.seek(offset)
+        for line in raw_file:
+            line_date, _, line_time = line.split(b',', 1)[0].decode('ascii', 'replace').partition(' ')
+            if line_date != date_str:
+                break
+            hours, _, minutes = line_time.partition(':')
+            try:
+                if (int(hours), int(minutes)) > (12, 0):
+                    break
+            except ValueError:
+                pass
+            offset += len(line)
+    return offset
+
+
+"""
+Purpose: seed_start_offset returns the byte offset to start reading a file from for the DSV of a seed date: the first
+line after 12:00 margin_days before the seed date, or earlier if a station's last days come before that (see
+find_start_date). If that is on or before the first date of the file, 0 is returned and the whole file is read.
+"""
+
+
+def seed_start_offset(seed_date, file_name='mawp15.txt', default_folder='input_data', station_id=None,
+                      margin_days=SEEK_MARGIN_DAYS):
+    index = load_offset_index(file_name, default_folder)
+    start_str = find_start_date(index, seed_date - timedelta(days=margin_days), station_id)
+    if station_id is None:
+        date_offsets = index['dates']
+    else:
+        date_offsets = index['stations'].get(station_id, {})
+    # Reading starts at noon of the last date with data on or before the start date.
+    sorted_dates = sorted(date_offsets)
+    position = bisect_right(sorted_dates, start_str) - 1
+    if position <= 0:
+        return 0
+    return find_noon_offset(get_path_dir(default_folder, file_name, create=False),
+                            date_offsets[sorted_dates[position]], sorted_dates[position])
+
+
+# Puts a dictionary keyed by station ID (e.g. from a file read from an offset) back into the order the stations first
+# appear in the whole file, which is the order initialize_stations uses.
+def order_stations(stations_dict, file_name='mawp15.txt', default_folder='input_data'):
+    index = load_offset_index(file_name, default_folder)
+    ordered = {}
+    for station_id in index['stations']:
+        if station_id in stations_dict:
+            ordered[station_id] = stations_dict[station_id]
+    for station_id, station in stations_dict.items():
+        if station_id not in ordered:
+            ordered[station_id] = station
+    return ordered
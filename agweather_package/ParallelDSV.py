@@ -0,0 +1,134 @@
+"""
+Created on Sun Oct 18 17:00:00 2026
+
+Purpose: ParallelDSV calculates the DSV of every station in a pool of worker processes. Each station's DSV only
+depends on its own data, so the raw lines of each station are sent to a worker, which builds the station (either a
+StationColumns or a WeatherStation object) and returns its DSV values. The results come back in the same order as
+the stations, no matter which worker finished first.
+
+If there is only one worker, or the process pool can't be started, the stations are calculated one at a time in the
+current process instead.
+
+Date modified: Sun Oct 18 2026
+"""
+
+import os
+import csv
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime
+from .ColumnarDSV import parse_station_lines
+from .UsefulClasses import WeatherStation
+from .UsefulFunctions import get_path_dir
+from .DSVWriters import make_dsv_writer
+
+# CONSTANTS
+# Each worker is given about this many batches of stations, which keeps the workers busy until the end without
+# sending every station separately.
+CHUNKS_PER_WORKER = 4
+
+
+"""
+Purpose: The class StationResult stores the DSV values of a single station that a worker sends back. days holds the
+values that were passed to write_day for each day, so they can be written by any writer from DSVWriters.
+"""
+
+
+class StationResult:
+
+    def __init__(self, station_id, today_dsv, cumul_dsv, days, invalid_data_flag):
+        self.id = station_id
+        self.today_dsv = today_dsv
+        self.cumul_dsv = cumul_dsv
+        self.days = days
+        self.invalid_data_flag = invalid_data_flag
+
+    def get_id(self):
+        return self.id
+
+    def write_days(self, writer):
+        for day_values in self.days:
+            writer.write_day(self.id, *day_values)
+
+
+# A writer that keeps the days of a single station in a list, used by the workers.
+class DayCollector:
+
+    def __init__(self):
+        self.days = []
+
+    def write_day(self, station_id, *day_values):
+        self.days.append(day_values)
+
+
+# Returns the number of worker processes to use if no number is given.
+def default_workers():
+    return os.cpu_count() or 1
+
+
+"""
+Purpose: station_dsv_task is run by the workers. task is a tuple of (station_id, lines, seed_str, columnar), where
+lines are the station's raw lines from group_station_lines.
+"""
+
+
+def station_dsv_task(task):
+    station_id, lines, seed_str, columnar = task
+    if columnar:
+        station = parse_station_lines(station_id, lines, {})
+    else:
+        station = WeatherStation(station_id)
+        for each in lines:
+            station.add_data(each.split(','))
+    collector = DayCollector()
+    today_dsv, cumul_dsv = station.write_dsv(datetime.strptime(seed_str, '%Y-%m-%d'), collector)
+    return StationResult(station_id, today_dsv, cumul_dsv, collector.days, station.invalid_data_flag)
+
+
+"""
+Purpose: parallel_stations_dsv calculates the DSV of every station in station_lines (a dictionary of raw lines keyed by
+station ID) from the seed date, and returns a list of StationResult objects in the same order as station_lines.
+
+Parameters:
+    - workers: The number of worker processes. The number of CPUs is used if it is None, and the stations are
+    calculated in the current process if it is 1 or less.
+    - columnar: If True, StationColumns is used for each station, otherwise WeatherStation. Both give the same results.
+"""
+
+
+def parallel_stations_dsv(station_lines, seed_date, workers=None, columnar=True):
+    if workers is None:
+        workers = default_workers()
+    seed_str = seed_date.strftime("%Y-%m-%d")
+    tasks = [(station_id, lines, seed_str, columnar) for station_id, lines in station_lines.items()]
+    workers = min(workers, len(tasks))
+
+    if workers > 1:
+        chunk_size = max(1, len(tasks) // (workers * CHUNKS_PER_WORKER))
+        try:
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                # executor.map returns the results in the order of the tasks.
+                return list(executor.map(station_dsv_task, tasks, chunksize=chunk_size))
+        except (OSError, NotImplementedError, BrokenProcessPool) as error:
+            print("Could not calculate station DSVs in parallel (%s). Calculating them one at a time instead." % error)
+    return [station_dsv_task(task) for task in tasks]
+
+
+"""
+Purpose: write_dsv_results writes the StationResult objects to station_dsv.csv in raw_output_data and passes the days
+of each station to writer (by default a TextDSVWriter for comparison.txt), in the same format as show_all_stations_dsv.
+"""
+
+
+def write_dsv_results(results, writer=None, csv_name='station_dsv.csv', default_folder='raw_output_data'):
+    if writer is None:
+        writer = make_dsv_writer('text', default_folder=default_folder)
+    with writer, open(get_path_dir(default_folder, csv_name), 'w', newline='') as csv_file:
+        csv_obj = csv.writer(csv_file, delimiter=',')
+        csv_obj.writerow(['Station', 'Cumulative DSV', 'Today DSV'])
+        for result in results:
+            if result.invalid_data_flag:
+                print("Station %s flagged for invalid data. May have skipped some days for this station."
+                      % result.get_id())
+            result.write_days(writer)
+            csv_obj.writerow([result.get_id(), result.cumul_dsv, result.today_dsv])
@@ -10,22 +10,54 @@ Date modified: Fri May 31 2019
 """
 
 from .UsefulClasses import WeatherStation
+from .ColumnarDSV import load_station_columns
+from .IncrementalDSV import initialize_checkpointed_stations
+from .IncrementalDSV import save_checkpoints
+from .BatchDSV import SEED_DATES_FILE
+from .BatchDSV import FIELD_DSV_FILE
+from .BatchDSV import read_seed_requests
+from .BatchDSV import batch_dsv
+from .ColumnarDSV import group_station_lines
+from .ParallelDSV import parallel_stations_dsv
+from .ParallelDSV import write_dsv_results
+from .DSVWriters import make_dsv_writer
+from .DSVWriters import FieldCSVWriter
+from .ReanalysisDSV import open_dsv_store
+from .ReanalysisDSV import reanalysis_dsv
+from .OffsetIndex import seed_start_offset
+from .OffsetIndex import order_stations
+from .StationRegistry import read_yaml_dict
 from .UsefulFunctions import get_path_dir
 from .UsefulFunctions import download_file
 from .UsefulFunctions import split_text_file
+from .UsefulFunctions import stream_text_file
 from datetime import datetime
 from tqdm import tqdm
 import csv
 
+# CONSTANTS
+DSV_OPTIONS_FILE = 'dsv_options.yaml'
+DSV_OPTIONS = {'columnar': False, 'incremental': False, 'parallel': False, 'workers': None, 'seek': False,
+               'report_format': 'text'}
+
 """
 Purpose: This function downloads mawp15.txt from the mbag website, parses the data it finds and organizes it
 by station name.
+
+Parameters:
+    - streaming: If True, the file is parsed one line at a time by stream_stations instead of being read into memory.
+    - seed_date: If given, the rows before the seed date are skipped by seeking to it with the sidecar index from
+    OffsetIndex, and the file is streamed from there.
 """
 
 
-def initialize_stations():
+def initialize_stations(streaming=False, seed_date=None):
     # Download mawp15.txt into the input_data folder.
     download_file('https://mbagweather.ca/partners/win/mawp15.txt', 'mawp15.txt')
+    if seed_date is not None:
+        return order_stations(stream_stations('mawp15.txt', start_offset=seed_start_offset(seed_date, 'mawp15.txt')))
+    if streaming:
+        return stream_stations('mawp15.txt')
     # We split the text file by '\n' in order to iterate over each line.
     data = split_text_file('mawp15.txt')
     stations_dict = {}
@@ -54,22 +86,92 @@ def initialize_stations():
     return stations_dict
 
 
+"""
+Purpose: stream_stations reads a file in the mawp15.txt format one line at a time and feeds each line to its
+WeatherStation object as it goes. Neither the file nor its lines are kept in memory, and with compact=True each
+completed day only keeps its Wisdom and TomCast parameters, so memory use stays flat no matter how many 15 minute
+entries the file has. Reading starts at the byte offset start_offset if it is given.
+"""
+
+
+def stream_stations(file_name='mawp15.txt', default_folder='input_data', compact=True, start_offset=0):
+    stations_dict = {}
+
+    for each in tqdm(stream_text_file(file_name, default_folder, start_offset=start_offset),
+                     desc="Calculating station DSVs", unit=' lines'):
+        data_list = each.split(',')
+        station_id = data_list[1]
+
+        # Check if station ID, temperature, and RH contain invalid values. If they do, then skip this data point.
+        if station_id != '-7999' and data_list[2] != '-7999' and data_list[3] != '-7999':
+            station = stations_dict.get(station_id)
+            if station is None:
+                station = WeatherStation(station_id, compact)
+                stations_dict[station_id] = station
+            station.add_data(data_list)
+    return stations_dict
+
+
+"""
+Purpose: initialize_station_columns downloads mawp15.txt like initialize_stations, but organizes the data by station
+name into StationColumns objects so that DSVs are calculated with NumPy arrays. Like initialize_stations, the rows
+before seed_date are skipped if it is given.
+"""
+
+
+def initialize_station_columns(seed_date=None):
+    download_file('https://mbagweather.ca/partners/win/mawp15.txt', 'mawp15.txt')
+    if seed_date is not None:
+        return order_stations(load_station_columns('mawp15.txt',
+                                                   start_offset=seed_start_offset(seed_date, 'mawp15.txt')))
+    return load_station_columns('mawp15.txt')
+
+
 """
 Purpose: show_all_stations_dsv takes all WeatherStation objects from initialize_stations and analyzes the daily
 data stored within each one. The function calculates cumulative and daily DSV for each WeatherStation
 based on a specified seed date of the format YYYY-MM-DD.
+
+Parameters:
+    - columnar: If True, the StationColumns objects from initialize_station_columns are used instead of the
+    WeatherStation objects. Both give the same results.
+    - incremental: If True, the CheckpointedStation objects are used so that only the days after the checkpoint of the
+    last run are calculated. The checkpoint is updated at the end.
+    - parallel: If True, the stations are split between a pool of worker processes by parallel_stations_dsv. The
+    columnar option decides which class the workers use. Not used together with incremental.
+    - workers: The number of worker processes for parallel. Defaults to the number of CPUs.
+    - seek: If True, the rows before the seed date are skipped with the OffsetIndex sidecar of mawp15.txt. Not used
+    together with incremental, which needs every row for its checkpoint.
+    - report_format: The format of the per-day DSV report, 'text' (comparison.txt), 'csv' (comparison.csv) or 'jsonl'
+    (comparison.jsonl). The report is written one day at a time while the stations are calculated.
 """
 
 
-def show_all_stations_dsv():
+def show_all_stations_dsv(columnar=False, incremental=False, parallel=False, workers=None, report_format='text',
+                          seek=False):
     user_date = input("\nPlease specify a \"seed\" date (YYYY-MM-DD):")
-
-    # Use initialize_stations to get us the dictionary of WeatherStation objects.
-    stations = initialize_stations()
-    # Create/overwrite the comparison.txt file.
-    comparison_file = open(get_path_dir('raw_output_data', 'comparison.txt'), 'w+')
-
-    output_txt = ""
+    seed_date = datetime.strptime(user_date.strip(), '%Y-%m-%d')
+
+    if parallel and not incremental:
+        download_file('https://mbagweather.ca/partners/win/mawp15.txt', 'mawp15.txt')
+        start_offset = seed_start_offset(seed_date, 'mawp15.txt') if seek else 0
+        station_lines = group_station_lines('mawp15.txt', start_offset=start_offset)
+        if seek:
+            station_lines = order_stations(station_lines)
+        results = parallel_stations_dsv(station_lines, seed_date, workers, columnar)
+        write_dsv_results(results, make_dsv_writer(report_format))
+        return
+
+    # Use initialize_stations to get us the dictionary of WeatherStation (or StationColumns) objects.
+    if incremental:
+        download_file('https://mbagweather.ca/partners/win/mawp15.txt', 'mawp15.txt')
+        stations = initialize_checkpointed_stations('mawp15.txt')
+    elif columnar:
+        stations = initialize_station_columns(seed_date if seek else None)
+    else:
+        stations = initialize_stations(seed_date=seed_date if seek else None)
+    # Create/overwrite the report file (comparison.txt by default).
+    writer = make_dsv_writer(report_format)
 
     # Create/overwrite the station_dsv.csv file.
     csv_file = open(get_path_dir('raw_output_data', 'station_dsv.csv'), 'w', newline='')
@@ -80,14 +182,71 @@ def show_all_stations_dsv():
     csv_obj.writerow(['Station', 'Cumulative DSV', 'Today DSV'])
     # Iterate through each WeatherStation object.
     for each in stations.values():
+        # Calculate the daily dsv and cumulative dsv, and write each day's calculations to the report.
+        daily_dsv, cumul_dsv = each.write_dsv(seed_date, writer)
         # If WeatherStation.invalid_data_flag is True then warn the user.
         if each.invalid_data_flag:
             print("Station %s flagged for invalid data. May have skipped some days for this station." % each.get_id())
-        # Calculate the daily dsv and cumulative dsv, and get calculations.
-        daily_dsv, cumul_dsv, new_txt = each.today_dsv(datetime.strptime(user_date.strip(), '%Y-%m-%d'))
-        output_txt += new_txt
         csv_obj.writerow([each.get_id(), cumul_dsv, daily_dsv])
-    comparison_file.write(output_txt)
-    comparison_file.close()
+    writer.close()
     csv_file.close()
 
+    if incremental:
+        save_checkpoints(stations)
+
+
+"""
+Purpose: show_field_dsv calculates the cumulative and daily DSV of every field listed in config_files/seed_dates.yaml,
+each with its own station and seed date, and writes one row per field to raw_output_data/field_dsv.csv.
+"""
+
+
+def show_field_dsv(file_name=SEED_DATES_FILE):
+    requests = read_seed_requests(file_name)
+    stations = initialize_station_columns()
+    results = batch_dsv(stations, requests)
+    with FieldCSVWriter(FIELD_DSV_FILE) as writer:
+        for result in results:
+            # If the station of the field is flagged for invalid data then warn the user.
+            if result.cumul_dsv is not None and stations[result.request.station_id].invalid_data_flag:
+                print("Station %s flagged for invalid data. May have skipped some days for this station."
+                      % result.request.station_id)
+            writer.write_field(result)
+
+
+"""
+Purpose: load_dsv_options returns the keyword arguments of show_all_stations_dsv from config_files/dsv_options.yaml,
+which is how AgAuto's calcPotatoDSV option picks the way the DSVs are calculated. Options that are missing from the
+file keep their default from DSV_OPTIONS, and unknown options are ignored with a warning.
+"""
+
+
+def load_dsv_options(file_name=DSV_OPTIONS_FILE, default_folder='config_files'):
+    options = dict(DSV_OPTIONS)
+    for name, value in read_yaml_dict(get_path_dir(default_folder, file_name)).items():
+        if name not in DSV_OPTIONS:
+            print("Unknown option %s in %s. It will be ignored." % (name, file_name))
+        elif value is not None or name == 'workers':
+            options[name] = value
+    return options
+
+
+"""
+Purpose: reanalyze_stations_dsv calculates the DSV of every station and season in one or more files of past 15 minute
+data in input_data, e.g. Potato_blight_comparison-Douglas.csv, and writes raw_output_data/reanalysis_dsv.csv. The
+files are only parsed the first time (or after they change), later runs read the binary store in raw_output_data.
+
+Parameters:
+    - seed_days: A list of seed days of the format MM-DD used for every season. Defaults to the first day of each
+    season.
+    - report_format: If given ('text', 'csv' or 'jsonl'), the DSV of every day is also written by make_dsv_writer.
+"""
+
+
+def reanalyze_stations_dsv(file_names, seed_days=None, report_format=None):
+    store = open_dsv_store(file_names)
+    if report_format is None:
+        reanalysis_dsv(store, seed_days)
+    else:
+        with make_dsv_writer(report_format) as writer:
+            reanalysis_dsv(store, seed_days, writer)
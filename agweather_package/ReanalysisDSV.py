@@ -0,0 +1,235 @@
+"""
+Created on Sun Oct 18 20:00:00 2026
+
+Purpose: ReanalysisDSV calculates the DSV of past seasons from files of 15 minute station data (the mawp15.txt or
+Potato_blight_comparison-Douglas.csv format), which can cover many years. The files are parsed once into a binary
+store of NumPy arrays in raw_output_data, one file per column with the stations one after the other. Later runs
+memory-map the store instead of parsing the text again, so rerunning an analysis only does the DSV arithmetic.
+
+The store is rebuilt automatically if one of the source files has changed size or modification time.
+
+Date modified: Sun Oct 18 2026
+"""
+
+import os
+import csv
+import json
+import numpy as np
+from datetime import datetime, timedelta
+from .ColumnarDSV import StationColumns
+from .ColumnarDSV import EPOCH
+from .ColumnarDSV import INVALID_VALUE
+from .ColumnarDSV import parse_station_lines
+from .ColumnarDSV import series_from_index
+from .BatchDSV import station_batch_dsv
+from .IncrementalDSV import WISDOM_MODEL, TOMCAST_MODEL
+from .UsefulClasses import WISDOM_DSV_CUTOFF
+from .UsefulClasses import ID_INDEX, TEMP_INDEX, RH_INDEX
+from .UsefulFunctions import get_path_dir
+from .UsefulFunctions import stream_text_file
+
+# CONSTANTS
+STORE_FOLDER = 'dsv_store'
+STORE_MANIFEST = 'store.json'
+# The columns of the store, in the same order as the StationColumns variables.
+STORE_COLUMNS = (('time', np.int64), ('temp', np.float64), ('RH', np.int64), ('rain', np.float64),
+                 ('avg_ws', np.float64), ('avg_wd', np.float64))
+# The raw lines of a station are converted to arrays after this many lines, so the text is never all in memory.
+INGEST_CHUNK_LINES = 100000
+REANALYSIS_FILE = 'reanalysis_dsv.csv'
+REANALYSIS_HEADER = ['Station', 'Season', 'Seed Date', 'Cumulative DSV', 'Last Day DSV', 'Model',
+                     'TomCast Start Date', 'Days']
+
+
+# Returns the path of the store folder in raw_output_data, creating the folder if it doesn't exist yet.
+def get_store_dir(store_name=STORE_FOLDER, default_folder='raw_output_data'):
+    store_dir = get_path_dir(default_folder, store_name)
+    if not os.path.exists(store_dir):
+        os.makedirs(store_dir)
+    return store_dir
+
+
+# Returns the size and modification time of each source file, which is used to tell if the store is out of date.
+def source_info(file_names, default_folder):
+    info = []
+    for file_name in file_names:
+        stats = os.stat(get_path_dir(default_folder, file_name, create=False))
+        info.append([file_name, stats.st_size, stats.st_mtime])
+    return info
+
+
+"""
+Purpose: The class StationChunks collects the arrays of one station while the source files are read. The raw lines
+are converted to arrays every INGEST_CHUNK_LINES lines.
+"""
+
+
+class StationChunks:
+
+    def __init__(self, station_id, time_cache):
+        self.id = station_id
+        self.lines = []
+        self.chunks = []
+        self.time_cache = time_cache
+
+    def add_line(self, line):
+        self.lines.append(line)
+        if len(self.lines) >= INGEST_CHUNK_LINES:
+            self.flush()
+
+    def flush(self):
+        if len(self.lines) > 0:
+            columns = parse_station_lines(self.id, self.lines, self.time_cache)
+            self.chunks.append([getattr(columns, name) for name, _ in STORE_COLUMNS])
+            self.lines = []
+
+    def get_columns(self):
+        self.flush()
+        return [np.concatenate([chunk[number] for chunk in self.chunks]).astype(data_type)
+                for number, (_, data_type) in enumerate(STORE_COLUMNS)]
+
+
+"""
+Purpose: build_dsv_store parses the source files into the store. The files are read in the given order, so a station's
+data should be in order of time across the files (e.g. one file per year, oldest first).
+"""
+
+
+def build_dsv_store(file_names, default_folder='input_data', store_name=STORE_FOLDER):
+    if isinstance(file_names, str):
+        file_names = [file_names]
+    stations = {}
+    for file_name in file_names:
+        # The stations of a file share their time stamps, so they share a time cache.
+        time_cache = {}
+        for each in stream_text_file(file_name, default_folder):
+            data_list = each.split(',')
+            station_id = data_list[ID_INDEX]
+            # Check if station ID, temperature, and RH contain invalid values. If they do, then skip this data point.
+            if station_id != INVALID_VALUE and data_list[TEMP_INDEX] != INVALID_VALUE and \
+                    data_list[RH_INDEX] != INVALID_VALUE:
+                station = stations.get(station_id)
+                if station is None:
+                    station = StationChunks(station_id, time_cache)
+                    stations[station_id] = station
+                station.add_line(each)
+
+    # Every column is written to its own file, with the stations one after the other.
+    station_ranges = []
+    station_columns = []
+    position = 0
+    for station_id, station in stations.items():
+        columns = station.get_columns()
+        station_columns.append(columns)
+        station_ranges.append([station_id, position, position + len(columns[0])])
+        position += len(columns[0])
+
+    store_dir = get_store_dir(store_name)
+    for number, (name, data_type) in enumerate(STORE_COLUMNS):
+        if len(station_columns) > 0:
+            column = np.concatenate([columns[number] for columns in station_columns])
+        else:
+            column = np.zeros(0, dtype=data_type)
+        np.save(os.path.join(store_dir, name + '.npy'), column)
+
+    manifest = {'sources': source_info(file_names, default_folder), 'stations': station_ranges}
+    with open(os.path.join(store_dir, STORE_MANIFEST), 'w') as manifest_file:
+        json.dump(manifest, manifest_file)
+    return manifest
+
+
+"""
+Purpose: The class DSVStore is a store opened with memory-mapped arrays. get_station returns a StationColumns object
+whose columns are views into the store, so a station's data is only read from disk when it is used.
+"""
+
+
+class DSVStore:
+
+    def __init__(self, store_dir, manifest):
+        self.store_dir = store_dir
+        self.manifest = manifest
+        self.columns = {}
+        for name, _ in STORE_COLUMNS:
+            self.columns[name] = np.load(os.path.join(store_dir, name + '.npy'), mmap_mode='r')
+        self.station_ranges = {}
+        for station_id, start, stop in manifest['stations']:
+            self.station_ranges[station_id] = (start, stop)
+
+    def get_station_ids(self):
+        return list(self.station_ranges.keys())
+
+    def get_station(self, station_id):
+        start, stop = self.station_ranges[station_id]
+        return StationColumns(station_id, *[self.columns[name][start:stop] for name, _ in STORE_COLUMNS])
+
+
+"""
+Purpose: open_dsv_store returns the DSVStore for the source files, building the store first if it doesn't exist or if
+any source file has changed since it was built.
+"""
+
+
+def open_dsv_store(file_names, default_folder='input_data', store_name=STORE_FOLDER):
+    if isinstance(file_names, str):
+        file_names = [file_names]
+    store_dir = get_store_dir(store_name)
+    manifest = None
+    try:
+        with open(os.path.join(store_dir, STORE_MANIFEST), 'r') as manifest_file:
+            manifest = json.load(manifest_file)
+    except (IOError, ValueError):
+        pass
+    if manifest is None or manifest['sources'] != source_info(file_names, default_folder):
+        print("Building DSV store from %s." % ', '.join(file_names))
+        manifest = build_dsv_store(file_names, default_folder, store_name)
+    return DSVStore(store_dir, manifest)
+
+
+# Returns the positions (start, stop) of the days of each season (calendar year) of a DailyColumns object.
+def season_ranges(daily):
+    years = np.array([(EPOCH + timedelta(days=int(day_number))).year for day_number in daily.day_number],
+                     dtype=np.int64)
+    starts = np.flatnonzero(np.concatenate(([True], years[1:] != years[:-1])))
+    stops = np.append(starts[1:], len(years))
+    return [(int(years[start]), int(start), int(stop)) for start, stop in zip(starts, stops)]
+
+
+"""
+Purpose: reanalysis_dsv calculates the DSV of every station and season in the store for every seed date, and writes
+one row per station, season and seed date to raw_output_data/reanalysis_dsv.csv.
+
+Parameters:
+    - seed_days: A list of seed days of the format MM-DD that are used for every season. If it is None, the first
+    day of each season is used.
+    - writer: An optional writer from DSVWriters that the daily and cumulative DSV of every day are written to.
+"""
+
+
+def reanalysis_dsv(store, seed_days=None, writer=None, file_name=REANALYSIS_FILE, default_folder='raw_output_data'):
+    with open(get_path_dir(default_folder, file_name), 'w', newline='') as csv_file:
+        csv_obj = csv.writer(csv_file, delimiter=',')
+        csv_obj.writerow(REANALYSIS_HEADER)
+        for station_id in store.get_station_ids():
+            daily = store.get_station(station_id).get_daily()
+            for season, start, stop in season_ranges(daily):
+                season_daily = daily.get_days(start, stop)
+                if seed_days is None:
+                    seed_dates = [EPOCH + timedelta(days=int(season_daily.day_number[0]))]
+                else:
+                    seed_dates = [datetime.strptime("%s-%s" % (season, seed_day), '%Y-%m-%d')
+                                  for seed_day in seed_days]
+                cumul_dsv, last_dsv, switch = station_batch_dsv(season_daily, seed_dates)
+                for number, seed_date in enumerate(seed_dates):
+                    cumul = int(cumul_dsv[number])
+                    seed_index = season_daily.get_date_index(seed_date)
+                    switch_str = ''
+                    if switch[number] < season_daily.get_size():
+                        switch_str = (EPOCH + timedelta(days=int(season_daily.day_number[switch[number]])))\
+                            .strftime("%Y-%m-%d")
+                    csv_obj.writerow([station_id, season, seed_date.strftime("%Y-%m-%d"), cumul,
+                                      int(last_dsv[number]),
+                                      WISDOM_MODEL if cumul < WISDOM_DSV_CUTOFF else TOMCAST_MODEL, switch_str,
+                                      season_daily.get_size() - seed_index])
+                    if writer is not None:
+                        series_from_index(station_id, season_daily, seed_index).write_days(writer)
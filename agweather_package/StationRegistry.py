@@ -0,0 +1,153 @@
+"""
+Created on Mon Oct 19 00:00:00 2026
+
+Purpose: StationRegistry reads the station config files once and keeps their contents in dictionaries, so that
+xml_parser and DailyUpload can look up station IDs, MBAg IDs, descriptions and alternative IDs without reading YAML
+again for every line of output.
+
+Config files (in config_files):
+    - stations.yaml: The EC stations in the datamart XML files (transport canada ID), with their MBAg ID and the
+    description used for the ec_files text files.
+    - stations_dailyec.yaml: The stations of DailyEC.csv, with their MBAg ID, description and alternative ID. A
+    station with an alternative ID reports its data under that ID in the datamart (e.g. YPG reports as WPG). If
+    fallback_to_own_id is yes, the station's own ID is used when the alternative ID has no data or is missing some.
+    - stations.txt: ID:description lines for the stations of DailyEC.csv. Only used for descriptions that
+    stations_dailyec.yaml doesn't have.
+    - mbag_ids.txt: ID:MBAg ID lines for the datamart stations. Only used for IDs that stations.yaml doesn't have.
+
+get_station_registry returns a shared registry, and reads the files again if any of them has changed since.
+
+Date modified: Mon Oct 19 2026
+"""
+
+import os
+import yaml
+from threading import Lock
+from .UsefulFunctions import get_path_dir
+
+# CONSTANTS
+STATIONS_FILE = 'stations.yaml'
+DAILY_EC_STATIONS_FILE = 'stations_dailyec.yaml'
+STATION_NAMES_FILE = 'stations.txt'
+MBAG_IDS_FILE = 'mbag_ids.txt'
+REGISTRY_FILES = [STATIONS_FILE, DAILY_EC_STATIONS_FILE, STATION_NAMES_FILE, MBAG_IDS_FILE]
+NO_ALTERNATIVE = 'NONE'
+
+
+# Returns the contents of a YAML file as a dictionary, or an empty dictionary if the file doesn't exist.
+def read_yaml_dict(file_path):
+    try:
+        with open(file_path, 'r') as yaml_file:
+            return yaml.safe_load(yaml_file) or {}
+    except IOError:
+        return {}
+
+
+# Returns the lines of the format KEY:VALUE of a text file as a dictionary, or an empty dictionary if the file doesn't
+# exist.
+def read_colon_dict(file_path):
+    colon_dict = {}
+    try:
+        with open(file_path, 'r') as text_file:
+            for line in text_file:
+                if ':' in line:
+                    key, value = line.split(':', 1)
+                    colon_dict[key.strip()] = value.strip()
+    except IOError:
+        pass
+    return colon_dict
+
+
+"""
+Purpose: The class StationRegistry holds the merged contents of the station config files.
+
+Variables:
+    - stations: stations.yaml, keyed by transport canada ID in the order of the file.
+    - daily_ec_stations: stations_dailyec.yaml, keyed by DailyEC station ID in the order of the file.
+    - mbag_ids: The MBAg ID of every datamart station.
+    - alternatives: The alternative ID of every DailyEC station that has one.
+    - fallbacks: The DailyEC stations that fall back to their own ID.
+    - reported_ids: The IDs that the DailyEC stations report under in the datamart (their alternative ID if they
+    have one), plus the DailyEC station IDs themselves.
+"""
+
+
+class StationRegistry:
+
+    def __init__(self, config_folder='config_files'):
+        self.config_folder = config_folder
+        self.modified_times = self.get_modified_times()
+
+        self.stations = read_yaml_dict(get_path_dir(config_folder, STATIONS_FILE))
+        self.daily_ec_stations = read_yaml_dict(get_path_dir(config_folder, DAILY_EC_STATIONS_FILE))
+
+        self.mbag_ids = {}
+        for station_id, mbag_id in read_colon_dict(get_path_dir(config_folder, MBAG_IDS_FILE)).items():
+            self.mbag_ids[station_id] = int(mbag_id)
+        for station_id, values in self.stations.items():
+            self.mbag_ids[station_id] = values['mbag_id']
+
+        station_names = read_colon_dict(get_path_dir(config_folder, STATION_NAMES_FILE))
+        self.alternatives = {}
+        self.fallbacks = set()
+        self.reported_ids = set()
+        for station_id, values in self.daily_ec_stations.items():
+            if values.get('desc') is None and station_id in station_names:
+                values['desc'] = station_names[station_id]
+            alternative_id = values.get('alternative_id', NO_ALTERNATIVE)
+            if alternative_id != NO_ALTERNATIVE:
+                self.alternatives[station_id] = alternative_id
+                self.reported_ids.add(alternative_id)
+                if values.get('fallback_to_own_id', False):
+                    self.fallbacks.add(station_id)
+            self.reported_ids.add(station_id)
+
+    # Returns the modification time of each config file, or None for files that don't exist.
+    def get_modified_times(self):
+        modified_times = {}
+        for file_name in REGISTRY_FILES:
+            file_path = get_path_dir(self.config_folder, file_name)
+            modified_times[file_name] = os.path.getmtime(file_path) if os.path.exists(file_path) else None
+        return modified_times
+
+    def is_current(self):
+        return self.get_modified_times() == self.modified_times
+
+    # Returns the ID that a DailyEC station reports under in the datamart, which is its own ID if it has no alternative.
+    def get_alternative(self, station_id):
+        return self.alternatives.get(station_id, station_id)
+
+    def has_fallback(self, station_id):
+        return station_id in self.fallbacks
+
+    def is_reported_id(self, station_id):
+        return station_id in self.reported_ids
+
+    """
+    Purpose: get_station_values returns a dictionary of one value (e.g. 'mbag_id' or 'desc') of every station in
+    stations.yaml, or of all of their values if key is None.
+    """
+    def get_station_values(self, key=None):
+        if key is None:
+            return dict(self.stations)
+        return {station_id: values[key] for station_id, values in self.stations.items()}
+
+
+# The registry shared by all callers, and the lock that stops two threads from reading the files at the same time.
+_registries = {}
+_registry_lock = Lock()
+
+
+"""
+Purpose: get_station_registry returns the shared StationRegistry of a config folder, reading the config files if they
+haven't been read yet or if any of them has changed since they were read.
+"""
+
+
+def get_station_registry(config_folder='config_files'):
+    with _registry_lock:
+        registry = _registries.get(config_folder)
+        if registry is None or not registry.is_current():
+            registry = StationRegistry(config_folder)
+            _registries[config_folder] = registry
+        return registry
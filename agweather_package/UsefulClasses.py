@@ -9,9 +9,15 @@ Purpose: PotatoBlight contains the necessary functions to calculate all station
 Date modified: Fri May 31 2019
 """
 
-from datetime import datetime, timedelta
+from datetime import datetime, date, timedelta, time
+from bisect import bisect_left, bisect_right
+from array import array
 from .UsefulFunctions import wisdom_dsv_lookup
 from .UsefulFunctions import tomcast_dsv_lookup
+from .UsefulFunctions import datetime_to_minutes
+from .UsefulFunctions import minutes_to_datetime
+from .UsefulFunctions import noon_limit
+from .DSVWriters import DSV_TEXT_FORMAT
 
 # CONSTANTS
 MAXIMUM_PERIOD_SIZE = 96
@@ -28,6 +34,10 @@ RH_INDEX = 3
 RAIN_INDEX = 4
 AVG_WS_INDEX = 5
 AVG_WD_INDEX = 6
+# What get_date_index does when there is no day with the seed date.
+MISSING_SEED_END = 'end'  # Return the number of days, so the DSV series is empty.
+MISSING_SEED_ERROR = 'error'  # Raise a SeedDateError.
+MISSING_SEED_NEAREST = 'nearest'  # Use the closest day, or the later day if two days are equally close.
 
 """
 Purpose: Packet serves as the parent class for all classes that contain data within lists and requires an
@@ -58,39 +68,204 @@ class Packet(object):
         return self.id
 
 
+# Raised by get_date_index when there is no day with the seed date and the policy is MISSING_SEED_ERROR.
+class SeedDateError(ValueError):
+    pass
+
+
+"""
+Purpose: The class DateIndex maps each date to the position of the first day with that date, so that the position
+of a seed date is found with a dictionary lookup instead of going through every day. Dates are stored as ordinals
+(date.toordinal()). The sorted list of dates, used for nearest-day and range lookups, is only rebuilt after a new
+date is added.
+"""
+
+
+class DateIndex:
+
+    def __init__(self):
+        self.positions = {}
+        self.sorted_dates = []
+        self.is_sorted = True
+
+    def add(self, ordinal, position):
+        if ordinal not in self.positions:
+            self.positions[ordinal] = position
+            self.is_sorted = False
+
+    def get_size(self):
+        return len(self.positions)
+
+    def get_sorted_dates(self):
+        if not self.is_sorted:
+            self.sorted_dates = sorted(self.positions)
+            self.is_sorted = True
+        return self.sorted_dates
+
+    """
+    Purpose: find returns the position of the day with the date ordinal. size is returned for MISSING_SEED_END if
+    there is no such day, which is what WeatherStation.get_date_index has always done.
+    """
+    def find(self, ordinal, size, missing_seed=MISSING_SEED_END, name=None):
+        position = self.positions.get(ordinal)
+        if position is not None:
+            return position
+        if missing_seed == MISSING_SEED_NEAREST and len(self.positions) > 0:
+            dates = self.get_sorted_dates()
+            index = bisect_left(dates, ordinal)
+            if index == len(dates) or (index > 0 and ordinal - dates[index - 1] < dates[index] - ordinal):
+                index -= 1
+            return self.positions[dates[index]]
+        if missing_seed == MISSING_SEED_ERROR or missing_seed == MISSING_SEED_NEAREST:
+            raise SeedDateError("No data for %s on %s." % ("station %s" % name if name is not None else "any day",
+                                                          date.fromordinal(ordinal).strftime("%Y-%m-%d")))
+        return size
+
+    """
+    Purpose: find_range returns the positions (start, stop) of the days between the two date ordinals, including both.
+    Days are expected to be in order of date, which is how they are added from mawp15.txt.
+    """
+    def find_range(self, start_ordinal, end_ordinal):
+        dates = self.get_sorted_dates()
+        in_range = dates[bisect_left(dates, start_ordinal):bisect_right(dates, end_ordinal)]
+        if len(in_range) == 0:
+            return 0, 0
+        return self.positions[in_range[0]], self.positions[in_range[-1]] + 1
+
+
+"""
+Purpose: The class TimeStampParser turns the 'YYYY-MM-DD HH:MM' time stamps of mawp15.txt into datetime objects and
+integer minutes since EPOCH. The date part and the time part are each parsed once and then cached, since every station
+shares the same dates and there are only 96 different times in a day. Time stamps that don't split cleanly are parsed
+as a whole with strptime, so the accepted formats are the same as datetime.strptime.
+
+Variables:
+    - date_cache: Maps each date string to [datetime at midnight, minutes since EPOCH].
+    - time_cache: Maps each time string to [timedelta since midnight, minutes since midnight].
+"""
+
+
+class TimeStampParser:
+
+    def __init__(self):
+        self.date_cache = {}
+        self.time_cache = {}
+
+    """
+    Purpose: The class function parse returns the datetime object and the minutes since EPOCH of a time stamp, and
+    raises a ValueError if the time stamp isn't valid.
+    """
+    def parse(self, time_stamp):
+        date_str, _, time_str = time_stamp.partition(' ')
+        date_info = self.date_cache.get(date_str)
+        time_info = self.time_cache.get(time_str)
+        try:
+            if date_info is None:
+                midnight = datetime.strptime(date_str, '%Y-%m-%d')
+                date_info = [midnight, datetime_to_minutes(midnight)]
+                self.date_cache[date_str] = date_info
+            if time_info is None:
+                clock = datetime.strptime(time_str, '%H:%M')
+                time_info = [timedelta(hours=clock.hour, minutes=clock.minute), clock.hour * 60 + clock.minute]
+                self.time_cache[time_str] = time_info
+        except ValueError:
+            date_var = datetime.strptime(time_stamp, '%Y-%m-%d %H:%M')
+            return date_var, datetime_to_minutes(date_var)
+        return date_info[0] + time_info[0], date_info[1] + time_info[1]
+
+    # Same as parse, but only returns the minutes since EPOCH so no datetime object is created for cached stamps.
+    def parse_minutes(self, time_stamp):
+        date_str, _, time_str = time_stamp.partition(' ')
+        date_info = self.date_cache.get(date_str)
+        time_info = self.time_cache.get(time_str)
+        if date_info is None or time_info is None:
+            return self.parse(time_stamp)[1]
+        return date_info[1] + time_info[1]
+
+
+# Time stamps are shared by all stations, so every WeatherStation uses the same parser by default.
+TIME_STAMP_PARSER = TimeStampParser()
+
+
 """
 Purpose: The class DailyData represents each day's data for a station, as outlined in mawp15.txt. 
 
+Each data entry is stored across typed arrays (one per column) instead of a list per entry, and time stamps are
+stored as minutes since EPOCH instead of datetime objects. __slots__ keeps each DailyData object small as well.
+
 Variables:
     - date_var: Stands for 'date variable', this is a Date object that stores the date that a DailyData object
     is concerned with.
-    - data: Stores all data entries for a certain time period from mawp15.txt. The format for the data is
-    [DateTime, StnID, Temp, RH, Rain, AvgWS, AvgWD].
-    - period_size: Represents the length of the data list. This means that this is the number of data entries
-    for a certain day.
+    - time, temp, RH, rain, avg_ws, avg_wd: Store all data entries for a certain time period from mawp15.txt, one
+    array for each column. time is the time stamp in minutes since EPOCH.
+    - period_size: Represents the number of data entries for a certain day.
     - avg_temp: This is the average temperature of all data entries that meet the criteria for the Wisdom or
     TomCast DSV look-up tables.
     - period_count: This is the number of data entries that meet the criteria for the Wisdom or TomCast DSV
     look-up tables.
+    - earliest_minute: The time stamp of the first data entry, in minutes since EPOCH.
+    - summary: Stores [wisdom_params, tomcast_params] once the DailyData object has been compacted, otherwise None.
 """
 
 
 class DailyData:
 
+    __slots__ = ['date_var', 'time', 'temp', 'RH', 'rain', 'avg_ws', 'avg_wd', 'period_size', 'avg_temp',
+                 'period_count', 'earliest_minute', 'summary']
+
     def __init__(self, date_var):
         self.date_var = date_var
-        self.data = []
+        self.clear_data()
         self.period_size = 0
         self.avg_temp = 0.0
         self.period_count = 0
+        self.earliest_minute = None
+        self.summary = None
 
     """
-    Purpose: The class function add_data adds a data entry to the data variable and increments the period_size by 1.
+    Purpose: The class function add_data adds a data entry to the data arrays and increments the period_size by 1.
+    time_stamp can either be the minutes since EPOCH or a datetime object.
     """
     def add_data(self, time_stamp, temp, RH, rain, avg_ws, avg_wd):
-        self.data.append([time_stamp, temp, RH, rain, avg_ws, avg_wd])
+        if isinstance(time_stamp, datetime):
+            time_stamp = datetime_to_minutes(time_stamp)
+        if self.earliest_minute is None:
+            self.earliest_minute = time_stamp
+        self.time.append(time_stamp)
+        self.temp.append(temp)
+        self.RH.append(RH)
+        self.rain.append(rain)
+        self.avg_ws.append(avg_ws)
+        self.avg_wd.append(avg_wd)
         self.period_size += 1
 
+    """
+    Purpose: data returns the data entries in the format [DateTime, Temp, RH, Rain, AvgWS, AvgWD], which is how they
+    used to be stored. It is only meant for looking at the data, since the lists are created every time.
+    """
+    @property
+    def data(self):
+        return [[minutes_to_datetime(self.time[index]), self.temp[index], self.RH[index], self.rain[index],
+                 self.avg_ws[index], self.avg_wd[index]] for index in range(len(self.time))]
+
+    """
+    Purpose: The class function compact calculates the Wisdom and TomCast parameters and then removes the data
+    entries. It is used for days that are complete, so that a WeatherStation doesn't keep every 15 minute entry.
+    """
+    def compact(self):
+        if self.summary is None:
+            self.summary = [self.wisdom_params(), self.tomcast_params()]
+            self.clear_data()
+
+    # Gives each column its own empty array. time and RH hold integers, the other columns hold floats.
+    def clear_data(self):
+        self.time = array('q')
+        self.temp = array('d')
+        self.RH = array('q')
+        self.rain = array('d')
+        self.avg_ws = array('d')
+        self.avg_wd = array('d')
+
     def get_date(self):
         return self.date_var
 
@@ -98,7 +273,9 @@ class DailyData:
     Purpose: The class function get_earliest_data returns the date of the first data entry.
     """
     def get_earliest_date(self):
-        return self.data[0][0]
+        if self.earliest_minute is None:
+            return None
+        return minutes_to_datetime(self.earliest_minute)
 
     """
     Purpose: The class function get_daily_dsv calculates the DSV based on its list of data entries and the specified
@@ -129,12 +306,14 @@ class DailyData:
     data periods.
     """
     def wisdom_params(self):
+        if self.summary is not None:
+            return self.summary[0]
         matching_periods = 0
         temp_sum = 0.0
-        for each_entry in self.data:
-            if each_entry[1] >= WISDOM_LOW_TEMP_CUTOFF and each_entry[2] >= RH_CUTOFF:  # >= RH_CUTOFF:
+        for temp, RH in zip(self.temp, self.RH):
+            if temp >= WISDOM_LOW_TEMP_CUTOFF and RH >= RH_CUTOFF:  # >= RH_CUTOFF:
                 matching_periods += 1
-                temp_sum += each_entry[1]
+                temp_sum += temp
         # If/Else statements are necessary to avoid dividing by 0 if no matching periods are valid.
         if matching_periods == 0:
             temp_sum = 0
@@ -149,12 +328,14 @@ class DailyData:
     data periods.
     """
     def tomcast_params(self):
+        if self.summary is not None:
+            return self.summary[1]
         matching_periods = 0
         temp_sum = 0.0
-        for each_entry in self.data:
-            if each_entry[2] >= RH_CUTOFF and (TOMCAST_LOW_TEMP_CUTOFF <= each_entry[1] < TOMCAST_HIGH_TEMP_CUTOFF):
+        for temp, RH in zip(self.temp, self.RH):
+            if RH >= RH_CUTOFF and (TOMCAST_LOW_TEMP_CUTOFF <= temp < TOMCAST_HIGH_TEMP_CUTOFF):
                 matching_periods += 1
-                temp_sum += each_entry[1]
+                temp_sum += temp
         if matching_periods == 0:
             temp_sum = 0
         else:
@@ -173,17 +354,28 @@ Variables:
     and stays False if otherwise.
     - data_size: the number of DailyData objects that a WeatherStation object currently has.
     - output_txt: will later store a formatted version of data within a WeatherStation.
+    - compact: If True, each DailyData object is compacted as soon as the next day starts, so that memory use grows
+    with the number of days instead of the number of 15 minute entries.
+    - day_limit: The last minute since EPOCH (12:00 of the next day) that belongs to the latest DailyData object.
+    - time_parser: The TimeStampParser used for the time stamps.
+    - date_index: DateIndex of the DailyData objects, updated as days are added.
+    - missing_seed: What get_date_index does if there is no day with the seed date (see MISSING_SEED_END).
 """
 
 
 class WeatherStation(Packet):
 
-    def __init__(self, name):
+    def __init__(self, name, compact=False, time_parser=TIME_STAMP_PARSER, missing_seed=MISSING_SEED_END):
         super(WeatherStation, self).__init__(name)
         self.header = [["DateTime", "Temp", "RH", "Rain", "AvgWS", "AvgWD"]]
         self.invalid_data_flag = False
         self.data_size = 0
         self.output_txt = ""
+        self.compact = compact
+        self.day_limit = None
+        self.time_parser = time_parser
+        self.date_index = DateIndex()
+        self.missing_seed = missing_seed
 
     """
     Purpose: The class function add_data's job is to take a list of the data values of a 15 minute time period and
@@ -197,8 +389,8 @@ class WeatherStation(Packet):
         if len(items) > 1:
 
             try:
-                # Creates a Date object based on the time stamp.
-                date_info = datetime.strptime(items[DATE_INDEX], '%Y-%m-%d %H:%M')
+                # Gets the minutes since EPOCH based on the time stamp.
+                minutes = self.time_parser.parse_minutes(items[DATE_INDEX])
 
                 temp = float(items[TEMP_INDEX])
                 RH = int(items[RH_INDEX])
@@ -208,24 +400,30 @@ class WeatherStation(Packet):
 
                 # If the data list is empty then create new DailyData object and add new data entry to it.
                 if self.data_size == 0:  # and date_to_hours(date_info) == 12.25:
-                    self.add_date(date_info + timedelta(days=1))
-                    self.data[-1].add_data(date_info, temp, RH, rain, avg_ws, avg_wd)
+                    self.add_date(minutes_to_datetime(minutes) + timedelta(days=1))
+                    self.day_limit = noon_limit(minutes)
+                    self.data[-1].add_data(minutes, temp, RH, rain, avg_ws, avg_wd)
                 elif self.data_size > 0:
-                    if self.check_valid_range(self.data[-1].get_earliest_date(), date_info):
-                        self.data[-1].add_data(date_info, temp, RH, rain, avg_ws, avg_wd)
+                    # Same check as check_valid_range, but with integer minutes.
+                    if minutes <= self.day_limit:
+                        self.data[-1].add_data(minutes, temp, RH, rain, avg_ws, avg_wd)
                     # If time stamp is not within the valid range then assume you have to start a new DailyData object.
                     else:
                         if self.data[-1].period_size <= MIN_ALLOWABLE_PERIOD_SIZE and not self.invalid_data_flag:
                             self.invalid_data_flag = True
+                        if self.compact:
+                            self.data[-1].compact()
                         # Create new DailyData object with new date and add data entry to it.
-                        self.add_date(date_info + timedelta(days=1))
-                        self.data[-1].add_data(date_info, temp, RH, rain, avg_ws, avg_wd)  # Add 12:15 PM data
+                        self.add_date(minutes_to_datetime(minutes) + timedelta(days=1))
+                        self.day_limit = noon_limit(minutes)
+                        self.data[-1].add_data(minutes, temp, RH, rain, avg_ws, avg_wd)  # Add 12:15 PM data
 
             except ValueError:
                 print("Station data is invalid for %s. Skipping data entry for this time period." % self.id)
 
     def add_date(self, date_info):
         new_day = DailyData(date_info)
+        self.date_index.add(date_info.toordinal(), len(self.data))
         self.data.append(new_day)
         self.data_size += 1
 
@@ -238,6 +436,21 @@ class WeatherStation(Packet):
         potatoes.
     """
     def today_dsv_package(self, seed_date):  # Create function to get just today's DSV as well.
+        lines = []
+        cumul_dsv = 0
+        for day_values in self.dsv_days(seed_date):
+            cumul_dsv = day_values[2]
+            lines.append(DSV_TEXT_FORMAT % ((self.id,) + day_values))
+        # The lines are joined once instead of adding them to output_txt one at a time.
+        self.output_txt = self.output_txt + "".join(lines)
+
+        return cumul_dsv, self.output_txt
+
+    """
+    Purpose: dsv_days yields the date (YYYY-MM-DD), daily DSV, cumulative DSV, count and average temperature of each
+    day from the seed date onwards.
+    """
+    def dsv_days(self, seed_date):
         # Get the position of the DailyData object with the same date as seed_date
         index = self.get_date_index(seed_date)
         cumul_dsv = 0
@@ -246,11 +459,8 @@ class WeatherStation(Packet):
             # Get the daily dsv based on the cumulative dsv.
             daily_dsv = each_day.get_daily_dsv(cumul_dsv)
             cumul_dsv += daily_dsv
-            self.output_txt = self.output_txt + ("Station: %s | Date: %s | Daily DSV: %s | Cumulative DSV: %s | Count: %s | Avg. Temp: %.2f\n"
-                                                 % (self.id, datetime.strftime(each_day.get_date(), "%Y-%m-%d"), daily_dsv,
-                                                       cumul_dsv, each_day.period_count, each_day.avg_temp))
-
-        return cumul_dsv, self.output_txt
+            yield (datetime.strftime(each_day.get_date(), "%Y-%m-%d"), daily_dsv, cumul_dsv, each_day.period_count,
+                   each_day.avg_temp)
 
     """
     Purpose: The class function today_dsv's purpose is to calculate the DSV for the latest date on the data
@@ -260,28 +470,42 @@ class WeatherStation(Packet):
 
         cumul_dsv, output_txt = self.today_dsv_package(seed_date)
 
+        return self.latest_dsv(cumul_dsv), cumul_dsv, output_txt
+
+    """
+    Purpose: write_dsv is the same as today_dsv, except each day's DSV values are passed to a writer from DSVWriters
+    instead of being returned as text. Returns today's DSV and the cumulative DSV.
+    """
+    def write_dsv(self, seed_date, writer):
+        cumul_dsv = 0
+        for day_values in self.dsv_days(seed_date):
+            cumul_dsv = day_values[2]
+            writer.write_day(self.id, *day_values)
+        return self.latest_dsv(cumul_dsv), cumul_dsv
+
+    def latest_dsv(self, cumul_dsv):
         # If the latest DailyData object has a complete data set.
         if self.data[-1].period_size == MAXIMUM_PERIOD_SIZE:  # Maybe change this to MINIMUM_ALLOWABLE_PERIOD_SIZE?
-            today_dsv = self.data[-1].get_daily_dsv(cumul_dsv)
+            return self.data[-1].get_daily_dsv(cumul_dsv)
         # If the latest DailyData object has an incomplete data set then access the second last DailyData object.
-        else:
-            today_dsv = self.data[-2].get_daily_dsv(cumul_dsv)  # What about when this object is also incomplete?
-
-        return today_dsv, cumul_dsv, output_txt
+        return self.data[-2].get_daily_dsv(cumul_dsv)  # What about when this object is also incomplete?
 
     """
     Purpose: get_date_index returns the position of the DailyData object with a date that matches the seed date.
+    If there is no such day, missing_seed (or the station's missing_seed if it is None) decides what happens.
     """
-    def get_date_index(self, seed_date):
-        index = 0
-        for each_day in self.data:
-            if each_day.get_date().date() == seed_date.date():
-                break
-            index += 1
-        return index
+    def get_date_index(self, seed_date, missing_seed=None):
+        if missing_seed is None:
+            missing_seed = self.missing_seed
+        return self.date_index.find(seed_date.toordinal(), len(self.data), missing_seed, self.id)
+
+    # Returns the DailyData objects with dates from start_date up to and including end_date.
+    def get_days_between(self, start_date, end_date):
+        start, stop = self.date_index.find_range(start_date.toordinal(), end_date.toordinal())
+        return self.data[start:stop]
 
     def check_valid_range(self, daily_date, new_date):
-        daily_date_reset = datetime.strptime(daily_date.strftime("%Y-%m-%d") + " 12:00", "%Y-%m-%d %H:%M") + timedelta(days=1)
+        daily_date_reset = datetime.combine(daily_date.date(), time(12, 0)) + timedelta(days=1)
         return new_date <= daily_date_reset
 
 
@@ -1,8 +1,29 @@
 import os
 import csv
-import requests
+import json
+import numpy as np
+from bisect import bisect_right
+from math import isnan
+from itertools import islice
 from tqdm import tqdm
 from datetime import  datetime, timedelta
+from time import perf_counter
+from .HttpClient import get_http_client
+
+# The number of bytes read from disk at a time by stream_text_file.
+STREAM_BLOCK_SIZE = 1024 * 1024
+# download_file settings. Chunks start small so the progress bar moves right away, and grow while the connection keeps
+# up with them.
+DOWNLOAD_MIN_CHUNK = 64 * 1024
+DOWNLOAD_MAX_CHUNK = 4 * 1024 * 1024
+DOWNLOAD_FAST_CHUNK_TIME = 0.25
+DOWNLOAD_TIMEOUT = 60
+METADATA_SUFFIX = '.meta.json'
+PART_SUFFIX = '.part'
+# Time stamps are stored as integer minutes since EPOCH.
+EPOCH = datetime(1970, 1, 1)
+MINUTES_PER_DAY = 1440
+NOON_MINUTES = 720
 
 
 """
@@ -36,14 +57,95 @@ def get_path_dir(directory, file_name, create=True):
     return file_path
 
 
-# Downloads a file if given a url and file_name and stores it in the local PC.
+"""
+Purpose: download_file downloads a file if given a url and file_name and stores it in the local PC.
+
+The response headers (ETag and Last-Modified) are kept in a sidecar file (e.g. mawp15.txt.meta.json), and are sent
+back with the next request so that the server can answer '304 Not Modified' if the file hasn't changed, in which case
+nothing is downloaded. Data is first written to a .part file that is renamed once the download is complete. If a
+download is interrupted, the next call asks for the rest of the file with a Range request. Full downloads accept gzip
+encoding. The chunk size starts at DOWNLOAD_MIN_CHUNK and doubles while chunks arrive quickly, up to DOWNLOAD_MAX_CHUNK.
+
+Returns True if the file was downloaded and False if the local copy was already up to date.
+"""
+
+
 def download_file(url, file_name, default_folder='input_data'):
+    file_path = get_path_dir(default_folder, file_name)
+    part_path = file_path + PART_SUFFIX
+    metadata = load_download_metadata(file_path)
+    headers = {}
+
+    resume_from = 0
+    if metadata.get('url') == url and os.path.exists(part_path) and not metadata.get('complete'):
+        validator = metadata.get('etag') or metadata.get('last_modified')
+        if validator is not None:
+            resume_from = os.path.getsize(part_path)
+            # Byte ranges only line up with the file if it isn't compressed on the way.
+            headers['Range'] = 'bytes=%d-' % resume_from
+            headers['If-Range'] = validator
+            headers['Accept-Encoding'] = 'identity'
+    elif metadata.get('url') == url and metadata.get('complete') and os.path.exists(file_path):
+        if metadata.get('etag') is not None:
+            headers['If-None-Match'] = metadata['etag']
+        if metadata.get('last_modified') is not None:
+            headers['If-Modified-Since'] = metadata['last_modified']
+
     # Get the response from URL.
-    with requests.get(url, stream=True) as r:
-        chunkSize = 1024  # Download 1024 bytes at a time.
-        with open(get_path_dir(default_folder, file_name), 'wb') as raw_file:
-            for chunk in tqdm(iterable=r.iter_content(chunk_size=chunkSize), total=int(r.headers['Content-Length']) / chunkSize, unit='KB', desc="Downloading %s" % file_name):
+    with get_http_client().request(url, headers=headers, stream=True, timeout=DOWNLOAD_TIMEOUT) as r:
+        if r.status_code == 304:
+            print("%s has not changed since the last download." % file_name)
+            return False
+        if r.status_code == 416:
+            # The partial file doesn't match the file on the server any more, so start over.
+            os.remove(part_path)
+            save_download_metadata(file_path, {})
+            return download_file(url, file_name, default_folder)
+        r.raise_for_status()
+
+        # The server ignores the Range request (200 instead of 206) if the file changed since the partial download.
+        if r.status_code != 206:
+            resume_from = 0
+        metadata = {'url': url, 'etag': r.headers.get('ETag'), 'last_modified': r.headers.get('Last-Modified'),
+                    'complete': False}
+        save_download_metadata(file_path, metadata)
+
+        total = None
+        if 'Content-Length' in r.headers and r.headers.get('Content-Encoding', 'identity') == 'identity':
+            total = resume_from + int(r.headers['Content-Length'])
+
+        chunk_size = DOWNLOAD_MIN_CHUNK
+        with open(part_path, 'ab' if resume_from > 0 else 'wb') as raw_file, \
+                tqdm(total=total, initial=resume_from, unit='B', unit_scale=True,
+                     desc="Downloading %s" % file_name) as progress:
+            while True:
+                start = perf_counter()
+                chunk = r.raw.read(chunk_size, decode_content=True)
+                if not chunk:
+                    break
                 raw_file.write(chunk)
+                progress.update(len(chunk))
+                if perf_counter() - start < DOWNLOAD_FAST_CHUNK_TIME and chunk_size < DOWNLOAD_MAX_CHUNK:
+                    chunk_size *= 2
+
+    os.replace(part_path, file_path)
+    metadata['complete'] = True
+    save_download_metadata(file_path, metadata)
+    return True
+
+
+# Returns the download metadata saved next to file_path, or an empty dictionary if there is none.
+def load_download_metadata(file_path):
+    try:
+        with open(file_path + METADATA_SUFFIX, 'r') as metadata_file:
+            return json.load(metadata_file)
+    except (IOError, ValueError):
+        return {}
+
+
+def save_download_metadata(file_path, metadata):
+    with open(file_path + METADATA_SUFFIX, 'w') as metadata_file:
+        json.dump(metadata, metadata_file)
 
 
 # Takes a text file and returns a list of each line.
@@ -56,116 +158,156 @@ def split_text_file(file_name, default_folder='input_data', start_index=1, end_i
     return output_text
 
 
+# Takes a text file and yields each line one at a time, so the whole file is never held in memory. Like
+# split_text_file, the first start_index lines are skipped and a last line without a line break is left out.
+# If start_offset is given, reading starts at that byte offset (the start of a line) and no lines are skipped.
+def stream_text_file(file_name, default_folder='input_data', start_index=1, block_size=STREAM_BLOCK_SIZE,
+                     start_offset=0):
+    with open(get_path_dir(default_folder, file_name), 'r', buffering=block_size) as raw_file:
+        if start_offset > 0:
+            raw_file.seek(start_offset)
+            start_index = 0
+        for line in islice(raw_file, start_index, None):
+            if line.endswith('\n'):
+                yield line[:-1]
+
+
 def date_to_hours(date_var):
     return date_var.hour + date_var.minute/60.0
 
 
-# Returns DSV if given number of periods that RH >= 86 and temperature > 7 C based on the Wisdom table.
-def wisdom_dsv_lookup(period_count, avg_temperature_raw):
-
-    if avg_temperature_raw > 7.0:
+# Converts a datetime object into the number of minutes since EPOCH.
+def datetime_to_minutes(date_var):
+    return (date_var - EPOCH) // timedelta(minutes=1)
+
+
+# Converts the number of minutes since EPOCH back into a datetime object.
+def minutes_to_datetime(minutes):
+    return EPOCH + timedelta(minutes=int(minutes))
+
+
+# Returns the last minute (12:00 of the next day) that still belongs to a noon-to-noon day starting at first_minute.
+def noon_limit(first_minute):
+    return (first_minute // MINUTES_PER_DAY + 1) * MINUTES_PER_DAY + NOON_MINUTES
+
+
+# DSV look-up tables. Each row is (first period count, last period count, [DSV for each temperature band]).
+# The temperature bands are separated by the values in the *_TEMPERATURE_BANDS lists, e.g. the Wisdom bands are
+# temp < 12.5, 12.5 <= temp < 15.5 and temp >= 15.5.
+WISDOM_TEMPERATURE_BANDS = [12.5, 15.5]
+WISDOM_TABLE = [
+    (0, 38, [0, 0, 0]),
+    (39, 50, [0, 0, 1]),
+    (51, 62, [0, 1, 2]),
+    (63, 74, [1, 2, 3]),
+    (75, 86, [2, 3, 4]),
+    (87, 96, [3, 4, 4]),
+]
+TOMCAST_TEMPERATURE_BANDS = [12.5, 17.5, 20.5, 25.5]
+TOMCAST_TABLE = [
+    (0, 10, [0, 0, 0, 0, 0]),
+    (11, 14, [0, 0, 0, 1, 0]),
+    (15, 22, [0, 0, 1, 1, 1]),
+    (23, 26, [0, 0, 1, 2, 1]),
+    (27, 34, [1, 1, 1, 2, 1]),
+    (35, 50, [1, 1, 2, 2, 2]),
+    (51, 62, [2, 1, 2, 3, 2]),
+    (63, 82, [2, 2, 3, 3, 3]),
+    (83, 90, [3, 3, 3, 4, 3]),
+    (91, 96, [3, 3, 4, 4, 4]),
+]
+MAXIMUM_PERIOD_COUNT = 96
+# Average temperatures above these values are rounded to the nearest degree before the look-up.
+WISDOM_ROUNDING_TEMP = 7.0
+TOMCAST_ROUNDING_TEMP = 9.0
+
+
+# Expands a look-up table into a grid with one row for every period count from 0 to MAXIMUM_PERIOD_COUNT.
+def build_dsv_grid(table):
+    grid = [None] * (MAXIMUM_PERIOD_COUNT + 1)
+    for first_count, last_count, band_dsv in table:
+        for period_count in range(first_count, last_count + 1):
+            grid[period_count] = band_dsv
+    return grid
+
+
+# Returns, for every period count from 0 to MAXIMUM_PERIOD_COUNT, the last period count of the table row it is in.
+def build_dsv_row_ends(table):
+    row_ends = [None] * (MAXIMUM_PERIOD_COUNT + 1)
+    for first_count, last_count, band_dsv in table:
+        for period_count in range(first_count, last_count + 1):
+            row_ends[period_count] = last_count
+    return row_ends
+
+
+WISDOM_GRID = build_dsv_grid(WISDOM_TABLE)
+TOMCAST_GRID = build_dsv_grid(TOMCAST_TABLE)
+WISDOM_ROW_ENDS = build_dsv_row_ends(WISDOM_TABLE)
+TOMCAST_ROW_ENDS = build_dsv_row_ends(TOMCAST_TABLE)
+WISDOM_GRID_ARRAY = np.array(WISDOM_GRID)
+TOMCAST_GRID_ARRAY = np.array(TOMCAST_GRID)
+WISDOM_ROW_ENDS_ARRAY = np.array(WISDOM_ROW_ENDS)
+TOMCAST_ROW_ENDS_ARRAY = np.array(TOMCAST_ROW_ENDS)
+
+
+# Returns the DSV from grid for a single period count and average temperature. The period count can be an int or a
+# float. A count that isn't a whole number uses the row of the count below it if both are in the same table row, and
+# gives 0 if it falls between two table rows (e.g. 50.5 for Wisdom), the same as the if/elif chains the tables replaced.
+def grid_dsv_lookup(grid, row_ends, temperature_bands, rounding_temp, period_count, avg_temperature_raw):
+
+    if avg_temperature_raw > rounding_temp:
         avg_temperature = round(avg_temperature_raw)
     else:
         avg_temperature = avg_temperature_raw
 
     dsv = 0
-    if 0 <= period_count < 39:
-        dsv = 0
-    elif (39 <= period_count <= 50) and (avg_temperature < 15.5):
-        dsv = 0
-    elif (39 <= period_count <= 50) and (avg_temperature >= 15.5):
-        dsv = 1
-    elif (51 <= period_count <= 62) and (avg_temperature < 12.5):
-        dsv = 0
-    elif (51 <= period_count <= 62) and (12.5 <= avg_temperature < 15.5):
-        dsv = 1
-    elif (51 <= period_count <= 62) and (avg_temperature >= 15.5):
-        dsv = 2
-    elif (63 <= period_count <= 74) and (avg_temperature < 12.5):
-        dsv = 1
-    elif (63 <= period_count <= 74) and (12.5 <= avg_temperature < 15.5):
-        dsv = 2
-    elif (63 <= period_count <= 74) and (avg_temperature >= 15.5):
-        dsv = 3
-    elif (75 <= period_count <= 86) and (avg_temperature < 12.5):
-        dsv = 2
-    elif (75 <= period_count <= 86) and (12.5 <= avg_temperature < 15.5):
-        dsv = 3
-    elif (75 <= period_count <= 86) and (avg_temperature >= 15.5):
-        dsv = 4
-    elif (87 <= period_count <= 96) and (avg_temperature < 12.5):
-        dsv = 3
-    elif (87 <= period_count <= 96) and (avg_temperature >= 12.5):
-        dsv = 4
+    if 0 <= period_count <= MAXIMUM_PERIOD_COUNT and not isnan(avg_temperature):
+        row = int(period_count)
+        if period_count <= row_ends[row]:
+            dsv = grid[row][bisect_right(temperature_bands, avg_temperature)]
 
     return dsv
 
 
-# Returns DSV if given number of periods that RH >= 86 and temperature > 7 C based on the Tomcast table.
+# Same as grid_dsv_lookup, but for arrays of period counts and average temperatures.
+def grid_dsv_lookup_array(grid_array, row_ends_array, temperature_bands, rounding_temp, period_counts,
+                          avg_temperatures_raw):
+    period_counts = np.asarray(period_counts, dtype=np.float64)
+    avg_temperatures_raw = np.asarray(avg_temperatures_raw, dtype=np.float64)
+    avg_temperatures = np.where(avg_temperatures_raw > rounding_temp, np.round(avg_temperatures_raw),
+                                avg_temperatures_raw)
+
+    in_range = (period_counts >= 0) & (period_counts <= MAXIMUM_PERIOD_COUNT)
+    rows = np.where(in_range, period_counts, 0).astype(np.int64)
+    valid = in_range & (period_counts <= row_ends_array[rows]) & ~np.isnan(avg_temperatures)
+    bands = np.searchsorted(temperature_bands, avg_temperatures, side='right')
+    dsv = grid_array[rows, bands]
+
+    return np.where(valid, dsv, 0)
+
+
+# Returns DSV if given number of periods that RH >= 86 and temperature > 7 C based on the Wisdom table.
+def wisdom_dsv_lookup(period_count, avg_temperature_raw):
+    return grid_dsv_lookup(WISDOM_GRID, WISDOM_ROW_ENDS, WISDOM_TEMPERATURE_BANDS, WISDOM_ROUNDING_TEMP,
+                           period_count, avg_temperature_raw)
+
+
+# Returns DSV if given number of periods that RH >= 86 and temperature > 9 C based on the Tomcast table.
 def tomcast_dsv_lookup(period_count, avg_temperature_raw):
+    return grid_dsv_lookup(TOMCAST_GRID, TOMCAST_ROW_ENDS, TOMCAST_TEMPERATURE_BANDS, TOMCAST_ROUNDING_TEMP,
+                           period_count, avg_temperature_raw)
 
-    if avg_temperature_raw > 9.0:
-        avg_temperature = round(avg_temperature_raw)
-    else:
-        avg_temperature = avg_temperature_raw
 
-    dsv = 0
-    if 0 <= period_count <= 10:
-        dsv = 0
-    elif (11 <= period_count <= 14) and (avg_temperature < 20.5):
-        dsv = 0
-    elif (11 <= period_count <= 14) and (20.5 <= avg_temperature < 25.5):
-        dsv = 1
-    elif (11 <= period_count <= 14) and (avg_temperature >= 25.5):
-        dsv = 0
-    elif (15 <= period_count <= 22) and (avg_temperature < 17.5):
-        dsv = 0
-    elif (15 <= period_count <= 22) and (avg_temperature >= 17.5):
-        dsv = 1
-    elif (23 <= period_count <= 26) and (avg_temperature < 17.5):
-        dsv = 0
-    elif (23 <= period_count <= 26) and (17.5 <= avg_temperature < 20.5):
-        dsv = 1
-    elif (23 <= period_count <= 26) and (20.5 <= avg_temperature < 25.5):
-        dsv = 2
-    elif (23 <= period_count <= 26) and (avg_temperature >= 25.5):
-        dsv = 1
-    elif (27 <= period_count <= 34) and (avg_temperature < 20.5):
-        dsv = 1
-    elif (27 <= period_count <= 34) and (20.5 <= avg_temperature < 25.5):
-        dsv = 2
-    elif (27 <= period_count <= 34) and (avg_temperature >= 25.5):
-        dsv = 1
-    elif (35 <= period_count <= 50) and (avg_temperature < 17.5):
-        dsv = 1
-    elif (35 <= period_count <= 50) and (avg_temperature >= 17.5):
-        dsv = 2
-    elif (51 <= period_count <= 62) and (avg_temperature < 12.5):
-        dsv = 2
-    elif (51 <= period_count <= 62) and (12.5 <= avg_temperature < 17.5):
-        dsv = 1
-    elif (51 <= period_count <= 62) and (17.5 <= avg_temperature < 20.5):
-        dsv = 2
-    elif (51 <= period_count <= 62) and (20.5 <= avg_temperature < 25.5):
-        dsv = 3
-    elif (51 <= period_count <= 62) and (avg_temperature >= 25.5):
-        dsv = 2
-    elif (63 <= period_count <= 82) and (avg_temperature < 17.5):
-        dsv = 2
-    elif (63 <= period_count <= 82) and (avg_temperature >= 17.5):
-        dsv = 3
-    elif (83 <= period_count <= 90) and (avg_temperature < 20.5):
-        dsv = 3
-    elif (83 <= period_count <= 90) and (20.5 <= avg_temperature < 25.5):
-        dsv = 4
-    elif (83 <= period_count <= 90) and (avg_temperature >= 25.5):
-        dsv = 3
-    elif (91 <= period_count <= 96) and (avg_temperature < 17.5):
-        dsv = 3
-    elif (91 <= period_count <= 96) and (avg_temperature >= 17.5):
-        dsv = 4
+# Returns an array of Wisdom DSVs if given arrays of period counts and average temperatures.
+def wisdom_dsv_lookup_array(period_counts, avg_temperatures_raw):
+    return grid_dsv_lookup_array(WISDOM_GRID_ARRAY, WISDOM_ROW_ENDS_ARRAY, WISDOM_TEMPERATURE_BANDS,
+                                 WISDOM_ROUNDING_TEMP, period_counts, avg_temperatures_raw)
 
-    return dsv
+
+# Returns an array of TomCast DSVs if given arrays of period counts and average temperatures.
+def tomcast_dsv_lookup_array(period_counts, avg_temperatures_raw):
+    return grid_dsv_lookup_array(TOMCAST_GRID_ARRAY, TOMCAST_ROW_ENDS_ARRAY, TOMCAST_TEMPERATURE_BANDS,
+                                 TOMCAST_ROUNDING_TEMP, period_counts, avg_temperatures_raw)
 
 
 # If given a string representing the cardinal direction, will return equivalent direction in degrees.
@@ -6,7 +6,19 @@ Created on Tue May 14 11:35:55 2019
 """
 
 from .xml_parser import*
+from .DSVWriters import*
 from .UsefulClasses import*
 from .UsefulFunctions import*
+from .HttpClient import*
+from .DatamartCache import*
+from .StationRegistry import*
+from .ColumnarDSV import*
+from .IncrementalDSV import*
+from .BatchDSV import*
+from .ParallelDSV import*
+from .ReanalysisDSV import*
+from .OffsetIndex import*
 from .PotatoBlight import*
+from .DailyECStore import*
 from .DailyUpload import*
+from .DailyPipeline import*
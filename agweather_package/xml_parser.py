@@ -1,12 +1,18 @@
 from bs4 import BeautifulSoup
 from operator import itemgetter
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 from xml.etree import ElementTree
-import urllib.request
+from io import BytesIO
+import os
 import csv
-import yaml
+import requests
 from .UsefulFunctions import get_path_dir
 from .UsefulClasses import GroupedArray
+from .StationRegistry import get_station_registry
 from .UsefulFunctions import cardinal_to_degrees
+from .HttpClient import get_http_client
+from .DatamartCache import get_datamart_cache
 from tqdm import tqdm
 
 """
@@ -20,11 +26,25 @@ See the 'main' section of this file for examples
 MD_IE_PATH = '{http://dms.ec.gc.ca/schema/point-observation/2.1}set/' \
              '{http://dms.ec.gc.ca/schema/point-observation/2.1}identification-elements'
 R_ELEMENTS_PATH = '{http://dms.ec.gc.ca/schema/point-observation/2.1}elements'
+OM_NAMESPACE = '{http://www.opengis.net/om/1.0}'
+OBSERVATION_TAG = OM_NAMESPACE + 'Observation'
+OBSERVATION_PATH = OM_NAMESPACE + 'member/' + OBSERVATION_TAG
+MEMBER_TAG = OM_NAMESPACE + 'member'
+METADATA_TAG = OM_NAMESPACE + 'metadata'
+RESULT_TAG = OM_NAMESPACE + 'result'
+# The year of a record is stored as a qualifier inside the element of the record.
+RECORD_YEAR_FIELDS = {'record_high_temperature': 'record_high_temperature_year',
+                      'record_low_temperature': 'record_low_temperature_year'}
+# The identification elements that ECDocument needs to find stations and dates.
+IDENTIFICATION_FIELDS = ['transport_canada_id', 'observation_date_local_time']
 HOURLY_FIELDS = ['air_temperature', 'humidex', 'wind_speed', 'wind_direction']
 DAILY_FIELDS = ['air_temperature_yesterday_high', 'air_temperature_yesterday_low',
                 'total_precipitation', 'wind_gust_speed',
                 'record_high_temperature', 'record_high_temperature_year',
                 'record_low_temperature', 'record_low_temperature_year']
+# get_xml_objs only starts worker processes for at least this many files, since starting them takes longer than parsing
+# a couple of files.
+PARALLEL_PARSE_MIN_FILES = 8
 NUMBER_OF_DAILY = 2
 NUMBER_OF_HOURLY = 48
 HOURLY_URL = 'http://dd.weather.gc.ca/observations/xml/MB/hourly/'
@@ -37,22 +57,14 @@ def get_html_string(url):
     :param url: (str) the url to get html from
     :returns: (str) the string representation of the html at a url
     """
-    catcher = 0
-    while catcher < 3:
-        try:
-            URLObj = urllib.request.urlopen(url)
-            html_string = URLObj.read().decode('utf-8')
-            catcher = 3
-            return html_string
-        except:
-            print("Link retrieval error on:")
-            print(url)
-            html_string = ""
-            catcher += 1
-            if catcher == 3:
-                return html_string
-            else:
-                print("Trying again")
+    # The shared HttpClient tries again with a backoff, so an error here means every try failed (or, in offline mode,
+    # that url isn't in the DatamartCache).
+    try:
+        return get_datamart_cache().get_text(url)
+    except requests.RequestException:
+        print("Link retrieval error on:")
+        print(url)
+        return ""
 
 
 def get_stations_list(urlroot, strdate):
@@ -140,7 +152,7 @@ def parse_xml_links(link_base_url_root, xml_links, title_dict={}, clean_dict={},
         while catcher < 3:
             try:
                 # maybe use xml_file as a local file so you don't have to connect to phone wifi.
-                xml_file = urllib.request.urlopen(link_base_url_root + xml_address)
+                xml_file = BytesIO(get_datamart_cache().get_bytes(link_base_url_root + xml_address))
                 xml_parser_obj = ElementTree.parse(xml_file)
                 catcher = 3
             except:
@@ -182,59 +194,99 @@ def parse_xml_links(link_base_url_root, xml_links, title_dict={}, clean_dict={},
 def parse_mbag_xml(link_base_url_root, strdate, title_dict={}, clean_dict={}, clean=False, default_order=500):
     total_xml_data = []
     xml_address = "yesterday_mb_%s_e.xml" % strdate
-    catcher = 0
-    while catcher < 3:
-        try:
-            # maybe use xml_file as a local file so you don't have to connect to phone wifi.
-            xml_file = urllib.request.urlopen(link_base_url_root + xml_address)
-            xml_parser_obj = ElementTree.parse(xml_file)
-            catcher = 3
-        except:
-            catcher += 1
-            print("Error opening xmladdress" + xml_address)
-
-        el_tree = xml_parser_obj.getroot().getchildren()
-        for node in el_tree:
-            single_xml_data = {}
-            data_nodes = node.getchildren()
-            identification_node = data_nodes[0].getchildren()[0].getchildren()[0].getchildren()[-1]
-            result_node = data_nodes[-1].getchildren()[-1]
-            for each_node in [identification_node, result_node.getchildren()[0]]:
-                for each_element in each_node.getchildren():
-                    name = each_element.attrib.get('name')
-                    value = each_element.attrib.get('value')
-                    uom = each_element.attrib.get('uom').encode('ascii', 'ignore')
-                    order = int(default_order)
-                    qual = "qa_none"
+    # The shared HttpClient tries again with a backoff, so an error here means every try failed.
+    try:
+        # maybe use xml_file as a local file so you don't have to connect to phone wifi.
+        xml_file = BytesIO(get_datamart_cache().get_bytes(link_base_url_root + xml_address))
+    except requests.RequestException:
+        print("Error opening xmladdress" + xml_address)
+        return total_xml_data, []
+
+    for identification_elements, result_elements in iter_observations(xml_file):
+        single_xml_data = {}
+        for each_element in identification_elements + result_elements:
+            name = each_element.attrib.get('name')
+            value = each_element.attrib.get('value')
+            uom = each_element.attrib.get('uom').encode('ascii', 'ignore')
+            order = int(default_order)
+            qual = "qa_none"
+
+            if clean:
+                try:
+                    order = int(clean_dict[name][1])
+                    # Modify name last (lookups depend on it)
+                    name = clean_dict[name][0]
+                except:
+                    pass
+
+            single_xml_data[name] = [value, uom, order, qual]
+            title_dict[name] = [order, uom]
+        total_xml_data.append(single_xml_data)
+
+    title_list_sorted = sorted(list(title_dict.items()), key=itemgetter(1), reverse=False)
 
-                    if clean:
-                        try:
-                            order = int(clean_dict[name][1])
-                            # Modify name last (lookups depend on it)
-                            name = clean_dict[name][0]
-                        except:
-                            pass
+    return total_xml_data, title_list_sorted
 
-                    single_xml_data[name] = [value, uom, order, qual]
-                    title_dict[name] = [order, uom]
-            single_xml_copy = dict(single_xml_data)
-            total_xml_data.append(single_xml_copy)
 
-        title_list_sorted = sorted(list(title_dict.items()), key=itemgetter(1), reverse=False)
+# Returns the raw bytes of the xml file at xml_link, from the DatamartCache if it has a copy.
+def get_xml_bytes(xml_link):
+    try:
+        return get_datamart_cache().get_bytes(xml_link)
+    except requests.RequestException:
+        raise Exception("There is something wrong with the URL. Also, am I connected to the ME?")
 
-    return total_xml_data, title_list_sorted
 
+"""
+Purpose: get_xml_obj downloads the xml file at xml_link and returns it as an ECDocument. The file is read with
+iter_observations, so the whole tree is never built. If fields is given, only those result elements (and
+IDENTIFICATION_FIELDS) are kept, and get_value returns None for any other field.
+"""
 
-# Parses the xml file downloaded from xml_link into an ElementTree object and returns it.
-def get_xml_obj(xml_link):
-    try:
-        xml_file = urllib.request.urlopen(xml_link)
-        xml_obj = ElementTree.parse(xml_file)
 
-    except urllib.request.URLError:
-        raise Exception("There is something wrong with the URL. Also, am I connected to the ME?")
+def get_xml_obj(xml_link, fields=None):
+    return ECDocument(records=parse_observation_records(get_xml_bytes(xml_link), element_names(fields)))
+
 
-    return xml_obj
+"""
+Purpose: get_xml_objs downloads and parses a list of xml files and returns them as ECDocuments in the order of
+xml_links. The files are downloaded by the shared HttpClient's threads, and each thread hands its file to a pool of
+worker processes to be parsed as soon as it has arrived, so the files are parsed on more than one core while the rest
+are still downloading. The workers only send back the dictionaries from parse_observation_records, which are indexed
+into ECDocuments in this process.
+
+Parameters:
+    - fields: The fields to keep (see get_xml_obj).
+    - workers: The number of worker processes. The number of CPUs is used if it is None. If it is 1 or less, or if there
+    are fewer than PARALLEL_PARSE_MIN_FILES files, the files are parsed in the download threads instead.
+    - progress: A tqdm progress bar that is moved on by one for each file that has been parsed.
+"""
+
+
+def get_xml_objs(xml_links, fields=None, workers=None, progress=None):
+    names = element_names(fields)
+    if workers is None:
+        workers = os.cpu_count() or 1
+    workers = min(workers, len(xml_links))
+
+    if workers > 1 and len(xml_links) >= PARALLEL_PARSE_MIN_FILES:
+        try:
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                def download_and_submit(xml_link):
+                    parse_future = executor.submit(parse_observation_records, get_xml_bytes(xml_link), names)
+                    if progress is not None:
+                        parse_future.add_done_callback(lambda future: progress.update(1))
+                    return parse_future
+                parse_futures = get_http_client().fetch_all(download_and_submit, xml_links)
+                return [ECDocument(records=parse_future.result()) for parse_future in parse_futures]
+        except (OSError, NotImplementedError, BrokenProcessPool) as error:
+            print("Could not parse the xml files in parallel (%s). Parsing them one at a time instead." % error)
+
+    def download_and_parse(xml_link):
+        xml_obj = ECDocument(records=parse_observation_records(get_xml_bytes(xml_link), names))
+        if progress is not None:
+            progress.update(1)
+        return xml_obj
+    return get_http_client().fetch_all(download_and_parse, xml_links)
 
 
 # Gets all nodes with the 'name' specified by identifier.
@@ -247,65 +299,175 @@ def get_parent_nodes(xml_obj, identifier):
 
 # Returns a dictionary of all EC stations with corresponding data from stations.yaml.
 def station_id_dictionary(key='', all_keys=False):
-    output_dict = {}
-    with open(get_path_dir('config_files', 'stations.yaml'), 'r') as station_ids:
-        yaml_load = yaml.safe_load(station_ids)
-        for each_station in yaml_load:
-            # If all_keys == True then it stores all data for that station from stations.yaml.
-            if all_keys:
-                output_dict[each_station] = yaml_load[each_station]
-            # Otherwise it just stores a specific value into output_dict.
-            else:
-                output_dict[each_station] = yaml_load[each_station][key]
-    return output_dict
-
-
-# Gets the value of a field when given an ElementTree object (xml_obj) and a station name.
-def get_value(xml_obj, station, field_name):
-    metadata = get_parent_nodes(xml_obj, '{http://www.opengis.net/om/1.0}metadata')
-    result = get_parent_nodes(xml_obj, '{http://www.opengis.net/om/1.0}result')
-    value = ''
-    for each_index in range(len(metadata)):
-        # Get Identification elements from metadata. Identification elements stores the transport_canada_id.
-        # Look inside one of the xml files from http://dd.weather.gc.ca/observations/xml/MB/yesterday/ to understand.
-        meta_contents = metadata[each_index].find(MD_IE_PATH).getchildren()
-        result_contents = result[each_index].find(R_ELEMENTS_PATH).getchildren()
-        tc_id = extract_value(meta_contents, 'transport_canada_id')
-        if tc_id == station:
-            value = extract_value(result_contents, field_name)
+    registry = get_station_registry()
+    # If all_keys == True then it stores all data for that station from stations.yaml.
+    if all_keys:
+        return registry.get_station_values()
+    # Otherwise it just stores a specific value into output_dict.
+    return registry.get_station_values(key)
+
+
+# Returns the values of a list of elements as a dictionary keyed by their 'name' attribute. If a name is used more
+# than once, the first element is kept, the same as extract_value. Record years are added under their own names.
+def element_values(element_list):
+    values = {}
+    for each_element in element_list:
+        name = each_element.attrib.get('name')
+        if name in values:
+            continue
+        values[name] = each_element.attrib.get('value')
+        if name in RECORD_YEAR_FIELDS and RECORD_YEAR_FIELDS[name] not in values:
+            qualifiers = list(each_element)
+            values[RECORD_YEAR_FIELDS[name]] = qualifiers[-1].attrib.get('value') if len(qualifiers) > 0 else None
+    return values
+
+
+# Returns the names of the elements that hold fields, including the elements that hold the record years. Returns None
+# (all elements) if fields is None.
+def element_names(fields):
+    if fields is None:
+        return None
+    names = set(IDENTIFICATION_FIELDS) | set(fields)
+    for name, year_field in RECORD_YEAR_FIELDS.items():
+        if year_field in fields:
+            names.add(name)
+    return names
+
+
+# Returns the identification elements and the result elements of an om:Observation element. If names isn't None, only
+# the elements with those names are returned.
+def observation_elements(observation, names=None):
+    metadata = observation.find(METADATA_TAG)
+    result = observation.find(RESULT_TAG)
+    if metadata is None or result is None:
+        raise Exception('List of metadata and result are not the same size!')
+    identification_elements = list(metadata.find(MD_IE_PATH))
+    result_elements = list(result.find(R_ELEMENTS_PATH))
+    if names is not None:
+        identification_elements = [each for each in identification_elements if each.attrib.get('name') in names]
+        result_elements = [each for each in result_elements if each.attrib.get('name') in names]
+    return identification_elements, result_elements
+
+
+"""
+Purpose: iter_observations reads a SWOB-ML xml file (a file name or a file object) with iterparse and yields the
+identification elements and the result elements of each observation, the same as observation_elements. Only 'start'
+events are asked for, and an om:member is read once the next one starts (or the file ends), since by then all of its
+elements have been parsed. Each member is then removed from the tree, so at most two are held in memory at a time.
+The elements yielded are only valid until the next observation is read.
+"""
+
+
+def iter_observations(xml_file, names=None):
+    root = None
+    member = None
+    for event, element in ElementTree.iterparse(xml_file, events=('start',)):
+        if root is None:
+            root = element
+        elif element.tag == MEMBER_TAG:
+            if member is not None:
+                yield from member_observation(member, names)
+            member = element
+            # The parser keeps adding to the new member after it is removed from the root.
+            root.clear()
+    if member is not None:
+        yield from member_observation(member, names)
+
+
+# Yields the identification and result elements of the observation of an om:member element, if it has one.
+def member_observation(member, names=None):
+    observation = member.find(OBSERVATION_TAG)
+    if observation is not None:
+        yield observation_elements(observation, names)
+
+
+# Returns the (identification, results) dictionaries of element_values for every observation in the raw bytes of an
+# xml file. It is run by the worker processes of get_xml_objs, so it only returns lists and dictionaries.
+def parse_observation_records(xml_bytes, names=None):
+    return [(element_values(identification_elements), element_values(result_elements))
+            for identification_elements, result_elements in iter_observations(BytesIO(xml_bytes), names)]
+
+
+# Returns the value of field_name from the dictionary of element_values. Wind directions are converted to degrees.
+def field_value(values, field_name):
+    value = values.get(field_name)
+    if field_name == 'wind_direction' and field_name in values:
+        value = cardinal_to_degrees(value)
     return value
 
 
+"""
+Purpose: The class ECDocument is a parsed SWOB-ML XML file from the EC datamart. The identification elements and the
+result elements of every observation are read into dictionaries once when it is created, so the value of a field is
+found with dictionary lookups instead of searching the whole tree. It is created from either an ElementTree object
+(tree) or the (identification, results) dictionaries from parse_observation_records (records).
+
+Variables:
+    - tree: The ElementTree object of the file, or None if it was created from records.
+    - observations: A list of (identification, results) dictionaries, one per observation in the order of the file.
+    - stations: The results dictionary of each transport canada ID. If an ID is used more than once, the last
+    observation is kept, the same as get_value did.
+"""
+
+
+class ECDocument:
+
+    def __init__(self, tree=None, records=None):
+        self.tree = tree
+        self.observations = []
+        self.stations = {}
+        if records is None:
+            records = [(element_values(identification_elements), element_values(result_elements))
+                       for identification_elements, result_elements in
+                       (observation_elements(observation) for observation in tree.getroot().iterfind(OBSERVATION_PATH))]
+        for identification, results in records:
+            self.observations.append((identification, results))
+            tc_id = identification.get('transport_canada_id')
+            if tc_id is not None:
+                self.stations[tc_id] = results
+
+    def getroot(self):
+        return None if self.tree is None else self.tree.getroot()
+
+    def get_value(self, station, field_name):
+        if station not in self.stations:
+            return ''
+        return field_value(self.stations[station], field_name)
+
+    def get_date(self):
+        return self.observations[-1][0].get('observation_date_local_time').split('T')[0]
+
+
+# Returns xml_obj as an ECDocument, indexing it first if it is an ElementTree object.
+def as_ec_document(xml_obj):
+    if isinstance(xml_obj, ECDocument):
+        return xml_obj
+    return ECDocument(xml_obj)
+
+
+# Gets the value of a field when given an ECDocument (xml_obj) and a station name.
+def get_value(xml_obj, station, field_name):
+    return as_ec_document(xml_obj).get_value(station, field_name)
+
+
 def get_date_from_xml(xml_obj):
-    meta_data = get_parent_nodes(xml_obj, '{http://www.opengis.net/om/1.0}metadata')
-    meta_contents = meta_data[-1].find(MD_IE_PATH).getchildren()
-    return extract_value(meta_contents, 'observation_date_local_time').split('T')[0]
+    return as_ec_document(xml_obj).get_date()
 
 
 def update_weather_array(xml_obj, fields, grouped_array):
-    metadata = get_parent_nodes(xml_obj, '{http://www.opengis.net/om/1.0}metadata')
-    result = get_parent_nodes(xml_obj, '{http://www.opengis.net/om/1.0}result')
-    id_dictionary = station_id_dictionary('mbag_id')
-    if len(metadata) != len(result):
-        raise Exception('List of metadata and result are not the same size!')
-    else:
-        list_size = len(metadata)
-        for each_index in range(list_size):
-            meta_contents = metadata[each_index].find(MD_IE_PATH).getchildren()
-            result_contents = result[each_index].find(R_ELEMENTS_PATH).getchildren()
-            tc_id = extract_value(meta_contents, 'transport_canada_id')
+    id_dictionary = get_station_registry().mbag_ids
+    for identification, results in as_ec_document(xml_obj).observations:
+        tc_id = identification.get('transport_canada_id')
+        if tc_id in id_dictionary:
             mbag_id = None
-            observation_date = extract_value(meta_contents, 'observation_date_local_time')
-            if tc_id in id_dictionary.keys():
-                if observation_date is not None:
-                    observation_date = extract_value(
-                        meta_contents, 'observation_date_local_time').replace('.000 CDT', '').replace('T', ' ')
-                    mbag_id = id_dictionary[tc_id]
-                data_entry = [observation_date, tc_id, mbag_id]
-                for each_field in fields:
-                    field_value = extract_value(result_contents, each_field)
-                    data_entry.append(field_value)
-                grouped_array.insert_data(tc_id, data_entry)
+            observation_date = identification.get('observation_date_local_time')
+            if observation_date is not None:
+                observation_date = observation_date.replace('.000 CDT', '').replace('T', ' ')
+                mbag_id = id_dictionary[tc_id]
+            data_entry = [observation_date, tc_id, mbag_id]
+            for each_field in fields:
+                data_entry.append(field_value(results, each_field))
+            grouped_array.insert_data(tc_id, data_entry)
 
 
 def grab_desired_xml_data(daily_or_hourly):
@@ -324,8 +486,12 @@ def grab_desired_xml_data(daily_or_hourly):
     else:
         raise Exception('Expected \'daily\' or \'hourly\', got %s instead.' % daily_or_hourly)
 
-    for each_file in tqdm(iterable=desired_xml_file_names, total=period, desc='Downloading %s data' % daily_or_hourly):
-        xml_obj = get_xml_obj(xml_url + '/' + each_file)
+    # The files are downloaded and parsed at the same time, and added to weather_grouped_array in the order of their
+    # names.
+    xml_links = [xml_url + '/' + each_file for each_file in desired_xml_file_names]
+    with tqdm(total=len(xml_links), desc='Downloading %s data' % daily_or_hourly) as progress:
+        xml_objs = get_xml_objs(xml_links, fields, progress=progress)
+    for xml_obj in xml_objs:
         update_weather_array(xml_obj, fields, weather_grouped_array)
 
     return weather_grouped_array
@@ -0,0 +1,54 @@
+"""
+Purpose: common contains the helpers shared by the benchmark scripts: writing synthetic data files and taking an
+earlier version of agweather_package from git to compare with.
+"""
+
+import os
+import random
+import subprocess
+from datetime import datetime, timedelta
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+# Extracts agweather_package and config_files as they were at revision into target_dir, so that target_dir can be put
+# on sys.path (and used as the working directory) to run the earlier version.
+def extract_revision(revision, target_dir):
+    os.makedirs(target_dir, exist_ok=True)
+    archive = subprocess.run(['git', 'archive', '--format=tar', revision, 'agweather_package', 'config_files'],
+                             cwd=REPO_ROOT, check=True, stdout=subprocess.PIPE).stdout
+    subprocess.run(['tar', '-x', '-C', target_dir], input=archive, check=True)
+    return target_dir
+
+
+"""
+Purpose: write_mawp15 writes a synthetic file in the mawp15.txt format, with a row every 15 minutes for each station.
+Like the real file, a few rows are missing, some have -7999 or unreadable values, and there are a few gaps of up to
+40 hours.
+"""
+
+
+def write_mawp15(file_path, stations=100, days=150, seed=1):
+    rng = random.Random(seed)
+    time_stamp = datetime(2015, 5, 1, 0, 0)
+    end = time_stamp + timedelta(days=days)
+    day_values = {}
+    with open(file_path, 'w') as mawp_file:
+        mawp_file.write('DateTime,StnID,Temp,RH,Rain,AvgWS,AvgWD\n')
+        while time_stamp < end:
+            stamp = '%s %d:%02d' % (time_stamp.strftime('%Y-%m-%d'), time_stamp.hour, time_stamp.minute)
+            for station in range(stations):
+                if rng.random() < 0.01:
+                    continue
+                wet_chance, mean_temp = day_values.setdefault((station, time_stamp.date()),
+                                                              (rng.random(), rng.uniform(5, 26)))
+                temp = round(mean_temp + rng.uniform(-3, 3), 1)
+                rh = rng.randint(86, 100) if rng.random() < wet_chance else rng.randint(40, 85)
+                if rng.random() < 0.002:
+                    temp = -7999
+                if rng.random() < 0.0005:
+                    rh = 'x'
+                mawp_file.write('%s,%d,%s,%s,0,1.5,%d\n' % (stamp, 100 + station, temp, rh, rng.randint(0, 359)))
+            time_stamp += timedelta(minutes=15)
+            if rng.random() < 0.001:
+                time_stamp += timedelta(hours=rng.randint(1, 40))
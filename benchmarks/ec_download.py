@@ -0,0 +1,142 @@
+"""
+Purpose: Times the EC XML downloads against the stand-in server in ec_server, for the version before the shared
+HttpClient and for later versions: the 25 files of a backfill (download_all_xml_objects) and the 48 hourly files of
+grab_desired_xml_data('hourly'). Each request takes --latency seconds, and the runs are repeated with --fail-rate of
+the requests answered with 503. The versions run in their own processes, each in an empty working directory. The
+retry backoff of HttpClient is shortened to --backoff-base so that the runs with 503 answers don't spend most of their
+time waiting.
+
+The output of each job is reduced to a hash of the GroupedArray that update_weather_array builds from the files, which
+must be the same for every version that finished.
+
+Run from the AgAuto directory:
+    python benchmarks/ec_download.py [--versions 981da86^ current] [--latency 0.1] [--fail-rate 0.15]
+"""
+
+import os
+import io
+import sys
+import json
+import shutil
+import hashlib
+import argparse
+import tempfile
+import subprocess
+import contextlib
+from time import perf_counter
+from datetime import date, timedelta
+
+BENCHMARKS_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, BENCHMARKS_DIR)
+from common import REPO_ROOT, extract_revision
+
+# The commit that added HttpClient, and so the version before it.
+DEFAULT_VERSIONS = ['981da86^', 'current']
+BACKFILL_FIELDS = ['air_temperature_yesterday_high', 'air_temperature_yesterday_low', 'total_precipitation']
+
+
+# Returns a hash of the GroupedArray that update_weather_array builds from xml_objs.
+def weather_hash(xml_parser, xml_objs, fields):
+    from agweather_package.UsefulClasses import GroupedArray
+    grouped_array = GroupedArray()
+    for each_obj in xml_objs:
+        xml_parser.update_weather_array(each_obj, fields, grouped_array)
+    return hashlib.sha256(repr(sorted(grouped_array.data_dict.items())).encode()).hexdigest()
+
+
+# Runs both jobs with the agweather_package found on sys.path, and returns the time, server counts and output hash of
+# each.
+def measure(latency, fail_rate, backoff_base):
+    from ec_server import ECServer
+    import agweather_package.xml_parser as xml_parser
+    import agweather_package.DailyUpload as daily_upload
+    from tqdm import tqdm
+
+    if 'agweather_package.HttpClient' in sys.modules:
+        sys.modules['agweather_package.HttpClient'].BACKOFF_BASE = backoff_base
+    quiet_tqdm = lambda *args, **kwargs: tqdm(*args, disable=True, **kwargs)
+    xml_parser.tqdm = daily_upload.tqdm = quiet_tqdm
+
+    server = ECServer()
+    xml_parser.DAILY_URL = server.url('yesterday/')
+    xml_parser.HOURLY_URL = server.url('hourly/')
+    links = [xml_parser.generate_daily_xml_link((date(2022, 5, 1) + timedelta(days=day)).strftime('%Y%m%d'))
+             for day in range(25)]
+
+    def backfill():
+        return weather_hash(xml_parser, daily_upload.download_all_xml_objects(links), BACKFILL_FIELDS)
+
+    def hourly():
+        grouped_array = xml_parser.grab_desired_xml_data('hourly')
+        return hashlib.sha256(repr(sorted(grouped_array.data_dict.items())).encode()).hexdigest()
+
+    results = []
+    for name, job in (('25-day backfill', backfill), ('48 hourly files', hourly)):
+        server.reset(latency, fail_rate)
+        start = perf_counter()
+        try:
+            with contextlib.redirect_stdout(io.StringIO()):
+                output = job()
+            error = None
+        except Exception as job_error:
+            output = None
+            error = str(job_error)[:60]
+        results.append({'job': name, 'seconds': perf_counter() - start, 'stats': server.stats, 'output': output,
+                        'error': error})
+    return results
+
+
+def run_measure(package_dir, work_dir, args, fail_rate):
+    result = subprocess.run([sys.executable, os.path.abspath(__file__), '--measure', '--package-dir', package_dir,
+                             '--latency', str(args.latency), '--fail-rate', str(fail_rate), '--backoff-base',
+                             str(args.backoff_base)], check=True, stdout=subprocess.PIPE, cwd=work_dir)
+    return json.loads(result.stdout.decode().strip().split('\n')[-1])
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Times the EC XML downloads against a stand-in server.")
+    arg_parser.add_argument('--versions', nargs='+', default=DEFAULT_VERSIONS,
+                            help="git revisions to compare, or 'current' for the working tree")
+    arg_parser.add_argument('--latency', type=float, default=0.1)
+    arg_parser.add_argument('--fail-rate', type=float, default=0.15)
+    arg_parser.add_argument('--backoff-base', type=float, default=0.05)
+    arg_parser.add_argument('--measure', action='store_true', help=argparse.SUPPRESS)
+    arg_parser.add_argument('--package-dir', help=argparse.SUPPRESS)
+    args = arg_parser.parse_args()
+
+    if args.measure:
+        sys.path.insert(0, args.package_dir)
+        print(json.dumps(measure(args.latency, args.fail_rate, args.backoff_base)))
+        return
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        package_dirs = {}
+        for version in args.versions:
+            if version == 'current':
+                package_dirs[version] = REPO_ROOT
+            else:
+                version_dir = os.path.join(temp_dir, 'version%d' % len(package_dirs))
+                package_dirs[version] = extract_revision(version, version_dir)
+
+        print("%-10s %-6s %-16s %8s %9s %12s %5s %8s  %s" % ('Version', 'Fail', 'Job', 'Seconds', 'Requests',
+                                                             'Connections', '503s', 'Parallel', 'Result'))
+        for fail_rate in (0.0, args.fail_rate):
+            outputs = {}
+            for run, version in enumerate(args.versions):
+                work_dir = os.path.join(temp_dir, 'work%d_%d' % (run, int(fail_rate * 100)))
+                shutil.copytree(os.path.join(package_dirs[version], 'config_files'),
+                                os.path.join(work_dir, 'config_files'))
+                for result in run_measure(package_dirs[version], work_dir, args, fail_rate):
+                    stats = result['stats']
+                    if result['error'] is None:
+                        outputs.setdefault(result['job'], set()).add(result['output'])
+                    print("%-10s %-6.2f %-16s %8.2f %9i %12i %5i %8i  %s" % (
+                        version, fail_rate, result['job'], result['seconds'], stats['requests'],
+                        stats['connections'], stats['failures'], stats['max_active'],
+                        'ok' if result['error'] is None else 'FAILED: %s' % result['error']))
+            for job, job_outputs in outputs.items():
+                print("%-10s %-6.2f %-16s same output: %s" % ('', fail_rate, job, len(job_outputs) == 1))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,103 @@
+"""
+Purpose: Times get_xml_objs with 1, 2 and 4 parse workers against the stand-in server in ec_server, for the 25 files
+of a backfill and the 48 hourly files, with no latency and with --latency seconds per request. Each time is the best
+of --repeat runs, and every run starts with an empty DatamartCache (if the version has one) so that every file is
+downloaded. The ECDocuments and the GroupedArray built from them must be the same for every number of workers.
+
+The version is run in its own process, in an empty working directory. Extra workers only help on a machine with more
+than one CPU.
+
+Run from the AgAuto directory:
+    python benchmarks/ec_parse_workers.py [--version current] [--latency 0.05] [--repeat 3]
+"""
+
+import os
+import io
+import sys
+import shutil
+import hashlib
+import argparse
+import tempfile
+import subprocess
+import contextlib
+from time import perf_counter
+from datetime import date, timedelta
+
+BENCHMARKS_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, BENCHMARKS_DIR)
+from common import REPO_ROOT, extract_revision
+
+WORKERS = [1, 2, 4]
+BACKFILL_FIELDS = ['air_temperature_yesterday_high', 'air_temperature_yesterday_low', 'total_precipitation']
+
+
+def measure(latencies, repeat):
+    from ec_server import ECServer, HOURLY_NAMES
+    import agweather_package.xml_parser as xml_parser
+    from agweather_package.UsefulClasses import GroupedArray
+
+    server = ECServer()
+    xml_parser.DAILY_URL = server.url('yesterday/')
+    xml_parser.HOURLY_URL = server.url('hourly/')
+    backfill_links = [xml_parser.generate_daily_xml_link((date(2022, 5, 1) + timedelta(days=day)).strftime('%Y%m%d'))
+                      for day in range(25)]
+    hourly_links = [xml_parser.HOURLY_URL + name for name in sorted(HOURLY_NAMES) if name.endswith('_e.xml')]
+    cache_module = sys.modules.get('agweather_package.DatamartCache')
+
+    print("%-8s %-16s %8s %8s  %s" % ('Latency', 'Job', 'Workers', 'Seconds', 'Same as 1 worker'))
+    runs = 0
+    for latency in latencies:
+        for name, links, fields in (('25-day backfill', backfill_links, BACKFILL_FIELDS),
+                                    ('48 hourly files', hourly_links, xml_parser.HOURLY_FIELDS)):
+            first_output = None
+            for workers in WORKERS:
+                server.reset(latency)
+                best = None
+                for _ in range(repeat):
+                    if cache_module is not None:
+                        runs += 1
+                        cache_module.configure_datamart_cache(folder='datamart_cache_%d' % runs)
+                    start = perf_counter()
+                    with contextlib.redirect_stdout(io.StringIO()):
+                        xml_objs = xml_parser.get_xml_objs(links, fields, workers=workers)
+                    seconds = perf_counter() - start
+                    best = seconds if best is None else min(best, seconds)
+                grouped_array = GroupedArray()
+                for each_obj in xml_objs:
+                    xml_parser.update_weather_array(each_obj, fields, grouped_array)
+                output = hashlib.sha256(repr(([each_obj.observations for each_obj in xml_objs],
+                                              sorted(grouped_array.data_dict.items()))).encode()).hexdigest()
+                if first_output is None:
+                    first_output = output
+                print("%5i ms  %-16s %8i %8.3f  %s" % (latency * 1000, name, workers, best, output == first_output))
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Times get_xml_objs with different numbers of parse workers.")
+    arg_parser.add_argument('--version', default='current',
+                            help="git revision to time, or 'current' for the working tree")
+    arg_parser.add_argument('--latency', type=float, default=0.05)
+    arg_parser.add_argument('--repeat', type=int, default=3)
+    arg_parser.add_argument('--measure', action='store_true', help=argparse.SUPPRESS)
+    arg_parser.add_argument('--package-dir', help=argparse.SUPPRESS)
+    args = arg_parser.parse_args()
+
+    if args.measure:
+        sys.path.insert(0, args.package_dir)
+        measure([0.0, args.latency], args.repeat)
+        return
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        if args.version == 'current':
+            package_dir = REPO_ROOT
+        else:
+            package_dir = extract_revision(args.version, os.path.join(temp_dir, 'version'))
+        work_dir = os.path.join(temp_dir, 'work')
+        shutil.copytree(os.path.join(package_dir, 'config_files'), os.path.join(work_dir, 'config_files'))
+        print("%s, %i CPUs" % (args.version, os.cpu_count() or 1))
+        subprocess.run([sys.executable, os.path.abspath(__file__), '--measure', '--package-dir', package_dir,
+                        '--latency', str(args.latency), '--repeat', str(args.repeat)], check=True, cwd=work_dir)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,86 @@
+"""
+Purpose: ec_server is a stand-in for the EC datamart for the download benchmarks. Every XML file it serves is
+agweather_package/xml_test.xml, and every URL ending with '/' is a listing of 48 hourly files. Each request waits
+latency seconds before it is answered, and fail_rate of the requests are answered with 503. Which tries of which files
+fail only depends on seed, not on the order the requests arrive in, so every run fails the same requests. The server
+counts the requests, the connections, the 503 answers and the most requests it was answering at the same time.
+"""
+
+import os
+import random
+import threading
+from time import sleep
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from common import REPO_ROOT
+
+HOURLY_NAMES = ['hourly_mb_%s%02d_%s.xml' % (day, hour, language) for day in ('20220601', '20220602')
+                for hour in range(24) for language in ('e', 'f')]
+STAT_NAMES = ['requests', 'connections', 'failures', 'active', 'max_active']
+
+
+class ECServer:
+
+    def __init__(self, latency=0.1, fail_rate=0.0, seed=7):
+        with open(os.path.join(REPO_ROOT, 'agweather_package', 'xml_test.xml'), 'rb') as xml_file:
+            self.xml = xml_file.read()
+        self.listing = ('<html><body>' + ''.join('<a href="%s">%s</a>' % (name, name) for name in sorted(HOURLY_NAMES))
+                        + '</body></html>').encode()
+        self.lock = threading.Lock()
+        self.reset(latency, fail_rate, seed)
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), make_handler(self))
+        self.server.daemon_threads = True
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    # Sets the latency and failure rate and sets the counts back to 0.
+    def reset(self, latency=0.1, fail_rate=0.0, seed=7):
+        self.latency = latency
+        self.fail_rate = fail_rate
+        self.seed = seed
+        self.tries = {}
+        self.stats = dict.fromkeys(STAT_NAMES, 0)
+
+    def url(self, path=''):
+        return 'http://127.0.0.1:%d/%s' % (self.server.server_address[1], path)
+
+    def count(self, name, change=1):
+        with self.lock:
+            self.stats[name] += change
+            self.stats['max_active'] = max(self.stats['max_active'], self.stats['active'])
+
+
+def make_handler(ec_server):
+
+    class Handler(BaseHTTPRequestHandler):
+
+        protocol_version = 'HTTP/1.1'
+
+        def log_message(self, *args):
+            pass
+
+        def setup(self):
+            super(Handler, self).setup()
+            ec_server.count('connections')
+
+        def do_GET(self):
+            ec_server.count('requests')
+            ec_server.count('active')
+            with ec_server.lock:
+                tries = ec_server.tries[self.path] = ec_server.tries.get(self.path, 0) + 1
+            fail = random.Random('%s %s %d' % (ec_server.seed, self.path, tries)).random() < ec_server.fail_rate
+            try:
+                sleep(ec_server.latency)
+                if fail:
+                    ec_server.count('failures')
+                    self.send_response(503)
+                    self.send_header('Content-Length', '0')
+                    self.end_headers()
+                    return
+                body = ec_server.listing if self.path.endswith('/') else ec_server.xml
+                self.send_response(200)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+            finally:
+                ec_server.count('active', -1)
+
+    return Handler
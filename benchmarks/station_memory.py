@@ -0,0 +1,110 @@
+"""
+Purpose: Measures the memory used by the WeatherStation objects of a synthetic season with tracemalloc, for the
+version of agweather_package before DailyData stored its readings in typed arrays and for the current one. Each
+version is run in its own process, in three ways:
+    - split: split_text_file and WeatherStation objects, the way initialize_stations reads mawp15.txt.
+    - stream: stream_stations with compact=False, so every reading is kept.
+    - compact: stream_stations with compact=True.
+Peak is the most memory used while reading the file, and retained is what the stations still use afterwards. The
+DSV output of the two versions must be the same.
+
+Run from the AgAuto directory:
+    python benchmarks/station_memory.py [--stations 100] [--days 150] [--baseline 5f86616^]
+"""
+
+import os
+import io
+import sys
+import json
+import hashlib
+import argparse
+import tempfile
+import subprocess
+import contextlib
+import tracemalloc
+from time import perf_counter
+from datetime import datetime
+
+MODES = ['split', 'stream', 'compact']
+# The commit that changed DailyData to typed arrays, and so the version before it.
+DEFAULT_BASELINE = '5f86616^'
+SEED_DATE = '2015-06-01'
+
+
+# Reads the stations in one of MODES with the agweather_package found on sys.path, and returns the measurements.
+def measure(mode, data_dir):
+    from agweather_package.UsefulClasses import WeatherStation
+    from agweather_package.UsefulFunctions import split_text_file
+    from agweather_package.PotatoBlight import stream_stations
+
+    tracemalloc.start()
+    start = perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()), contextlib.redirect_stderr(io.StringIO()):
+        if mode == 'split':
+            stations = {}
+            for each in split_text_file('mawp15.txt', data_dir):
+                data_list = each.strip('\n').split(',')
+                if data_list[1] != '-7999' and data_list[2] != '-7999' and data_list[3] != '-7999':
+                    if data_list[1] not in stations:
+                        stations[data_list[1]] = WeatherStation(data_list[1])
+                    stations[data_list[1]].add_data(data_list)
+        else:
+            stations = stream_stations('mawp15.txt', data_dir, mode == 'compact')
+    seconds = perf_counter() - start
+    retained, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    output = hashlib.sha256()
+    seed_date = datetime.strptime(SEED_DATE, '%Y-%m-%d')
+    with contextlib.redirect_stdout(io.StringIO()):
+        for station in stations.values():
+            today_dsv, cumul_dsv, output_txt = station.today_dsv(seed_date)
+            output.update(('%s %s %s\n%s' % (station.get_id(), cumul_dsv, today_dsv, output_txt)).encode())
+    return {'seconds': seconds, 'peak': peak, 'retained': retained, 'output': output.hexdigest()}
+
+
+def run_measure(package_dir, mode, data_dir):
+    result = subprocess.run([sys.executable, os.path.abspath(__file__), '--measure', mode, '--package-dir',
+                             package_dir, '--data-dir', data_dir], check=True, stdout=subprocess.PIPE,
+                            cwd=package_dir)
+    return json.loads(result.stdout.decode().strip().split('\n')[-1])
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Measures the memory used by WeatherStation objects.")
+    arg_parser.add_argument('--stations', type=int, default=100)
+    arg_parser.add_argument('--days', type=int, default=150)
+    arg_parser.add_argument('--baseline', default=DEFAULT_BASELINE)
+    arg_parser.add_argument('--measure', choices=MODES, help=argparse.SUPPRESS)
+    arg_parser.add_argument('--package-dir', help=argparse.SUPPRESS)
+    arg_parser.add_argument('--data-dir', help=argparse.SUPPRESS)
+    args = arg_parser.parse_args()
+
+    if args.measure is not None:
+        sys.path.insert(0, args.package_dir)
+        print(json.dumps(measure(args.measure, args.data_dir)))
+        return
+
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    from common import REPO_ROOT, extract_revision, write_mawp15
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        data_dir = os.path.join(temp_dir, 'data')
+        os.mkdir(data_dir)
+        write_mawp15(os.path.join(data_dir, 'mawp15.txt'), args.stations, args.days)
+        versions = [(args.baseline, extract_revision(args.baseline, os.path.join(temp_dir, 'baseline'))),
+                    ('current', REPO_ROOT)]
+
+        print("%-10s %-8s %8s %10s %13s" % ('Version', 'Mode', 'Seconds', 'Peak MB', 'Retained MB'))
+        for mode in MODES:
+            outputs = set()
+            for name, package_dir in versions:
+                result = run_measure(package_dir, mode, data_dir)
+                outputs.add(result['output'])
+                print("%-10s %-8s %8.1f %10.1f %13.1f" % (name, mode, result['seconds'], result['peak'] / 1e6,
+                                                          result['retained'] / 1e6))
+            print("%-10s %-8s same output: %s" % ('', mode, len(outputs) == 1))
+
+
+if __name__ == '__main__':
+    main()
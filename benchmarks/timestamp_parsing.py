@@ -0,0 +1,72 @@
+"""
+Purpose: Times how long it takes to parse a season of 15 minute time stamps and split them into noon-to-noon days,
+with the strptime and check_valid_range code WeatherStation.add_data used before TimeStampParser, and with
+TimeStampParser and noon_limit. Both must find the same number of days.
+
+Run from the AgAuto directory:
+    python benchmarks/timestamp_parsing.py [--stamps 1000000]
+"""
+
+import os
+import sys
+import argparse
+from time import perf_counter
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from agweather_package.UsefulClasses import TimeStampParser
+from agweather_package.UsefulFunctions import noon_limit
+
+
+def make_stamps(count):
+    start = datetime(2015, 5, 1, 12, 15)
+    return [(start + timedelta(minutes=15 * index)).strftime('%Y-%m-%d %H:%M') for index in range(count)]
+
+
+# The way add_data split the stamps into days before TimeStampParser: every stamp parsed with strptime, and the day's
+# date formatted and parsed again for every stamp by check_valid_range.
+def count_days_strptime(stamps):
+    day = None
+    days = 0
+    for each in stamps:
+        new_date = datetime.strptime(each, '%Y-%m-%d %H:%M')
+        if day is None:
+            day = new_date
+            days += 1
+        else:
+            day_reset = datetime.strptime(day.strftime("%Y-%m-%d") + " 12:00", "%Y-%m-%d %H:%M") + timedelta(days=1)
+            if not new_date <= day_reset:
+                day = new_date
+                days += 1
+    return days
+
+
+def count_days_parser(stamps):
+    parser = TimeStampParser()
+    day_limit = None
+    days = 0
+    for each in stamps:
+        minutes = parser.parse_minutes(each)
+        if day_limit is None or minutes > day_limit:
+            day_limit = noon_limit(minutes)
+            days += 1
+    return days
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Times time stamp parsing and day splitting.")
+    arg_parser.add_argument('--stamps', type=int, default=1000000)
+    args = arg_parser.parse_args()
+
+    stamps = make_stamps(args.stamps)
+    results = []
+    for name, count_days in (('strptime', count_days_strptime), ('TimeStampParser', count_days_parser)):
+        start = perf_counter()
+        days = count_days(stamps)
+        results.append(days)
+        print("%-16s %8i days %8.2f s" % (name, days, perf_counter() - start))
+    print("Same days: %s" % (results[0] == results[1]))
+
+
+if __name__ == '__main__':
+    main()
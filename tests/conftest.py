@@ -0,0 +1,120 @@
+"""
+Shared fixtures for the agweather_package tests. The package reads and writes its files relative to the working
+directory (see get_path_dir), so every test that touches files runs in its own temporary working directory.
+"""
+
+import os
+import sys
+import gzip
+import hashlib
+import threading
+import pytest
+from email.utils import formatdate
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from time import time
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+
+# Runs the test in an empty working directory with the folders that AgAuto expects.
+@pytest.fixture
+def work_dir(tmp_path, monkeypatch):
+    for folder in ('input_data', 'raw_output_data', 'config_files'):
+        (tmp_path / folder).mkdir()
+    monkeypatch.chdir(tmp_path)
+    return tmp_path
+
+
+"""
+Purpose: LocalServer is a small HTTP/1.1 server on 127.0.0.1 for the download tests. It serves the files published
+with publish, with an ETag and Last-Modified header, and answers If-None-Match (304), Range/If-Range (206 or 416) and
+Accept-Encoding: gzip the same way the mbagweather.ca server does. The headers of every request are kept in requests.
+If cut_after is set, the next response is cut off after that many bytes of its body.
+"""
+
+
+class LocalServer:
+
+    def __init__(self):
+        self.files = {}
+        self.requests = []
+        self.cut_after = None
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), make_handler(self))
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def url(self, name):
+        return 'http://127.0.0.1:%d/%s' % (self.server.server_address[1], name)
+
+    def publish(self, name, data):
+        self.files[name] = (data, '"%s"' % hashlib.md5(data).hexdigest(), formatdate(time(), usegmt=True))
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+def make_handler(local_server):
+
+    class Handler(BaseHTTPRequestHandler):
+
+        protocol_version = 'HTTP/1.1'
+
+        def log_message(self, *args):
+            pass
+
+        def send_empty(self, status, etag=None):
+            self.send_response(status)
+            if etag is not None:
+                self.send_header('ETag', etag)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+
+        def do_GET(self):
+            local_server.requests.append(dict(self.headers))
+            name = self.path.lstrip('/')
+            if name not in local_server.files:
+                self.send_empty(404)
+                return
+            data, etag, last_modified = local_server.files[name]
+            if self.headers.get('If-None-Match') == etag:
+                self.send_empty(304, etag)
+                return
+
+            status = 200
+            body = data
+            if 'Range' in self.headers and self.headers.get('If-Range', etag) in (etag, last_modified):
+                start = int(self.headers['Range'].split('=')[1].rstrip('-'))
+                if start >= len(data):
+                    self.send_empty(416)
+                    return
+                status = 206
+                body = data[start:]
+            encoding = None
+            if status == 200 and 'gzip' in self.headers.get('Accept-Encoding', ''):
+                body = gzip.compress(body)
+                encoding = 'gzip'
+
+            self.send_response(status)
+            self.send_header('ETag', etag)
+            self.send_header('Last-Modified', last_modified)
+            if encoding is not None:
+                self.send_header('Content-Encoding', encoding)
+            if status == 206:
+                self.send_header('Content-Range', 'bytes %d-%d/%d' % (len(data) - len(body), len(data) - 1, len(data)))
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            if local_server.cut_after is not None:
+                body = body[:local_server.cut_after]
+                local_server.cut_after = None
+                self.close_connection = True
+            self.wfile.write(body)
+
+    return Handler
+
+
+@pytest.fixture
+def local_server():
+    server = LocalServer()
+    yield server
+    server.close()
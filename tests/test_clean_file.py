@@ -0,0 +1,70 @@
+"""
+Checks that clean_file gives byte-for-byte the same file as the cleaner cleanData used before it, on the
+mawp24raw.txt in the repository and on a copy of it with missing values and empty lines added.
+"""
+
+import os
+import random
+import pytest
+from conftest import REPO_ROOT
+from agweather_package import DailyUpload
+from agweather_package.DailyUpload import clean_file
+
+MISSING_VALUES = ['-7999', '-99', 'NAN', '"NAN"']
+
+
+# The cleaning loop of cleanData before clean_file (copied from the baseline DailyUpload.py, without the download and
+# progress bar).
+def old_clean(filename):
+    file_wip = open(filename, "r")
+    new_contents = ""
+
+    for line in file_wip:
+
+        # If the length of the line is less than or equal to 1, then don't add it to the output.
+        if len(line) > 1:
+            append_line = line.replace("-7999", "").replace("-99", "").replace("NAN", "")
+            new_contents = new_contents + append_line
+
+    file_wip.close()
+    file_wip = open(filename, 'w')
+    file_wip.write(new_contents)
+    file_wip.close()
+
+
+# Returns the mawp24raw.txt in the repository with some of its fields replaced by missing values, and some empty lines.
+def add_missing_values(data):
+    rng = random.Random(14)
+    lines = []
+    for line in data.split('\n'):
+        fields = line.split(',')
+        for index in range(1, len(fields)):
+            if rng.random() < 0.1:
+                fields[index] = rng.choice(MISSING_VALUES)
+        lines.append(','.join(fields))
+        if rng.random() < 0.01:
+            lines.append('')
+    return '\n'.join(lines)
+
+
+def check_same_as_old(work_dir, data):
+    for name in ('old.txt', 'new.txt'):
+        with open(work_dir / name, 'w') as raw_file:
+            raw_file.write(data)
+    old_clean(str(work_dir / 'old.txt'))
+    clean_file('new.txt')
+    assert (work_dir / 'new.txt').read_bytes() == (work_dir / 'old.txt').read_bytes()
+
+
+@pytest.mark.parametrize('block_size', [DailyUpload.CLEAN_BLOCK_SIZE, 4096, 1000])
+def test_real_file(work_dir, monkeypatch, block_size):
+    monkeypatch.setattr(DailyUpload, 'CLEAN_BLOCK_SIZE', block_size)
+    with open(os.path.join(REPO_ROOT, 'mawp24raw.txt'), 'r') as raw_file:
+        check_same_as_old(work_dir, raw_file.read())
+
+
+@pytest.mark.parametrize('block_size', [DailyUpload.CLEAN_BLOCK_SIZE, 4096, 1000])
+def test_missing_values(work_dir, monkeypatch, block_size):
+    monkeypatch.setattr(DailyUpload, 'CLEAN_BLOCK_SIZE', block_size)
+    with open(os.path.join(REPO_ROOT, 'mawp24raw.txt'), 'r') as raw_file:
+        check_same_as_old(work_dir, add_missing_values(raw_file.read()))
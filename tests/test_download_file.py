@@ -0,0 +1,82 @@
+"""
+Tests for download_file against a local HTTP server: gzip downloads, 304 answers for unchanged files and resuming an
+interrupted download from its .part file.
+"""
+
+import os
+import json
+import pytest
+from conftest import REPO_ROOT
+from agweather_package.UsefulFunctions import download_file, METADATA_SUFFIX, PART_SUFFIX
+
+
+@pytest.fixture
+def raw_data():
+    with open(os.path.join(REPO_ROOT, 'mawp24raw.txt'), 'rb') as raw_file:
+        return raw_file.read()
+
+
+def read_metadata(work_dir):
+    return json.loads((work_dir / 'input_data' / ('mawp24raw.txt' + METADATA_SUFFIX)).read_text())
+
+
+def test_gzip_download_and_not_modified(work_dir, local_server, raw_data):
+    url = local_server.url('mawp24raw.txt')
+    local_server.publish('mawp24raw.txt', raw_data)
+
+    assert download_file(url, 'mawp24raw.txt')
+    assert 'gzip' in local_server.requests[-1]['Accept-Encoding']
+    assert (work_dir / 'input_data' / 'mawp24raw.txt').read_bytes() == raw_data
+    metadata = read_metadata(work_dir)
+    assert metadata['complete'] and metadata['url'] == url and metadata['etag'] is not None
+
+    # The saved ETag is sent back, and the server answers 304 without a body.
+    assert not download_file(url, 'mawp24raw.txt')
+    assert local_server.requests[-1]['If-None-Match'] == metadata['etag']
+    assert (work_dir / 'input_data' / 'mawp24raw.txt').read_bytes() == raw_data
+
+    # A changed file is downloaded again.
+    changed_data = raw_data + b'"2099-01-01 00:00:00",1,2,3\n'
+    local_server.publish('mawp24raw.txt', changed_data)
+    assert download_file(url, 'mawp24raw.txt')
+    assert (work_dir / 'input_data' / 'mawp24raw.txt').read_bytes() == changed_data
+
+
+def test_resume_interrupted_download(work_dir, local_server, raw_data):
+    url = local_server.url('mawp24raw.txt')
+    local_server.publish('mawp24raw.txt', raw_data)
+    part_path = work_dir / 'input_data' / ('mawp24raw.txt' + PART_SUFFIX)
+
+    local_server.cut_after = 100000
+    with pytest.raises(Exception):
+        download_file(url, 'mawp24raw.txt')
+    assert not (work_dir / 'input_data' / 'mawp24raw.txt').exists()
+    part_size = part_path.stat().st_size
+    assert 0 < part_size < len(raw_data)
+    metadata = read_metadata(work_dir)
+    assert not metadata['complete'] and metadata['etag'] is not None
+
+    # Only the rest of the file is asked for, without compression so the byte ranges line up.
+    assert download_file(url, 'mawp24raw.txt')
+    request = local_server.requests[-1]
+    assert request['Range'] == 'bytes=%d-' % part_size
+    assert request['If-Range'] == metadata['etag']
+    assert request['Accept-Encoding'] == 'identity'
+    assert (work_dir / 'input_data' / 'mawp24raw.txt').read_bytes() == raw_data
+    assert not part_path.exists()
+    assert read_metadata(work_dir)['complete']
+
+
+def test_resume_after_file_changed(work_dir, local_server, raw_data):
+    url = local_server.url('mawp24raw.txt')
+    local_server.publish('mawp24raw.txt', raw_data)
+    local_server.cut_after = 100000
+    with pytest.raises(Exception):
+        download_file(url, 'mawp24raw.txt')
+
+    # The If-Range validator no longer matches, so the server sends the whole new file.
+    changed_data = b'"2099-01-01 00:00:00",1,2,3\n' + raw_data
+    local_server.publish('mawp24raw.txt', changed_data)
+    assert download_file(url, 'mawp24raw.txt')
+    assert 'Range' in local_server.requests[-1]
+    assert (work_dir / 'input_data' / 'mawp24raw.txt').read_bytes() == changed_data
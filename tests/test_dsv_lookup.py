@@ -0,0 +1,151 @@
+"""
+Checks that the Wisdom and TomCast lookup tables give the same DSV as the if/elif chains they replaced, for every
+period count and a fine grid of average temperatures (including the band edges, the rounding thresholds and NaN).
+"""
+
+import numpy as np
+import pytest
+from agweather_package.UsefulFunctions import wisdom_dsv_lookup, tomcast_dsv_lookup, wisdom_dsv_lookup_array, \
+    tomcast_dsv_lookup_array
+
+# Period counts from below 0 to past the end of the tables, as ints, whole floats and halves.
+PERIOD_COUNTS = list(range(-2, 101)) + [float(count) for count in range(-2, 101)] + \
+    [count + 0.5 for count in range(-2, 101)] + [float('nan')]
+# Every 0.05 C from -5 to 35, plus the values right next to each band edge and rounding threshold.
+EDGES = [7.0, 9.0, 12.5, 13.5, 15.5, 16.5, 17.5, 20.5, 21.5, 25.5, 26.5, 28.5, 29.5]
+TEMPERATURES = [round(-5 + 0.05 * step, 2) for step in range(801)] + \
+    [edge + delta for edge in EDGES for delta in (-1e-9, 0.0, 1e-9)] + [float('nan')]
+
+
+# The lookups as they were before the tables (copied from the baseline UsefulFunctions.py).
+
+# Returns DSV if given number of periods that RH >= 86 and temperature > 7 C based on the Wisdom table.
+def old_wisdom_dsv_lookup(period_count, avg_temperature_raw):
+
+    if avg_temperature_raw > 7.0:
+        avg_temperature = round(avg_temperature_raw)
+    else:
+        avg_temperature = avg_temperature_raw
+
+    dsv = 0
+    if 0 <= period_count < 39:
+        dsv = 0
+    elif (39 <= period_count <= 50) and (avg_temperature < 15.5):
+        dsv = 0
+    elif (39 <= period_count <= 50) and (avg_temperature >= 15.5):
+        dsv = 1
+    elif (51 <= period_count <= 62) and (avg_temperature < 12.5):
+        dsv = 0
+    elif (51 <= period_count <= 62) and (12.5 <= avg_temperature < 15.5):
+        dsv = 1
+    elif (51 <= period_count <= 62) and (avg_temperature >= 15.5):
+        dsv = 2
+    elif (63 <= period_count <= 74) and (avg_temperature < 12.5):
+        dsv = 1
+    elif (63 <= period_count <= 74) and (12.5 <= avg_temperature < 15.5):
+        dsv = 2
+    elif (63 <= period_count <= 74) and (avg_temperature >= 15.5):
+        dsv = 3
+    elif (75 <= period_count <= 86) and (avg_temperature < 12.5):
+        dsv = 2
+    elif (75 <= period_count <= 86) and (12.5 <= avg_temperature < 15.5):
+        dsv = 3
+    elif (75 <= period_count <= 86) and (avg_temperature >= 15.5):
+        dsv = 4
+    elif (87 <= period_count <= 96) and (avg_temperature < 12.5):
+        dsv = 3
+    elif (87 <= period_count <= 96) and (avg_temperature >= 12.5):
+        dsv = 4
+
+    return dsv
+
+
+# Returns DSV if given number of periods that RH >= 86 and temperature > 7 C based on the Tomcast table.
+def old_tomcast_dsv_lookup(period_count, avg_temperature_raw):
+
+    if avg_temperature_raw > 9.0:
+        avg_temperature = round(avg_temperature_raw)
+    else:
+        avg_temperature = avg_temperature_raw
+
+    dsv = 0
+    if 0 <= period_count <= 10:
+        dsv = 0
+    elif (11 <= period_count <= 14) and (avg_temperature < 20.5):
+        dsv = 0
+    elif (11 <= period_count <= 14) and (20.5 <= avg_temperature < 25.5):
+        dsv = 1
+    elif (11 <= period_count <= 14) and (avg_temperature >= 25.5):
+        dsv = 0
+    elif (15 <= period_count <= 22) and (avg_temperature < 17.5):
+        dsv = 0
+    elif (15 <= period_count <= 22) and (avg_temperature >= 17.5):
+        dsv = 1
+    elif (23 <= period_count <= 26) and (avg_temperature < 17.5):
+        dsv = 0
+    elif (23 <= period_count <= 26) and (17.5 <= avg_temperature < 20.5):
+        dsv = 1
+    elif (23 <= period_count <= 26) and (20.5 <= avg_temperature < 25.5):
+        dsv = 2
+    elif (23 <= period_count <= 26) and (avg_temperature >= 25.5):
+        dsv = 1
+    elif (27 <= period_count <= 34) and (avg_temperature < 20.5):
+        dsv = 1
+    elif (27 <= period_count <= 34) and (20.5 <= avg_temperature < 25.5):
+        dsv = 2
+    elif (27 <= period_count <= 34) and (avg_temperature >= 25.5):
+        dsv = 1
+    elif (35 <= period_count <= 50) and (avg_temperature < 17.5):
+        dsv = 1
+    elif (35 <= period_count <= 50) and (avg_temperature >= 17.5):
+        dsv = 2
+    elif (51 <= period_count <= 62) and (avg_temperature < 12.5):
+        dsv = 2
+    elif (51 <= period_count <= 62) and (12.5 <= avg_temperature < 17.5):
+        dsv = 1
+    elif (51 <= period_count <= 62) and (17.5 <= avg_temperature < 20.5):
+        dsv = 2
+    elif (51 <= period_count <= 62) and (20.5 <= avg_temperature < 25.5):
+        dsv = 3
+    elif (51 <= period_count <= 62) and (avg_temperature >= 25.5):
+        dsv = 2
+    elif (63 <= period_count <= 82) and (avg_temperature < 17.5):
+        dsv = 2
+    elif (63 <= period_count <= 82) and (avg_temperature >= 17.5):
+        dsv = 3
+    elif (83 <= period_count <= 90) and (avg_temperature < 20.5):
+        dsv = 3
+    elif (83 <= period_count <= 90) and (20.5 <= avg_temperature < 25.5):
+        dsv = 4
+    elif (83 <= period_count <= 90) and (avg_temperature >= 25.5):
+        dsv = 3
+    elif (91 <= period_count <= 96) and (avg_temperature < 17.5):
+        dsv = 3
+    elif (91 <= period_count <= 96) and (avg_temperature >= 17.5):
+        dsv = 4
+
+    return dsv
+
+
+@pytest.mark.parametrize('new_lookup, old_lookup', [(wisdom_dsv_lookup, old_wisdom_dsv_lookup),
+                                                    (tomcast_dsv_lookup, old_tomcast_dsv_lookup)])
+def test_lookup_matches_old_chains(new_lookup, old_lookup):
+    for period_count in PERIOD_COUNTS:
+        for temperature in TEMPERATURES:
+            assert new_lookup(period_count, temperature) == old_lookup(period_count, temperature), \
+                (period_count, temperature)
+
+
+@pytest.mark.parametrize('new_lookup, old_lookup', [(wisdom_dsv_lookup_array, old_wisdom_dsv_lookup),
+                                                    (tomcast_dsv_lookup_array, old_tomcast_dsv_lookup)])
+def test_array_lookup_matches_old_chains(new_lookup, old_lookup):
+    counts, temperatures = np.meshgrid(np.array(PERIOD_COUNTS, dtype=float), np.array(TEMPERATURES), indexing='ij')
+    expected = [[old_lookup(count, temperature) for temperature in TEMPERATURES] for count in PERIOD_COUNTS]
+    assert new_lookup(counts, temperatures).tolist() == expected
+
+
+def test_float_period_count():
+    assert wisdom_dsv_lookup(45.0, 16) == wisdom_dsv_lookup(45, 16) == 1
+    assert tomcast_dsv_lookup(10.0, 22) == tomcast_dsv_lookup(10, 22)
+    assert wisdom_dsv_lookup(45.5, 16) == 1
+    assert wisdom_dsv_lookup(50.5, 16) == 0
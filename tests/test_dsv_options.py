@@ -0,0 +1,18 @@
+from agweather_package.PotatoBlight import DSV_OPTIONS, load_dsv_options
+
+
+def test_missing_file_uses_defaults(work_dir):
+    assert load_dsv_options() == DSV_OPTIONS
+
+
+def test_options_from_file(work_dir):
+    (work_dir / 'config_files' / 'dsv_options.yaml').write_text(
+        "columnar: yes\nparallel: yes\nworkers: 2\nreport_format: csv\nunknown: 1\nseek:\n")
+    options = load_dsv_options()
+    assert options == dict(DSV_OPTIONS, columnar=True, parallel=True, workers=2, report_format='csv')
+
+
+def test_shipped_file_matches_defaults(monkeypatch):
+    from conftest import REPO_ROOT
+    monkeypatch.chdir(REPO_ROOT)
+    assert load_dsv_options() == DSV_OPTIONS
@@ -0,0 +1,27 @@
+import json
+import pytest
+from agweather_package.DSVWriters import DSVWriter, make_dsv_writer
+
+
+def test_base_writer_is_abstract(work_dir):
+    with pytest.raises(TypeError):
+        DSVWriter('comparison.txt')
+
+
+@pytest.mark.parametrize('report_format, expected', [
+    ('text', "Station: S1 | Date: 2015-07-01 | Daily DSV: 2 | Cumulative DSV: 5 | Count: 40 | Avg. Temp: 16.25\n"),
+    ('csv', "Station,Date,Daily DSV,Cumulative DSV,Count,Avg. Temp\r\nS1,2015-07-01,2,5,40,16.25\r\n"),
+    ('jsonl', json.dumps({'station': 'S1', 'date': '2015-07-01', 'daily_dsv': 2, 'cumulative_dsv': 5, 'count': 40,
+                          'avg_temp': 16.25}) + '\n'),
+])
+def test_writers(work_dir, report_format, expected):
+    with make_dsv_writer(report_format) as writer:
+        writer.write_day('S1', '2015-07-01', 2, 5, 40, 16.25)
+        file_path = writer.file.name
+    with open(file_path, newline='') as report_file:
+        assert report_file.read() == expected
+
+
+def test_unknown_format(work_dir):
+    with pytest.raises(ValueError):
+        make_dsv_writer('xml')
@@ -0,0 +1,42 @@
+"""
+Checks that show_field_dsv (AgAuto's calcFieldDSV option) writes one row of field_dsv.csv per field in
+seed_dates.yaml, the same rows batch_dsv gives for those fields.
+"""
+
+import csv
+import sys
+from test_offset_index import mawp15
+from agweather_package.BatchDSV import batch_dsv, read_seed_requests
+from agweather_package.ColumnarDSV import load_station_columns
+from agweather_package.DSVWriters import FIELD_DSV_HEADER
+from agweather_package.PotatoBlight import show_field_dsv
+
+SEED_DATES = """
+North Field:
+  station: S1
+  seed_date: 2015-07-02
+South Field:
+  station: S4
+  seed_date: 2015-07-10
+Old Field:
+  station: S2
+  seed_date: 2015-06-20
+Missing Field:
+  station: S9
+  seed_date: 2015-07-05
+"""
+
+
+def test_show_field_dsv(mawp15, work_dir, monkeypatch):
+    (work_dir / 'config_files' / 'seed_dates.yaml').write_text(SEED_DATES)
+    # mawp15.txt is already in input_data, so nothing is downloaded.
+    monkeypatch.setattr(sys.modules['agweather_package.PotatoBlight'], 'download_file', lambda *args: None)
+    show_field_dsv()
+
+    with open(work_dir / 'raw_output_data' / 'field_dsv.csv', newline='') as csv_file:
+        rows = list(csv.reader(csv_file))
+    expected = [[str(value) for value in result.csv_row()]
+                for result in batch_dsv(load_station_columns('mawp15.txt'), read_seed_requests())]
+    assert rows == [FIELD_DSV_HEADER] + expected
+    assert [row[0] for row in rows[1:]] == ['North Field', 'South Field', 'Old Field', 'Missing Field']
+    assert rows[4][3:] == ['', '', '', '']
@@ -0,0 +1,80 @@
+"""
+Tests for the incremental mode of cleanData (follow_raw_file), served from a local HTTP server.
+"""
+
+import os
+from conftest import REPO_ROOT
+from agweather_package.DailyUpload import follow_raw_file, clean_file, is_append_only, row_timestamp
+
+BLOCK_ROWS = 76
+
+
+# Returns the station blocks of the mawp24raw.txt in the repository, each a list of rows in time order.
+def read_station_blocks():
+    with open(os.path.join(REPO_ROOT, 'mawp24raw.txt'), 'r') as raw_file:
+        rows = [line for line in raw_file.read().split('\n') if line.strip() != '']
+    blocks = [[rows[0]]]
+    for row in rows[1:]:
+        if row_timestamp(row) < row_timestamp(blocks[-1][-1]):
+            blocks.append([])
+        blocks[-1].append(row)
+    return blocks
+
+
+# Returns the raw file made of the first rows_per_block rows of every block.
+def join_blocks(blocks, rows_per_block):
+    return ''.join(row + '\n' for block in blocks for row in block[:rows_per_block]).encode()
+
+
+# Returns the contents of a freshly cleaned copy of data.
+def cleaned(work_dir, data):
+    (work_dir / 'expected.txt').write_bytes(data)
+    clean_file('expected.txt')
+    return (work_dir / 'expected.txt').read_bytes()
+
+
+def test_real_file_is_grouped_by_station():
+    blocks = read_station_blocks()
+    assert len(blocks) == 114
+    assert sum(len(block) == BLOCK_ROWS for block in blocks) == 111
+    assert not is_append_only(os.path.join(REPO_ROOT, 'mawp24raw.txt'))
+
+
+def test_station_layout_skips_the_tail(work_dir, local_server):
+    blocks = [block for block in read_station_blocks() if len(block) == BLOCK_ROWS][:4]
+    url = local_server.url('mawp24raw.txt')
+    local_server.publish('mawp24raw.txt', join_blocks(blocks, BLOCK_ROWS - 4))
+    follow_raw_file(url, 'mawp24raw.txt')
+
+    # The next day of every station is added inside its block, not at the end of the file.
+    new_data = join_blocks(blocks, BLOCK_ROWS - 3)
+    local_server.publish('mawp24raw.txt', new_data)
+    del local_server.requests[:]
+    follow_raw_file(url, 'mawp24raw.txt')
+
+    assert len(local_server.requests) == 1
+    assert 'Range' not in local_server.requests[0]
+    assert (work_dir / 'mawp24raw.txt').read_bytes() == cleaned(work_dir, new_data)
+
+    # Nothing is downloaded again if the file didn't change.
+    del local_server.requests[:]
+    follow_raw_file(url, 'mawp24raw.txt')
+    assert len(local_server.requests) == 1
+    assert 'If-None-Match' in local_server.requests[0]
+    assert (work_dir / 'mawp24raw.txt').read_bytes() == cleaned(work_dir, new_data)
+
+
+def test_time_ordered_file_is_followed(work_dir, local_server):
+    rows = read_station_blocks()[0]
+    url = local_server.url('mawp24raw.txt')
+    local_server.publish('mawp24raw.txt', ''.join(row + '\n' for row in rows[:60]).encode())
+    follow_raw_file(url, 'mawp24raw.txt')
+
+    new_data = ''.join(row + '\n' for row in rows).encode()
+    local_server.publish('mawp24raw.txt', new_data)
+    del local_server.requests[:]
+    follow_raw_file(url, 'mawp24raw.txt')
+
+    assert len(local_server.requests) == 1
+    assert 'Range' in local_server.requests[0]
+    assert (work_dir / 'mawp24raw.txt').read_bytes() == cleaned(work_dir, new_data)
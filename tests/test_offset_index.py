@@ -0,0 +1,62 @@
+"""
+Checks that seeking to the seed date with the OffsetIndex sidecar gives the same DSVs as reading the whole file, for
+seed dates in the middle of the data and at its edges.
+"""
+
+import random
+import pytest
+from datetime import datetime, timedelta
+from agweather_package.OffsetIndex import seed_start_offset, order_stations
+from agweather_package.ParallelDSV import DayCollector
+from agweather_package.PotatoBlight import stream_stations
+from agweather_package.ColumnarDSV import load_station_columns
+
+FIRST_TIME = datetime(2015, 7, 1, 0, 0)
+# The last rows are on the morning of 2015-07-19, so the last day is incomplete.
+LAST_TIME = datetime(2015, 7, 19, 7, 45)
+# S4 stops sending data a week before the others.
+STATION_LAST_TIMES = {'S1': LAST_TIME, 'S2': LAST_TIME, 'S3': LAST_TIME, 'S4': datetime(2015, 7, 12, 15, 30)}
+SEED_DATES = ['2015-06-20', '2015-07-01', '2015-07-02', '2015-07-03', '2015-07-10', '2015-07-12', '2015-07-13',
+              '2015-07-15', '2015-07-17', '2015-07-18', '2015-07-19', '2015-07-20', '2015-07-25']
+
+
+# Writes a file in the mawp15.txt format with a row every 15 minutes for each station. The hours of the time stamps
+# aren't zero padded, the same as mawp15.txt.
+@pytest.fixture
+def mawp15(work_dir):
+    rng = random.Random(12)
+    lines = ['DateTime,StnID,Temp,RH,Rain,AvgWS,AvgWD']
+    time_stamp = FIRST_TIME
+    while time_stamp <= LAST_TIME:
+        for station_id, last_time in STATION_LAST_TIMES.items():
+            if time_stamp <= last_time:
+                humid = rng.random() < 0.6
+                lines.append('%s %d:%02d,%s,%.1f,%d,0,1.5,%d' % (
+                    time_stamp.strftime('%Y-%m-%d'), time_stamp.hour, time_stamp.minute, station_id,
+                    rng.uniform(10, 26), rng.randint(86, 100) if humid else rng.randint(40, 85), rng.randint(0, 359)))
+        time_stamp += timedelta(minutes=15)
+    (work_dir / 'input_data' / 'mawp15.txt').write_text('\n'.join(lines) + '\n')
+
+
+# Returns the station ID, today's DSV, cumulative DSV and every day written to the report for each station.
+def station_results(stations, seed_date):
+    results = []
+    for station in stations.values():
+        collector = DayCollector()
+        today_dsv, cumul_dsv = station.write_dsv(seed_date, collector)
+        results.append((station.get_id(), today_dsv, cumul_dsv, collector.days))
+    return results
+
+
+@pytest.mark.parametrize('load_stations', [stream_stations, load_station_columns])
+@pytest.mark.parametrize('seed_str', SEED_DATES)
+def test_seek_matches_full_read(mawp15, load_stations, seed_str):
+    seed_date = datetime.strptime(seed_str, '%Y-%m-%d')
+    full = station_results(load_stations('mawp15.txt'), seed_date)
+    start_offset = seed_start_offset(seed_date, 'mawp15.txt')
+    seek = station_results(order_stations(load_stations('mawp15.txt', start_offset=start_offset)), seed_date)
+    assert seek == full
+
+
+def test_seek_skips_rows(mawp15):
+    assert seed_start_offset(datetime(2015, 7, 10), 'mawp15.txt') > 0
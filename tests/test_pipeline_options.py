@@ -0,0 +1,70 @@
+"""
+Tests for the options of dailyUpload in config_files/pipeline_options.yaml, and for following mawp60raw.txt through
+daily_upload once incremental is turned on there.
+"""
+
+import sys
+from datetime import datetime, timedelta
+from agweather_package.DailyPipeline import PIPELINE_OPTIONS, load_pipeline_options, daily_upload
+from agweather_package.DailyUpload import clean_file
+
+STATIONS = [244, 301, 512]
+FIRST_HOUR = datetime(2022, 11, 2, 0, 0)
+
+
+def test_missing_file_uses_defaults(work_dir):
+    assert load_pipeline_options() == PIPELINE_OPTIONS
+
+
+def test_options_from_file(work_dir):
+    (work_dir / 'config_files' / 'pipeline_options.yaml').write_text(
+        "workers: 1\nincremental: yes\npublish: no\nunknown: 1\n")
+    assert load_pipeline_options() == dict(PIPELINE_OPTIONS, workers=1, incremental=True, publish=False)
+
+
+def test_blank_options_keep_defaults(work_dir):
+    (work_dir / 'config_files' / 'pipeline_options.yaml').write_text("workers:\nincremental:\n")
+    assert load_pipeline_options() == PIPELINE_OPTIONS
+
+
+def test_shipped_file_matches_defaults(monkeypatch):
+    from conftest import REPO_ROOT
+    monkeypatch.chdir(REPO_ROOT)
+    assert load_pipeline_options() == PIPELINE_OPTIONS
+
+
+# Returns hours rows of mawp60raw.txt in time order, one row for every station each hour. Some values are missing.
+def mawp60_rows(hours):
+    rows = []
+    for hour in range(hours):
+        time_stamp = (FIRST_HOUR + timedelta(hours=hour)).strftime('%Y-%m-%d %H:%M:%S')
+        for station in STATIONS:
+            temp = -99 if (hour + station) % 7 == 0 else round(5 + hour * 0.25 - station / 100.0, 2)
+            rows.append('"%s",%d,%d,%s,%s,"NAN",%.1f' % (time_stamp, hour, station, temp, 80 - hour % 20,
+                                                         hour % 4 * 0.2))
+    return ''.join(row + '\n' for row in rows)
+
+
+def test_daily_upload_follows_mawp60raw(work_dir, local_server, monkeypatch):
+    # Only mawp60raw.txt is downloaded, from the local server, and the files aren't copied anywhere.
+    pipeline = sys.modules['agweather_package.DailyPipeline']
+    monkeypatch.setattr(sys.modules['agweather_package.DailyUpload'], 'MAWP_URL_ROOT', local_server.url('')[:-1])
+    monkeypatch.setattr(pipeline, 'update_daily_ec_stage', lambda: None)
+    monkeypatch.setattr(pipeline, 'MAWP_FILES', ['mawp60raw.txt'])
+    (work_dir / 'config_files' / 'pipeline_options.yaml').write_text("incremental: yes\npublish: no\n")
+    local_server.publish('mawp60raw.txt', mawp60_rows(20).encode())
+    results = daily_upload(**load_pipeline_options())
+    assert all(result.succeeded() for result in results)
+
+    # The next hours are added to the end of the file, and the last one is still being written upstream.
+    new_data = mawp60_rows(30) + mawp60_rows(31)[len(mawp60_rows(30)):][:25]
+    local_server.publish('mawp60raw.txt', new_data.encode())
+    del local_server.requests[:]
+    results = daily_upload(**load_pipeline_options())
+    assert all(result.succeeded() for result in results)
+
+    assert len(local_server.requests) == 1
+    assert 'Range' in local_server.requests[0]
+    (work_dir / 'expected.txt').write_text(mawp60_rows(30))
+    clean_file('expected.txt')
+    assert (work_dir / 'mawp60raw.txt').read_bytes() == (work_dir / 'expected.txt').read_bytes()